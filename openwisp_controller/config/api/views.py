@@ -17,6 +17,7 @@ from swapper import load_model
 from openwisp_users.api.permissions import DjangoModelPermissions
 
 from ...mixins import ProtectedAPIMixin
+from ..utils import bulk_invalidate_cache
 from .filters import (
     DeviceGroupListFilter,
     DeviceListFilter,
@@ -216,13 +217,16 @@ class DeviceGroupCommonName(ProtectedAPIMixin, RetrieveAPIView):
 
     @classmethod
     def _invalidate_from_queryset(cls, queryset):
-        for obj in queryset.iterator():
-            if not obj["common_name"]:
-                return
-            cls.get_device_group.invalidate(None, "", obj["common_name"])
-            cls.get_device_group.invalidate(
-                None, obj["organization__slug"], obj["common_name"]
-            )
+        def get_cache_keys():
+            for obj in queryset.iterator():
+                if not obj["common_name"]:
+                    continue
+                yield cls.get_device_group.get_cache_key(None, "", obj["common_name"])
+                yield cls.get_device_group.get_cache_key(
+                    None, obj["organization__slug"], obj["common_name"]
+                )
+
+        bulk_invalidate_cache(get_cache_keys())
 
     @classmethod
     def device_change_invalidates_cache(cls, device_id):
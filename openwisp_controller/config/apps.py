@@ -22,6 +22,7 @@ from openwisp_utils.admin_theme.menu import register_menu_group
 from . import settings as app_settings
 from .signals import (
     config_backend_changed,
+    config_bulk_modified,
     config_deactivated,
     config_deactivating,
     config_modified,
@@ -334,6 +335,10 @@ class ConfigConfig(AppConfig):
             DeviceChecksumView.invalidate_checksum_cache,
             dispatch_uid="invalidate_checksum_cache",
         )
+        config_bulk_modified.connect(
+            DeviceChecksumView.bulk_invalidate_checksum_cache,
+            dispatch_uid="bulk_invalidate_checksum_cache",
+        )
         device_group_changed.connect(
             devicegroup_change_handler,
             sender=self.device_model,
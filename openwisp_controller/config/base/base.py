@@ -193,8 +193,14 @@ class BaseConfig(BaseModel):
         """
         returns checksum of configuration
         """
-        config = self.generate().getvalue()
-        return hashlib.md5(config).hexdigest()
+        return self.get_archive_checksum(self.generate().getvalue())
+
+    @staticmethod
+    def get_archive_checksum(archive):
+        """
+        returns checksum of the configuration archive bytes
+        """
+        return hashlib.md5(archive).hexdigest()
 
     def json(self, dict=False, **kwargs):
         """
@@ -1,9 +1,12 @@
 import collections
+import json
 import logging
 import re
 from collections import defaultdict
+from itertools import islice
 
 from cache_memoize import cache_memoize
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied, ValidationError
 from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
@@ -17,13 +20,20 @@ from swapper import get_model_name, load_model
 from .. import settings as app_settings
 from ..signals import (
     config_backend_changed,
+    config_bulk_modified,
+    config_bulk_status_changed,
     config_deactivated,
     config_deactivating,
     config_modified,
     config_status_changed,
 )
 from ..sortedm2m.fields import SortedManyToManyField
-from ..utils import get_default_templates_queryset
+from ..utils import (
+    bulk_invalidate_cache,
+    get_default_templates_queryset,
+    get_organization_cache_generation,
+    get_organization_cache_generations,
+)
 from .base import BaseConfig
 
 logger = logging.getLogger(__name__)
@@ -40,9 +50,15 @@ class TemplatesThrough(object):
 
 def get_cached_checksum_args_rewrite(config):
     """
-    Use only the PK parameter for calculating the cache key
+    Use only the PK parameter and the cache generation
+    of the organization for calculating the cache key
     """
-    return config.pk.hex
+    # the generation may have been looked up in advance
+    # (eg: in bulk operations or in the ASGI fast path)
+    generation = getattr(config, "_organization_cache_generation", None)
+    if generation is None:
+        generation = get_organization_cache_generation(config.device.organization_id)
+    return f"{config.pk.hex}-{generation}"
 
 
 class AbstractConfig(BaseConfig):
@@ -113,6 +129,8 @@ class AbstractConfig(BaseConfig):
         super().__init__(*args, **kwargs)
         # for internal usage
         self._just_created = False
+        # context blocks computed by "prefetch_context"
+        self._context_blocks = {}
         self._initial_status = self.status
         self._send_config_modified_after_save = False
         self._send_config_deactivated = False
@@ -160,12 +178,107 @@ class AbstractConfig(BaseConfig):
         (invalidation handled on post_save/post_delete signal)
         """
         logger.debug(f"calculating checksum for config ID {self.pk}")
-        return self.checksum
+        archive = self.generate().getvalue()
+        checksum = self.get_archive_checksum(archive)
+        # the archive has been rendered anyway, store it so that
+        # the download which usually follows does not render it again
+        self._set_cached_archive(checksum, archive)
+        return checksum
+
+    @staticmethod
+    def get_archive_cache_key(checksum):
+        """
+        archives are content addressed: configurations
+        which render the same archive share the same entry
+        """
+        return f"config-archive-{checksum}"
+
+    def get_cached_archive(self):
+        """
+        returns a tuple containing the checksum and the bytes of
+        the configuration archive, the archive is looked up in the
+        cache and rendered only if missing (eg: expired or evicted)
+        """
+        checksum = self.get_cached_checksum()
+        archive = cache.get(self.get_archive_cache_key(checksum))
+        if archive is None:
+            archive = self.generate().getvalue()
+            checksum = self.get_archive_checksum(archive)
+            self._set_cached_archive(checksum, archive)
+        return checksum, archive
+
+    def _set_cached_archive(self, checksum, archive):
+        cache.set(
+            self.get_archive_cache_key(checksum),
+            archive,
+            timeout=app_settings.CONFIG_ARCHIVE_CACHE_TIMEOUT,
+        )
 
     @classmethod
     def bulk_invalidate_get_cached_checksum(cls, query_params):
-        for config in cls.objects.only("id").filter(**query_params).iterator():
-            config.get_cached_checksum.invalidate(config)
+        queryset = (
+            cls.objects.select_related("device")
+            .only("id", "device", "device__organization_id")
+            .filter(**query_params)
+        )
+        cls.bulk_invalidate_get_cached_checksum_of(queryset.iterator())
+
+    @classmethod
+    def bulk_invalidate_get_cached_checksum_of(cls, configs):
+        """
+        Invalidates the cached checksum of ``configs``
+        (any iterable) with pipelined cache deletions
+        """
+        return bulk_invalidate_cache(cls._get_cached_checksum_keys(configs))
+
+    @classmethod
+    def bulk_get_cached_checksum(cls, configs, chunk_size=1000):
+        """
+        Returns a dict which maps the PKs of ``configs`` (any iterable)
+        to their cached checksum, missing checksums are calculated
+        after prefetching the context of each chunk of configs
+        (see ``prefetch_context``)
+        """
+        checksums = {}
+        iterator = iter(configs)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return checksums
+            cls.prefetch_context(chunk)
+            generations = get_organization_cache_generations(
+                config.device.organization_id for config in chunk
+            )
+            for config in chunk:
+                config._organization_cache_generation = generations[
+                    config.device.organization_id
+                ]
+                checksums[config.pk] = config.get_cached_checksum()
+                del config._organization_cache_generation
+                config.invalidate_context()
+
+    @classmethod
+    def _get_cached_checksum_keys(cls, configs, chunk_size=1000):
+        """
+        Yields the checksum cache keys of ``configs``, the cache
+        generations of their organizations are looked up once per chunk
+        """
+        iterator = iter(configs)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return
+            generations = get_organization_cache_generations(
+                config.device.organization_id for config in chunk
+            )
+            for config in chunk:
+                config._organization_cache_generation = generations[
+                    config.device.organization_id
+                ]
+                key = config.get_cached_checksum.get_cache_key(config)
+                # the instance may outlive the current generation
+                del config._organization_cache_generation
+                yield key
 
     @classmethod
     def get_template_model(cls):
@@ -455,6 +568,46 @@ class AbstractConfig(BaseConfig):
         if func not in cls._config_context_functions:
             cls._config_context_functions.append(func)
 
+    @classmethod
+    def prefetch_context(cls, configs):
+        """
+        Prefetches the objects used by "get_context" for all the
+        "configs" with a constant number of queries.
+        The context functions which have a "bulk" attribute are
+        called once for all the configs: "bulk" receives the list
+        of configs and returns a dict which maps their PKs to their
+        context. The resulting context blocks are stored in each
+        config until "invalidate_context" is called.
+        """
+        configs = [config for config in configs if config._has_device()]
+        VpnClient = load_model("config", "VpnClient")
+        models.prefetch_related_objects(
+            configs,
+            "device__organization__config_settings",
+            "device__group",
+            models.Prefetch(
+                "vpnclient_set",
+                queryset=VpnClient.objects.select_related(
+                    "vpn__ca", "vpn__ip", "vpn__subnet", "cert", "ip"
+                ),
+            ),
+        )
+        for func in cls._config_context_functions:
+            bulk = getattr(func, "bulk", None)
+            if bulk is None:
+                continue
+            contexts = bulk(configs)
+            for config in configs:
+                config._context_blocks[func] = contexts.get(config.pk, {})
+
+    def invalidate_context(self):
+        """
+        Discards the objects and the context
+        blocks stored by "prefetch_context"
+        """
+        self._context_blocks = {}
+        getattr(self, "_prefetched_objects_cache", {}).pop("vpnclient_set", None)
+
     def get_default_templates(self):
         """
         retrieves default templates of a Config object
@@ -735,7 +888,12 @@ class AbstractConfig(BaseConfig):
 
     def get_vpn_context(self):
         context = {}
-        for vpnclient in self.vpnclient_set.all().select_related("vpn", "cert"):
+        vpnclients = self.vpnclient_set.all()
+        # select_related would discard the
+        # objects stored by "prefetch_context"
+        if "vpnclient_set" not in getattr(self, "_prefetched_objects_cache", {}):
+            vpnclients = vpnclients.select_related("vpn", "cert")
+        for vpnclient in vpnclients:
             vpn = vpnclient.vpn
             vpn_id = vpn.pk.hex
             context.update(vpn.get_vpn_server_context())
@@ -807,7 +965,10 @@ class AbstractConfig(BaseConfig):
             # Add predefined variables
             context.update(self.get_vpn_context())
             for func in self._config_context_functions:
-                context.update(func(config=self))
+                if func in self._context_blocks:
+                    context.update(self._context_blocks[func])
+                else:
+                    context.update(func(config=self))
             if app_settings.HARDWARE_ID_ENABLED:
                 context.update({"hardware_id": str(self.device.hardware_id)})
 
@@ -845,6 +1006,183 @@ class AbstractConfig(BaseConfig):
         self.templates.remove(*removed_templates)
         self.templates.add(*templates)
 
+    @classmethod
+    def bulk_manage_group_templates(cls, changes):
+        """
+        Set based version of ``manage_group_templates``.
+
+        Args:
+            changes (list): list of ``(config, templates, old_templates)``
+                tuples, where ``templates`` and ``old_templates`` are
+                lists of ``Template`` instances
+
+        The relationships are added and removed with bulk queries,
+        the status of the affected configs is flagged as modified with
+        one query and the ``config_bulk_modified`` and
+        ``config_bulk_status_changed`` signals are sent once.
+
+        The added templates are validated with ``clean_templates``
+        once for each distinct combination of backend, configuration
+        and templates; unlike ``manage_group_templates``, required
+        templates are not removed.
+        """
+        through_model = cls.templates.through
+        sort_field = cls._meta.get_field("templates").sort_value_field_name
+        config_ids = [config.pk for config, _, _ in changes]
+        assigned = defaultdict(set)
+        sort_values = defaultdict(lambda: -1)
+        for config_id, template_id, sort_value in through_model.objects.filter(
+            config_id__in=config_ids
+        ).values_list("config_id", "template_id", sort_field):
+            assigned[config_id].add(template_id)
+            sort_values[config_id] = max(sort_values[config_id], sort_value)
+        added = defaultdict(list)
+        removed = defaultdict(list)
+        for config, templates, old_templates in changes:
+            template_ids = set()
+            for template in templates:
+                if template.backend != config.backend:
+                    continue
+                template_ids.add(template.pk)
+                if template.pk not in assigned[config.pk]:
+                    added[config].append(template)
+            for template in old_templates:
+                if (
+                    template.backend == config.backend
+                    and template.pk not in template_ids
+                    and template.pk in assigned[config.pk]
+                    and not template.required
+                ):
+                    removed[config].append(template.pk)
+        if not added and not removed:
+            return []
+        changed = list({**added, **removed}.keys())
+        with transaction.atomic():
+            if removed:
+                # configs which were in the same group share the same
+                # templates to remove, this keeps the query short
+                removed_groups = defaultdict(list)
+                for config, template_ids in removed.items():
+                    removed_groups[frozenset(template_ids)].append(config.pk)
+                removed_query = models.Q()
+                for template_ids, group_config_ids in removed_groups.items():
+                    removed_query |= models.Q(
+                        config_id__in=group_config_ids, template_id__in=template_ids
+                    )
+                through_model.objects.filter(removed_query).delete()
+            cls._bulk_clean_templates(added, assigned, removed)
+            through_instances = []
+            for config, templates in added.items():
+                for template in templates:
+                    sort_values[config.pk] += 1
+                    through_instances.append(
+                        through_model(
+                            config=config,
+                            template=template,
+                            **{sort_field: sort_values[config.pk]},
+                        )
+                    )
+            through_model.objects.bulk_create(through_instances)
+            cls._bulk_manage_vpn_clients(added, removed)
+            queryset = cls.objects.filter(pk__in=[config.pk for config in changed])
+            changing_status = set(
+                queryset.exclude(status="modified").values_list("pk", flat=True)
+            )
+            queryset.exclude(status="modified").update(status="modified")
+            for config in changed:
+                config.status = "modified"
+            modified = [config for config in changed if not config._just_created]
+            if modified:
+                config_bulk_modified.send(
+                    sender=cls, instances=modified, action="m2m_templates_changed"
+                )
+            status_changed = [
+                config for config in changed if config.pk in changing_status
+            ]
+            if status_changed:
+                config_bulk_status_changed.send(sender=cls, instances=status_changed)
+        return changed
+
+    @classmethod
+    def _bulk_clean_templates(cls, added, assigned, removed):
+        """
+        Set based version of ``clean_templates``, called by
+        ``bulk_manage_group_templates`` once the removed templates
+        have been deleted; configs sharing the same backend,
+        organization, configuration, context and templates
+        are validated only once
+        """
+        cleaned = set()
+        for config, templates in added.items():
+            key = (
+                config.backend,
+                config.device.organization_id,
+                json.dumps(config.config, sort_keys=True),
+                json.dumps(config.context, sort_keys=True),
+                frozenset(assigned[config.pk].difference(removed.get(config, ()))),
+                tuple(template.pk for template in templates),
+            )
+            if key in cleaned:
+                continue
+            cls.clean_templates(
+                "pre_add", config, {template.pk for template in templates}
+            )
+            cleaned.add(key)
+
+    @classmethod
+    def _bulk_manage_vpn_clients(cls, added, removed):
+        """
+        Set based version of ``manage_vpn_clients``,
+        called by ``bulk_manage_group_templates``
+        """
+        vpn_client_model = cls.vpn.through
+        through_model = cls.templates.through
+        removed_template_ids = set()
+        for template_ids in removed.values():
+            removed_template_ids.update(template_ids)
+        if removed_template_ids:
+            vpn_client_model.objects.filter(
+                config_id__in=[config.pk for config in removed],
+                template_id__in=removed_template_ids,
+            ).exclude(
+                models.Exists(
+                    through_model.objects.filter(
+                        config_id=models.OuterRef("config_id"),
+                        template_id=models.OuterRef("template_id"),
+                    )
+                )
+            ).delete()
+        vpn_added = {
+            config: [template for template in templates if template.type == "vpn"]
+            for config, templates in added.items()
+        }
+        vpn_added = {
+            config: templates for config, templates in vpn_added.items() if templates
+        }
+        if not vpn_added:
+            return
+        existing = set(
+            vpn_client_model.objects.filter(
+                config_id__in=[config.pk for config in vpn_added]
+            ).values_list("config_id", "vpn_id")
+        )
+        clients = []
+        for config, templates in vpn_added.items():
+            for template in templates:
+                # a config can have only one client per VPN
+                if (config.pk, template.vpn_id) in existing:
+                    continue
+                existing.add((config.pk, template.vpn_id))
+                clients.append(
+                    vpn_client_model(
+                        config=config,
+                        vpn=template.vpn,
+                        template=template,
+                        auto_cert=template.auto_cert,
+                    )
+                )
+        vpn_client_model.bulk_provision(clients)
+
     @classmethod
     def manage_backend_changed(cls, instance_id, old_backend, backend, **kwargs):
         """
@@ -1,8 +1,10 @@
+from collections import defaultdict
 from hashlib import md5
+from ipaddress import ip_address
 
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied, ValidationError
 from django.db import models, transaction
-from django.db.models import Q
+from django.db.models import Case, F, Q, Value, When
 from django.utils.translation import gettext_lazy as _
 from swapper import get_model_name, load_model
 
@@ -458,30 +460,48 @@ class AbstractDevice(OrgMixin, BaseModel):
     def manage_devices_group_templates(cls, device_ids, old_group_ids, group_id):
         """
         This method is used to manage group templates for devices.
+
+        The templates of the groups are retrieved only once and
+        the changes are applied with ``Config.bulk_manage_group_templates``.
         """
         Device = load_model("config", "Device")
         DeviceGroup = load_model("config", "DeviceGroup")
-        Template = load_model("config", "Template")
+        Config = load_model("config", "Config")
         if type(device_ids) is not list:
             device_ids = [device_ids]
             old_group_ids = [old_group_ids]
+        # IDs may be either UUID instances or strings
+        group_templates = {}
+        for pk in set(map(str, old_group_ids + [group_id])):
+            if pk == "None":
+                continue
+            group_templates[pk] = list(
+                DeviceGroup(pk=pk).templates.select_related("vpn")
+            )
+        devices = {
+            str(pk): device
+            for pk, device in Device.objects.select_related("config")
+            .in_bulk(device_ids)
+            .items()
+        }
+        changes = []
         for device_id, old_group_id in zip(device_ids, old_group_ids):
-            device = Device.objects.get(pk=device_id)
+            device = devices.get(str(device_id))
+            if device is None:
+                continue
             if not hasattr(device, "config"):
                 device.create_default_config()
-            config_created = hasattr(device, "config")
-            if not config_created:
+            if not hasattr(device, "config"):
                 # device has no config (device group has no templates)
-                return
-            group_templates = Template.objects.none()
-            if group_id:
-                group = DeviceGroup.objects.get(pk=group_id)
-                group_templates = group.templates.all()
-            old_group_templates = Template.objects.none()
-            if old_group_id:
-                old_group = DeviceGroup.objects.get(pk=old_group_id)
-                old_group_templates = old_group.templates.all()
-            device.config.manage_group_templates(group_templates, old_group_templates)
+                continue
+            changes.append(
+                (
+                    device.config,
+                    group_templates.get(str(group_id), []),
+                    group_templates.get(str(old_group_id), []),
+                )
+            )
+        Config.bulk_manage_group_templates(changes)
 
     @classmethod
     def config_deactivated_clear_management_ip(cls, instance, *args, **kwargs):
@@ -490,3 +510,99 @@ class AbstractDevice(OrgMixin, BaseModel):
         is changed to 'deactivated'.
         """
         cls.objects.filter(pk=instance.device_id).update(management_ip="")
+
+    @classmethod
+    def bulk_update_ip(cls, addresses):
+        """
+        Updates ``last_ip`` and ``management_ip`` of many devices at once.
+
+        ``addresses`` maps device primary keys to a tuple of
+        ``(last_ip, management_ip)``, in the order in which they were
+        received. The addresses are removed from other devices which
+        are using the same addresses (see ``UpdateLastIpMixin``) with
+        one query per organization.
+
+        Returns the set of primary keys of the devices which
+        have been modified, including devices whose addresses
+        have been removed.
+        """
+        devices = cls.objects.only(
+            "id", "organization_id", "last_ip", "management_ip"
+        ).in_bulk(list(addresses.keys()))
+        initial = {
+            pk: (device.last_ip, device.management_ip) for pk, device in devices.items()
+        }
+        # addresses assigned to more than one device of the batch
+        # are kept only by the device which reported them last
+        claimed = {}
+        for pk, (last_ip, management_ip) in addresses.items():
+            device = devices.get(pk)
+            if device is None:
+                continue
+            device.last_ip = last_ip
+            device.management_ip = management_ip
+            for (field, org_id), ip in cls._get_exclusive_ip(device):
+                previous = claimed.get((field, org_id, ip))
+                if previous is not None and previous is not device:
+                    setattr(previous, field, "")
+                claimed[(field, org_id, ip)] = device
+        devices = [
+            device
+            for pk, device in devices.items()
+            if (device.last_ip, device.management_ip) != initial[pk]
+        ]
+        if not devices:
+            return set()
+        with transaction.atomic():
+            cls.objects.bulk_update(devices, ["last_ip", "management_ip"])
+            modified = cls._bulk_remove_duplicated_ip(devices)
+        for device in devices:
+            device._check_management_ip_changed()
+        modified.update(device.pk for device in devices)
+        return modified
+
+    @classmethod
+    def _get_exclusive_ip(cls, device):
+        """
+        Yields tuples of ``((field, organization_id), ip)`` for the
+        addresses of ``device`` which cannot be shared with other devices
+        """
+        org_id = None
+        if not app_settings.SHARED_MANAGEMENT_IP_ADDRESS_SPACE:
+            org_id = device.organization_id
+        if device.management_ip:
+            yield ("management_ip", org_id), device.management_ip
+        # public last_ip addresses are allowed to be duplicated
+        if device.last_ip and ip_address(device.last_ip).is_private:
+            yield ("last_ip", org_id), device.last_ip
+
+    @classmethod
+    def _bulk_remove_duplicated_ip(cls, devices):
+        ip_groups = defaultdict(lambda: defaultdict(set))
+        for device in devices:
+            for (field, org_id), ip in cls._get_exclusive_ip(device):
+                ip_groups[org_id][field].add(ip)
+        modified = set()
+        updated_pks = [device.pk for device in devices]
+        for org_id, fields in ip_groups.items():
+            where = Q()
+            for field, ips in fields.items():
+                where |= Q(**{f"{field}__in": ips})
+            if org_id:
+                where &= Q(organization_id=org_id)
+            queryset = cls.objects.filter(where).exclude(pk__in=updated_pks)
+            pks = list(queryset.values_list("pk", flat=True))
+            if not pks:
+                continue
+            cls.objects.filter(pk__in=pks).update(
+                **{
+                    field: Case(
+                        When(**{f"{field}__in": ips}, then=Value("")),
+                        default=F(field),
+                        output_field=cls._meta.get_field(field),
+                    )
+                    for field, ips in fields.items()
+                }
+            )
+            modified.update(pks)
+        return modified
@@ -109,10 +109,17 @@ class AbstractDeviceGroup(OrgMixin, TimeStampedEditableModel):
         """
         DeviceGroup = load_model("config", "DeviceGroup")
         Template = load_model("config", "Template")
+        Config = load_model("config", "Config")
         device_group = DeviceGroup.objects.get(id=group_id)
-        templates = Template.objects.filter(pk__in=template_ids)
-        old_templates = Template.objects.filter(pk__in=old_template_ids)
-        for device in device_group.device_set.iterator():
+        templates = list(
+            Template.objects.filter(pk__in=template_ids).select_related("vpn")
+        )
+        old_templates = list(Template.objects.filter(pk__in=old_template_ids))
+        changes = []
+        for device in device_group.device_set.select_related("config").iterator():
             if not hasattr(device, "config"):
                 device.create_default_config()
-            device.config.manage_group_templates(templates, old_templates)
+            if not hasattr(device, "config"):
+                continue
+            changes.append((device.config, templates, old_templates))
+        Config.bulk_manage_group_templates(changes)
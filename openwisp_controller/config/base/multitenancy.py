@@ -1,15 +1,16 @@
 import collections
 from copy import deepcopy
+from functools import partial
 
 import swapper
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from jsonfield import JSONField
 
 from openwisp_utils.base import KeyField, UUIDModel
 
 from ..exceptions import OrganizationDeviceLimitExceeded
-from ..tasks import bulk_invalidate_config_get_cached_checksum
+from ..utils import invalidate_organization_cache
 
 
 class AbstractOrganizationConfigSettings(UUIDModel):
@@ -62,8 +63,8 @@ class AbstractOrganizationConfigSettings(UUIDModel):
             context_changed = db_instance.context != self.context
         super().save(force_insert, force_update, using, update_fields)
         if context_changed:
-            bulk_invalidate_config_get_cached_checksum.delay(
-                {"device__organization_id": str(self.organization_id)}
+            transaction.on_commit(
+                partial(invalidate_organization_cache, self.organization_id)
             )
 
 
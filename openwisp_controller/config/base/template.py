@@ -11,7 +11,9 @@ from swapper import get_model_name
 from taggit.managers import TaggableManager
 
 from ...base import ShareableOrgMixinUniqueName
+from .. import settings as app_settings
 from ..settings import DEFAULT_AUTO_CERT
+from ..signals import config_bulk_modified, config_bulk_status_changed
 from ..tasks import update_template_related_config_status
 from .base import BaseConfig
 
@@ -134,24 +136,50 @@ class AbstractTemplate(ShareableOrgMixinUniqueName, BaseConfig):
             )
 
     def _update_related_config_status(self):
-        # use atomic to ensure any code bound to
-        # be executed via transaction.on_commit
-        # is executed after the whole block
-        with transaction.atomic():
-            changing_status = list(
-                self.config_relations.exclude(status="modified").values_list(
-                    "pk", flat=True
-                )
+        """
+        Flags the related configs as modified and emits the
+        ``config_bulk_modified`` and ``config_bulk_status_changed``
+        signals, related configs are processed in chunks of
+        ``TEMPLATE_UPDATE_CHUNK_SIZE`` configs, each in its own
+        transaction, which emit one signal each
+        """
+        chunk_size = app_settings.TEMPLATE_UPDATE_CHUNK_SIZE
+        config_model = self.config_relations.model
+        queryset = self.config_relations.select_related("device").order_by("pk")
+        last_pk = None
+        while True:
+            chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            configs = list(chunk[:chunk_size])
+            if not configs:
+                break
+            last_pk = configs[-1].pk
+            # use atomic to ensure any code bound to
+            # be executed via transaction.on_commit
+            # is executed after the whole chunk
+            with transaction.atomic():
+                self._update_related_config_status_chunk(config_model, configs)
+            if len(configs) < chunk_size:
+                break
+
+    @staticmethod
+    def _update_related_config_status_chunk(config_model, configs):
+        changing_status = [config for config in configs if config.status != "modified"]
+        if changing_status:
+            # flag configs as modified with 1 update query
+            config_model.objects.filter(
+                pk__in=[config.pk for config in changing_status]
+            ).update(status="modified")
+            for config in changing_status:
+                config.status = "modified"
+        # config modified signal sent regardless
+        config_bulk_modified.send(
+            sender=config_model, instances=configs, action="related_template_changed"
+        )
+        # config status changed signal sent only if status changed
+        if changing_status:
+            config_bulk_status_changed.send(
+                sender=config_model, instances=changing_status
             )
-            # flag all related configs as modified with 1 update query
-            self.config_relations.exclude(status="modified").update(status="modified")
-            # the following loop should not take too long
-            for config in self.config_relations.select_related("device").iterator():
-                # config modified signal sent regardless
-                config._send_config_modified_signal(action="related_template_changed")
-                # config status changed signal sent only if status changed
-                if config.pk in changing_status:
-                    config._send_config_status_changed_signal()
 
     def clean(self, *args, **kwargs):
         """
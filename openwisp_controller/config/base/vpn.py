@@ -3,11 +3,12 @@ import ipaddress
 import json
 import logging
 import subprocess
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from subprocess import CalledProcessError, TimeoutExpired
 
 import shortuuid
-from cache_memoize import cache_memoize
 from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
@@ -20,7 +21,7 @@ from swapper import get_model_name
 from openwisp_utils.base import KeyField
 
 from ...base import ShareableOrgMixinUniqueName
-from .. import crypto
+from .. import crypto, keypool
 from .. import settings as app_settings
 from ..api.zerotier_service import ZerotierService
 from ..exceptions import ZeroTierIdentityGenerationError
@@ -38,11 +39,6 @@ from .base import BaseConfig
 logger = logging.getLogger(__name__)
 
 
-def _peer_cache_key(vpn):
-    """used to generate a unique cache key"""
-    return str(vpn.pk)
-
-
 class AbstractVpn(ShareableOrgMixinUniqueName, BaseConfig):
     """
     Abstract VPN model
@@ -138,6 +134,8 @@ class AbstractVpn(ShareableOrgMixinUniqueName, BaseConfig):
 
     # cache wireguard / vxlan peers for 7 days (generation is expensive)
     _PEER_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+    # maximum time in seconds a peer index update can take
+    _PEER_INDEX_LOCK_TIMEOUT = 30
 
     class Meta:
         verbose_name = _("VPN server")
@@ -253,8 +251,10 @@ class AbstractVpn(ShareableOrgMixinUniqueName, BaseConfig):
         if not self.cert and self.ca:
             self.cert = self._auto_create_cert()
         if self._is_backend_type("openvpn") and not self.dh:
-            self.dh = self._placeholder_dh
-            create_dh = True
+            self.dh = keypool.pop("dh")
+            if not self.dh:
+                self.dh = self._placeholder_dh
+                create_dh = True
         if self._is_backend_type("wireguard"):
             self._generate_wireguard_keys()
         if self.subnet and not self.ip:
@@ -668,7 +668,9 @@ class AbstractVpn(ShareableOrgMixinUniqueName, BaseConfig):
         Also sets the respctive instance attributes.
         """
         if not self.private_key or not self.public_key:
-            self.private_key, self.public_key = crypto.generate_wireguard_keys()
+            self.private_key, self.public_key = (
+                keypool.pop("wireguard") or crypto.generate_wireguard_keys()
+            )
 
     def get_config(self):
         config = super().get_config()
@@ -684,13 +686,120 @@ class AbstractVpn(ShareableOrgMixinUniqueName, BaseConfig):
         If update=True is passed,
         the peer cache will be regenerated.
         """
-        for backend in ["wireguard", "vxlan"]:
-            if self._is_backend_type(backend):
-                getattr(self, f"_get_{backend}_peers").invalidate(self)
-                if update:
-                    getattr(self, f"_get_{backend}_peers")()
-                # Send signal for peers changed
-                vpn_peers_changed.send(sender=self.__class__, instance=self)
+        if not self._has_peers():
+            return
+        self._set_peer_index_version()
+        cache.delete(self._get_peer_index_cache_key())
+        if update:
+            self._get_peer_index()
+        # Send signal for peers changed
+        vpn_peers_changed.send(sender=self.__class__, instance=self)
+
+    def _update_peer_cache(self, clients=None, removed=None):
+        """Applies changes to the peer cache incrementally.
+
+        ``clients`` is a list of VPN clients which have been
+        added or modified, ``removed`` is a list of primary keys
+        of VPN clients which have been deleted.
+        """
+        if not self._has_peers():
+            return
+        key = self._get_peer_index_cache_key()
+        lock_key = f"{key}-lock"
+        dirty_key = f"{key}-dirty"
+        # indexes being regenerated from the database
+        # may miss this change, hence they are discarded
+        self._set_peer_index_version()
+        # if the peer index is being updated by another process,
+        # the changes could be lost, hence the index is deleted and
+        # the other process is notified to delete it as well,
+        # it will be regenerated from the database when needed
+        if not cache.add(lock_key, True, self._PEER_INDEX_LOCK_TIMEOUT):
+            cache.set(dirty_key, True, self._PEER_INDEX_LOCK_TIMEOUT)
+            cache.delete(key)
+        else:
+            try:
+                index = cache.get(key)
+                # a missing index is regenerated when needed
+                if index is not None:
+                    for client in clients or []:
+                        if client.auto_cert:
+                            index[str(client.pk)] = self._get_peer_index_entry(client)
+                        else:
+                            index.pop(str(client.pk), None)
+                    for pk in removed or []:
+                        index.pop(str(pk), None)
+                    cache.set(key, index, self._PEER_CACHE_TIMEOUT)
+                if cache.get(dirty_key):
+                    cache.delete_many([key, dirty_key])
+            finally:
+                cache.delete(lock_key)
+        # Send signal for peers changed
+        vpn_peers_changed.send(sender=self.__class__, instance=self)
+
+    def _has_peers(self):
+        return self._is_backend_type("wireguard") or self._is_backend_type("vxlan")
+
+    def _get_peer_index_cache_key(self):
+        return f"vpn-peers-{self.pk}"
+
+    def _get_peer_index(self):
+        """Returns the peer index, the result is cached.
+
+        The peer index is a dictionary which maps the primary key
+        of each peer to the data needed to generate the peer lists
+        (see ``_get_peer_index_entry``), it's generated from the
+        database only when it's not cached, afterwards it is kept
+        up to date incrementally by ``_update_peer_cache``.
+        """
+        key = self._get_peer_index_cache_key()
+        index = cache.get(key)
+        if index is None:
+            version = cache.get(f"{key}-version")
+            index = {
+                str(vpnclient.pk): self._get_peer_index_entry(vpnclient)
+                for vpnclient in self._get_peer_queryset()
+            }
+            self._set_peer_index(index, version)
+        return index
+
+    def _set_peer_index(self, index, version):
+        """Caches the peer index regenerated from the database.
+
+        The index is discarded if the peers changed after ``version``
+        was read (the changes may be missing from the index), the
+        locking protocol is the same of ``_update_peer_cache``.
+        """
+        key = self._get_peer_index_cache_key()
+        lock_key = f"{key}-lock"
+        dirty_key = f"{key}-dirty"
+        if not cache.add(lock_key, True, self._PEER_INDEX_LOCK_TIMEOUT):
+            return
+        try:
+            if cache.get(f"{key}-version") != version:
+                return
+            cache.set(key, index, self._PEER_CACHE_TIMEOUT)
+            if cache.get(dirty_key):
+                cache.delete_many([key, dirty_key])
+        finally:
+            cache.delete(lock_key)
+
+    def _set_peer_index_version(self):
+        # random values, unlike counters, are never
+        # reused if the key is evicted from the cache
+        cache.set(
+            f"{self._get_peer_index_cache_key()}-version",
+            uuid.uuid4().hex,
+            self._PEER_CACHE_TIMEOUT,
+        )
+
+    @staticmethod
+    def _get_peer_index_entry(vpnclient):
+        return {
+            "public_key": vpnclient.public_key,
+            "vni": vpnclient.vni,
+            "ip_address": vpnclient.ip.ip_address if vpnclient.ip else None,
+        }
 
     def _get_peer_queryset(self):
         """Returns peer queryset.
@@ -732,16 +841,15 @@ class AbstractVpn(ShareableOrgMixinUniqueName, BaseConfig):
         # internal IP address of wireguard interface
         config["wireguard"][0]["address"] = "{{ ip_address }}/{{ subnet_prefixlen }}"
 
-    @cache_memoize(_PEER_CACHE_TIMEOUT, args_rewrite=_peer_cache_key)
     def _get_wireguard_peers(self):
-        """Returns list of wireguard peers, the result is cached."""
+        """Returns list of wireguard peers, generated from the peer index."""
         peers = []
-        for vpnclient in self._get_peer_queryset():
-            if vpnclient.ip:
-                ip_address = ipaddress.ip_address(vpnclient.ip.ip_address)
+        for peer in self._get_peer_index().values():
+            if peer["ip_address"]:
+                ip_address = ipaddress.ip_address(peer["ip_address"])
                 peers.append(
                     {
-                        "public_key": vpnclient.public_key,
+                        "public_key": peer["public_key"],
                         "allowed_ips": f"{ip_address}/{ip_address.max_prefixlen}",
                     }
                 )
@@ -769,18 +877,17 @@ class AbstractVpn(ShareableOrgMixinUniqueName, BaseConfig):
         if self._is_backend_type("vxlan"):
             return self.config.get("vxlan", [{}])[0].get("vni")
 
-    @cache_memoize(_PEER_CACHE_TIMEOUT, args_rewrite=_peer_cache_key)
     def _get_vxlan_peers(self):
         """
-        Returns list of vxlan peers, the result is cached.
+        Returns list of vxlan peers, generated from the peer index.
         """
         peers = []
         vxlan_interface = self.config.get("vxlan", [{}])[0].get("name")
         vni = self._vxlan_vni
-        for vpnclient in self._get_peer_queryset():
-            if not vpnclient.ip:
+        for entry in self._get_peer_index().values():
+            if not entry["ip_address"]:
                 continue
-            peer = {"vni": vpnclient.vni or vni, "remote": vpnclient.ip.ip_address}
+            peer = {"vni": entry["vni"] or vni, "remote": entry["ip_address"]}
             if vxlan_interface:
                 peer["interface"] = vxlan_interface
             peers.append(peer)
@@ -899,12 +1006,166 @@ class AbstractVpnClient(models.Model):
         common_name = f"{common_name}-{unique_slug}"
         return common_name
 
+    @classmethod
+    def bulk_provision(cls, clients):
+        """
+        Set based version of ``save`` for new VPN clients.
+
+        The clients are validated with ``full_clean`` before being
+        provisioned, IP addresses are allocated from each subnet in a
+        single pass, VNIs are assigned starting from a single query,
+        ZeroTier identities are generated concurrently and the rows are
+        inserted with ``bulk_create``. The ``post_save`` signal
+        is still sent for each client, but the peer cache
+        of each VPN is updated only once.
+        """
+        if not clients:
+            return clients
+        for client in clients:
+            client.full_clean()
+        with transaction.atomic():
+            auto_clients = [client for client in clients if client.auto_cert]
+            for client in auto_clients:
+                client._auto_x509()
+            cls._bulk_auto_ip(auto_clients)
+            for client in auto_clients:
+                client._auto_wireguard()
+            cls._bulk_auto_vxlan(auto_clients)
+            cls._bulk_auto_secret(auto_clients)
+            cls.objects.bulk_create(clients)
+            vpn_clients = collections.defaultdict(list)
+            for client in clients:
+                vpn_clients[client.vpn].append(client)
+                client._bulk_provisioned = True
+                models.signals.post_save.send(
+                    sender=cls,
+                    instance=client,
+                    created=True,
+                    update_fields=None,
+                    raw=False,
+                    using=client._state.db,
+                )
+
+        def _update_peer_cache():
+            for vpn, vpn_client_list in vpn_clients.items():
+                vpn._update_peer_cache(clients=vpn_client_list)
+
+        transaction.on_commit(_update_peer_cache)
+        return clients
+
+    @classmethod
+    def _bulk_auto_ip(cls, clients):
+        """
+        Allocates the IP addresses of ``clients``
+        reading the used addresses of each subnet only once,
+        must be called inside a ``transaction.atomic`` block
+        """
+        subnets = {}
+        subnet_clients = collections.defaultdict(list)
+        for client in clients:
+            subnet = client.vpn.subnet
+            if not subnet:
+                continue
+            if any(func(client) for func in cls._auto_ip_stopper_funcs):
+                continue
+            subnets[subnet.pk] = subnet
+            subnet_clients[subnet.pk].append(client)
+        ip_model = cls.ip.field.related_model
+        # locks the subnets until the end of the transaction,
+        # otherwise concurrent allocations could assign the same
+        # addresses (the subnets are locked in a consistent order)
+        list(
+            ip_model.subnet.field.related_model.objects.select_for_update()
+            .filter(pk__in=subnets.keys())
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        ips = []
+        for subnet_id, subnet in subnets.items():
+            used = set(subnet.ipaddress_set.values_list("ip_address", flat=True))
+            hosts = (
+                str(host) for host in subnet.subnet.hosts() if str(host) not in used
+            )
+            # clients left over when the subnet
+            # is exhausted do not get an IP address,
+            # like it happens with ``Subnet.request_ip``
+            for client, host in zip(subnet_clients[subnet_id], hosts):
+                client.ip = ip_model(subnet=subnet, ip_address=host)
+                ips.append(client.ip)
+        ip_model.objects.bulk_create(ips)
+
+    @classmethod
+    def _bulk_auto_vxlan(cls, clients):
+        """
+        Assigns the VNIs of ``clients`` starting
+        from the highest VNI used by each VPN
+        """
+        vpn_clients = collections.defaultdict(list)
+        for client in clients:
+            vpn = client.vpn
+            if not vpn._is_backend_type("vxlan") or client.vni or vpn._vxlan_vni:
+                continue
+            vpn_clients[vpn.pk].append(client)
+        if not vpn_clients:
+            return
+        last_vnis = dict(
+            cls.objects.filter(vpn_id__in=vpn_clients.keys())
+            .values("vpn_id")
+            .annotate(last_vni=models.Max("vni"))
+            .values_list("vpn_id", "last_vni")
+        )
+        for vpn_id, vpn_client_list in vpn_clients.items():
+            vni = last_vnis.get(vpn_id) or 0
+            for client in vpn_client_list:
+                vni += 1
+                client.vni = vni
+
+    @classmethod
+    def _bulk_auto_secret(cls, clients):
+        """
+        Assigns the ZeroTier identities of ``clients``, existing
+        identities are re-used (like ``_auto_secret`` does),
+        the missing ones are generated concurrently
+        """
+        zt_clients = [
+            client
+            for client in clients
+            if client.vpn._is_backend_type("zerotier") and not client.secret
+        ]
+        if not zt_clients:
+            return
+        secrets = {}
+        queryset = cls.objects.filter(
+            config_id__in={client.config_id for client in zt_clients},
+            vpn__backend__in={client.vpn.backend for client in zt_clients},
+        ).values_list("config_id", "vpn__backend", "secret")
+        for config_id, backend, secret in queryset:
+            secrets.setdefault((config_id, backend), secret)
+        # clients of the same config and backend share the same identity
+        missing = {}
+        for client in zt_clients:
+            key = (client.config_id, client.vpn.backend)
+            if key not in secrets:
+                missing.setdefault(key, client)
+        if missing:
+            # the identities are generated by a subprocess,
+            # hence threads are enough to generate them in parallel
+            with ThreadPoolExecutor() as executor:
+                generated = executor.map(
+                    lambda client: client._generate_zt_identity(), missing.values()
+                )
+                secrets.update(zip(missing.keys(), generated))
+        for client in zt_clients:
+            client.secret = secrets[(client.config_id, client.vpn.backend)]
+
     @classmethod
     def post_save(cls, instance, **kwargs):
         def _post_save():
-            instance.vpn._invalidate_peer_cache(update=True)
+            instance.vpn._update_peer_cache(clients=[instance])
 
-        transaction.on_commit(_post_save)
+        # the peer cache is updated once by ``bulk_provision``
+        if not getattr(instance, "_bulk_provisioned", False):
+            transaction.on_commit(_post_save)
         # ZT network member should be authorized and assigned
         # an IP after the creation of the VPN client object
         if instance.vpn._is_backend_type("zerotier"):
@@ -920,9 +1181,9 @@ class AbstractVpnClient(models.Model):
         Automatically deletes related certificates
         and ip addresses if necessary.
         """
-        # only invalidates, does not regenerate the cache
-        # to avoid generating high load during bulk deletes
-        instance.vpn._invalidate_peer_cache()
+        vpn = instance.vpn
+        pk = instance.pk
+        transaction.on_commit(lambda: vpn._update_peer_cache(removed=[pk]))
         # Zt network member should leave the
         # network after deletion of vpn client object
         if instance.vpn._is_backend_type("zerotier"):
@@ -987,7 +1248,9 @@ class AbstractVpnClient(models.Model):
             self.private_key and self.public_key
         ):
             return
-        self.private_key, self.public_key = crypto.generate_wireguard_keys()
+        self.private_key, self.public_key = (
+            keypool.pop("wireguard") or crypto.generate_wireguard_keys()
+        )
 
     def _auto_vxlan(self):
         """
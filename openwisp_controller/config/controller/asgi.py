@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.urls import reverse
+
+from ..signals import checksum_requested
+from ..utils import get_organization_cache_generation_key
+from .views import DeviceChecksumView
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceChecksumFastPath(object):
+    """
+    ASGI application which answers the checksum requests of devices
+    by looking up only the cache entries maintained by ``DeviceChecksumView``,
+    without going through the Django middlewares and views.
+
+    Requests which cannot be answered this way (eg: cache miss, wrong key,
+    addresses of the device changed) and any other request are passed
+    to ``application``, usually the ASGI application of Django.
+
+    The ``checksum_requested`` signal is sent in background
+    (``request`` is ``None``), in batches, through a bounded queue.
+    """
+
+    # maximum amount of checksum_requested signals waiting to be sent,
+    # further signals are dropped when the queue is full
+    queue_size = 10000
+
+    def __init__(self, application):
+        self.application = application
+        self._path_regex = None
+        self._queue = None
+        self._loop = None
+        self._worker = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "GET":
+            match = self.path_regex.match(scope["path"])
+            if match:
+                checksum = await self.get_checksum(scope, match.group("pk"))
+                if checksum is not None:
+                    await self.send_response(send, checksum)
+                    return
+        await self.application(scope, receive, send)
+
+    @property
+    def path_regex(self):
+        if self._path_regex is None:
+            path = reverse("controller:device_checksum", args=["__pk__"])
+            self._path_regex = re.compile(
+                "^{0}$".format(re.escape(path).replace("__pk__", "(?P<pk>[^/]+)"))
+            )
+        return self._path_regex
+
+    async def get_checksum(self, scope, pk):
+        """
+        returns the cached checksum or ``None`` if
+        the request must be handled by ``application``
+        """
+        params = parse_qs(scope["query_string"].decode(), keep_blank_values=True)
+        key = params.get("key", [None])[-1]
+        if not key:
+            return None
+        view = DeviceChecksumView()
+        view.kwargs = {"pk": pk}
+        device = await cache.aget(view.get_device.get_cache_key(view))
+        if device is None or device.key != key:
+            return None
+        generation = await cache.aget(
+            get_organization_cache_generation_key(device.organization_id)
+        )
+        # the cache entry is outdated (or the generation
+        # is missing and must be seeded by the view)
+        if (
+            generation is None
+            or getattr(device, "_organization_cache_generation", None) != generation
+        ):
+            return None
+        ip = scope["client"][0] if scope.get("client") else None
+        management_ip = params.get("management_ip", [None])[-1]
+        # addresses need to be updated
+        if device.last_ip != ip or device.management_ip != management_ip:
+            return None
+        config = device.config
+        config._organization_cache_generation = generation
+        checksum = await cache.aget(config.get_cached_checksum.get_cache_key(config))
+        if checksum is None:
+            return None
+        self.notify(device)
+        return checksum
+
+    @staticmethod
+    async def send_response(send, checksum):
+        body = checksum.encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/plain"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"x-openwisp-controller", b"true"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    def notify(self, device):
+        """
+        queues the ``checksum_requested`` signal
+        """
+        if not checksum_requested.has_listeners(device.__class__):
+            return
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._worker = loop.create_task(self._consume_queue())
+        try:
+            self._queue.put_nowait(device)
+        except asyncio.QueueFull:
+            logger.warning(
+                f"checksum_requested queue is full, signal for device ID "
+                f"{device.pk} dropped"
+            )
+
+    async def _consume_queue(self):
+        while True:
+            devices = [await self._queue.get()]
+            while not self._queue.empty():
+                devices.append(self._queue.get_nowait())
+            try:
+                await sync_to_async(self._send_checksum_requested)(devices)
+            finally:
+                for _ in devices:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _send_checksum_requested(devices):
+        for device in devices:
+            responses = checksum_requested.send_robust(
+                sender=device.__class__, instance=device, request=None
+            )
+            for receiver, response in responses:
+                if isinstance(response, Exception):
+                    logger.error(
+                        f"{receiver} failed to handle checksum_requested "
+                        f"for device ID {device.pk}: {response}"
+                    )
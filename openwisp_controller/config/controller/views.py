@@ -17,10 +17,16 @@ from swapper import load_model
 
 from .. import settings as app_settings
 from ..signals import checksum_requested, config_download_requested, device_registered
+from ..tasks import flush_device_ip_batch
 from ..utils import (
     ControllerResponse,
+    buffer_device_ip,
+    bulk_invalidate_cache,
     forbid_unallowed,
+    get_device_ip_batch_countdown,
     get_object_or_404,
+    get_organization_cache_epoch,
+    get_organization_cache_generation,
     invalid_response,
     send_device_config,
     send_vpn_config,
@@ -133,13 +139,14 @@ class DeviceChecksumView(UpdateLastIpMixin, GetDeviceView):
     """
 
     def get(self, request, pk):
-        device = self.get_device()
+        device = self.get_cached_device()
         bad_request = forbid_unallowed(request, "GET", "key", device.key)
         if bad_request:
             return bad_request
-        updated = self.update_last_ip(device, request)
+        if app_settings.DEVICE_IP_FLUSH_INTERVAL:
+            self.buffer_device_ip(device, request)
         # updates cache if ip addresses changed
-        if updated:
+        elif self.update_last_ip(device, request):
             self.update_device_cache(device)
         checksum_requested.send(
             sender=device.__class__, instance=device, request=request
@@ -154,7 +161,42 @@ class DeviceChecksumView(UpdateLastIpMixin, GetDeviceView):
     def get_device(self):
         pk = self.kwargs["pk"]
         logger.debug(f"retrieving device ID {pk} from DB")
-        return self.get_object(pk=pk)
+        # read before the device, which could otherwise be stamped with
+        # a generation incremented after retrieving outdated data
+        epoch = get_organization_cache_epoch()
+        device = self.get_object(pk=pk)
+        # entries stamped with an older generation are outdated
+        device._organization_cache_generation = get_organization_cache_generation(
+            device.organization_id, epoch
+        )
+        return device
+
+    def get_cached_device(self):
+        """
+        returns the device from ``get_device``, which is retrieved
+        again from the DB if the cache entry is older than the
+        cache generation of its organization
+        """
+        device = self.get_device()
+        generation = get_organization_cache_generation(device.organization_id)
+        if getattr(device, "_organization_cache_generation", None) != generation:
+            self.get_device.invalidate(self)
+            device = self.get_device()
+            generation = device._organization_cache_generation
+        # saves a lookup when the cache key of the checksum is calculated
+        device.config._organization_cache_generation = generation
+        return device
+
+    def buffer_device_ip(self, device, request):
+        """
+        Defers the update of the addresses to a background task
+        which saves all the changes received in a time window at once
+        """
+        batch = buffer_device_ip(device, request)
+        if batch is not None:
+            flush_device_ip_batch.apply_async(
+                args=[batch], countdown=get_device_ip_batch_countdown(batch)
+            )
 
     def update_device_cache(self, device):
         cache.set(self.get_device.get_cache_key(self), device)
@@ -170,6 +212,21 @@ class DeviceChecksumView(UpdateLastIpMixin, GetDeviceView):
         view.get_device.invalidate(view)
         logger.debug(f"invalidated view cache for device ID {pk}")
 
+    @classmethod
+    def bulk_invalidate_get_device_cache(cls, pks):
+        """
+        Performs cache invalidation of many devices at once
+        """
+
+        def get_cache_keys():
+            view = cls()
+            for pk in pks:
+                view.kwargs = {"pk": str(pk)}
+                yield view.get_device.get_cache_key(view)
+
+        count = bulk_invalidate_cache(get_cache_keys())
+        logger.debug(f"invalidated view cache for {count} devices")
+
     @classmethod
     def invalidate_get_device_cache_on_config_deactivated(cls, instance, **kwargs):
         """
@@ -186,6 +243,15 @@ class DeviceChecksumView(UpdateLastIpMixin, GetDeviceView):
         instance.get_cached_checksum.invalidate(instance)
         logger.debug(f"invalidated checksum cache for device ID {device.pk}")
 
+    @classmethod
+    def bulk_invalidate_checksum_cache(cls, instances, **kwargs):
+        """
+        Called from signal receiver which performs cache invalidation
+        of many configs at once
+        """
+        Config.bulk_invalidate_get_cached_checksum_of(instances)
+        logger.debug(f"invalidated checksum cache for {len(instances)} configs")
+
 
 class DeviceDownloadConfigView(GetDeviceView):
     """
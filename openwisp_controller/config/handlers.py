@@ -1,3 +1,5 @@
+from functools import partial
+
 from django.db import transaction
 from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
@@ -8,6 +10,7 @@ from openwisp_controller.config.controller.views import DeviceChecksumView
 
 from . import tasks
 from .signals import config_status_changed, device_registered
+from .utils import invalidate_organization_cache
 
 Config = load_model("config", "Config")
 Device = load_model("config", "Device")
@@ -140,7 +143,8 @@ def devicegroup_templates_change_handler(instance, **kwargs):
 
 def organization_disabled_handler(instance, **kwargs):
     """
-    Asynchronously invalidates DeviceCheckView.get_device cache
+    Invalidates the cache entries of the organization,
+    including the DeviceChecksumView.get_device cache
     """
     if instance.is_active:
         return
@@ -151,4 +155,6 @@ def organization_disabled_handler(instance, **kwargs):
     if instance.is_active == db_instance.is_active:
         # No change in is_active
         return
-    tasks.invalidate_device_checksum_view_cache.delay(str(instance.id))
+    # the cache entries retrieved before the end
+    # of the transaction would be outdated
+    transaction.on_commit(partial(invalidate_organization_cache, instance.id))
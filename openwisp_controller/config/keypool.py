@@ -0,0 +1,148 @@
+"""
+Pool of pre-generated key material (DH parameters and WireGuard keys),
+which allows VPN servers and clients to be created without waiting
+for CPU intensive operations.
+
+The items of each pool are stored in the cache and are consumed
+in FIFO order using two atomic counters (``head`` and ``tail``).
+Items expire after ``ITEM_TIMEOUT`` seconds, so that private keys
+are not kept indefinitely in the cache: consumers treat expired
+items as missing and the refill replaces them.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.db import transaction
+from swapper import load_model
+
+from . import crypto
+from . import settings as app_settings
+from .tasks import refill_key_pool
+
+logger = logging.getLogger(__name__)
+
+DH_LENGTH = 2048
+# maximum time in seconds a refill can take
+REFILL_LOCK_TIMEOUT = 7200
+# time in seconds after which unused items expire
+ITEM_TIMEOUT = 86400
+
+
+def _generate_dh():
+    Vpn = load_model("config", "Vpn")
+    return Vpn.dhparam(DH_LENGTH)
+
+
+GENERATORS = {
+    "dh": _generate_dh,
+    "wireguard": crypto.generate_wireguard_keys,
+}
+
+
+def _get_cache_key(kind, suffix):
+    return f"key-pool-{kind}-{suffix}"
+
+
+def _get_counter(kind, name):
+    return cache.get(_get_cache_key(kind, name), 0)
+
+
+def _incr_counter(kind, name):
+    key = _get_cache_key(kind, name)
+    cache.add(key, 0, timeout=None)
+    return cache.incr(key)
+
+
+def get_size(kind):
+    """
+    returns the amount of items of ``kind``
+    which shall be kept in the pool
+    """
+    return app_settings.KEY_POOL_SIZE.get(kind, 0)
+
+
+def get_stock(kind):
+    """
+    returns the amount of items of ``kind``
+    which are available in the pool
+    """
+    return max(_get_counter(kind, "tail") - _get_counter(kind, "head"), 0)
+
+
+def pop(kind):
+    """
+    returns an item of ``kind`` from the pool, or ``None``
+    if the pool is disabled or empty, in which case the
+    caller is expected to generate the item on its own
+    """
+    if not get_size(kind):
+        return None
+    item = None
+    if get_stock(kind):
+        index = _incr_counter(kind, "head")
+        item_key = _get_cache_key(kind, index)
+        # the item may have been taken by a concurrent consumer
+        item = cache.get(item_key)
+        cache.delete(item_key)
+    schedule_refill()
+    return item
+
+
+def schedule_refill():
+    """
+    schedules the ``refill_key_pool`` task, unless
+    it has already been scheduled in the last minute
+    """
+    if cache.add(_get_cache_key("refill", "scheduled"), True, timeout=60):
+        transaction.on_commit(refill_key_pool.delay)
+
+
+def refill_all():
+    """
+    refills all the enabled pools
+    """
+    cache.delete(_get_cache_key("refill", "scheduled"))
+    for kind in GENERATORS.keys():
+        if get_size(kind):
+            refill(kind)
+
+
+def refill(kind):
+    """
+    generates the items of ``kind`` missing from the pool,
+    the items are generated concurrently, DH parameters
+    are generated by ``openssl`` processes
+    """
+    lock_key = _get_cache_key(kind, "lock")
+    # only one process at time shall add items to a pool
+    if not cache.add(lock_key, True, timeout=REFILL_LOCK_TIMEOUT):
+        return 0
+    try:
+        head = _get_counter(kind, "head")
+        tail = _get_counter(kind, "tail")
+        # consumers may have gone past the tail of an empty pool
+        if head > tail:
+            cache.set(_get_cache_key(kind, "tail"), head, timeout=None)
+            tail = head
+        # expired items are not counted
+        available = cache.get_many(
+            [_get_cache_key(kind, index) for index in range(head + 1, tail + 1)]
+        )
+        missing = get_size(kind) - len(available)
+        if missing <= 0:
+            return 0
+        generator = GENERATORS[kind]
+        with ThreadPoolExecutor(max_workers=app_settings.KEY_POOL_WORKERS) as executor:
+            items = executor.map(lambda _: generator(), range(missing))
+            for item in items:
+                tail += 1
+                # the item must be stored before the
+                # counter is incremented to make it available
+                cache.set(_get_cache_key(kind, tail), item, timeout=ITEM_TIMEOUT)
+                _incr_counter(kind, "tail")
+        logger.info(f'Added {missing} items to the "{kind}" key pool')
+        return missing
+    finally:
+        cache.delete(lock_key)
@@ -38,6 +38,24 @@ assert isinstance(CONTEXT, dict), "OPENWISP_CONTROLLER_CONTEXT must be a diction
 DEFAULT_AUTO_CERT = get_setting("DEFAULT_AUTO_CERT", True)
 CERT_PATH = get_setting("CERT_PATH", "/etc/x509")
 COMMON_NAME_FORMAT = get_setting("COMMON_NAME_FORMAT", "{mac_address}-{name}")
+CONFIG_ARCHIVE_CACHE_TIMEOUT = get_setting("CONFIG_ARCHIVE_CACHE_TIMEOUT", 60 * 60 * 24)
+CONFIG_ARCHIVE_SENDFILE = get_setting("CONFIG_ARCHIVE_SENDFILE", None)
+assert CONFIG_ARCHIVE_SENDFILE in [None, "X-Accel-Redirect", "X-Sendfile"], (
+    "OPENWISP_CONTROLLER_CONFIG_ARCHIVE_SENDFILE must be "
+    'one of: None, "X-Accel-Redirect", "X-Sendfile"'
+)
+CONFIG_ARCHIVE_ROOT = get_setting("CONFIG_ARCHIVE_ROOT", None)
+assert not CONFIG_ARCHIVE_SENDFILE or CONFIG_ARCHIVE_ROOT, (
+    "OPENWISP_CONTROLLER_CONFIG_ARCHIVE_ROOT must be set "
+    "when OPENWISP_CONTROLLER_CONFIG_ARCHIVE_SENDFILE is enabled"
+)
+CONFIG_ARCHIVE_URL = get_setting("CONFIG_ARCHIVE_URL", "/config-archives/")
+TEMPLATE_UPDATE_CHUNK_SIZE = get_setting("TEMPLATE_UPDATE_CHUNK_SIZE", 1000)
+KEY_POOL_SIZE = get_setting("KEY_POOL_SIZE", {"dh": 0, "wireguard": 0})
+assert isinstance(
+    KEY_POOL_SIZE, dict
+), "OPENWISP_CONTROLLER_KEY_POOL_SIZE must be a dictionary"
+KEY_POOL_WORKERS = get_setting("KEY_POOL_WORKERS", None)
 MANAGEMENT_IP_DEVICE_LIST = get_setting("MANAGEMENT_IP_DEVICE_LIST", True)
 CONFIG_BACKEND_FIELD_SHOWN = get_setting("CONFIG_BACKEND_FIELD_SHOWN", True)
 
@@ -60,6 +78,7 @@ DEVICE_GROUP_SCHEMA = get_setting(
 SHARED_MANAGEMENT_IP_ADDRESS_SPACE = get_setting(
     "SHARED_MANAGEMENT_IP_ADDRESS_SPACE", True
 )
+DEVICE_IP_FLUSH_INTERVAL = get_setting("DEVICE_IP_FLUSH_INTERVAL", 0)
 DSA_OS_MAPPING = get_setting("DSA_OS_MAPPING", {})
 DSA_DEFAULT_FALLBACK = get_setting("DSA_DEFAULT_FALLBACK", True)
 GROUP_PIE_CHART = get_setting("GROUP_PIE_CHART", False)
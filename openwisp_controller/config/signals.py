@@ -17,6 +17,14 @@ config_modified = Signal()
 config_modified.__doc__ = """
 Providing arguments: ['instance', 'device', 'config', 'previous_status', 'action']
 """
+config_bulk_modified = Signal()
+config_bulk_modified.__doc__ = """
+Providing arguments: ['instances', 'action']
+"""
+config_bulk_status_changed = Signal()
+config_bulk_status_changed.__doc__ = """
+Providing arguments: ['instances']
+"""
 config_deactivated = Signal()
 config_deactivated.__doc__ = """
 Providing arguments: ['instance', 'previous_status']
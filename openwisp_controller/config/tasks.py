@@ -56,6 +56,32 @@ def create_vpn_dh(vpn_pk):
         vpn.save()
 
 
+@shared_task(soft_time_limit=7200)
+def refill_key_pool():
+    """
+    Adds the missing items to the pools of pre-generated key material
+    """
+    from . import keypool
+
+    try:
+        keypool.refill_all()
+    except SoftTimeLimitExceeded:
+        logger.error("soft time limit hit while refilling the key pool")
+
+
+@shared_task(soft_time_limit=7200)
+def prune_config_archives():
+    """
+    Deletes the outdated configuration
+    archives from ``CONFIG_ARCHIVE_ROOT``
+    """
+    from .utils import prune_offloaded_files
+
+    count = prune_offloaded_files()
+    if count:
+        logger.info(f"deleted {count} outdated configuration archives")
+
+
 @shared_task(soft_time_limit=7200)
 def invalidate_devicegroup_cache_change(instance_id, model_name):
     from .api.views import DeviceGroupCommonName
@@ -150,10 +176,23 @@ def bulk_invalidate_config_get_cached_checksum(query_params):
 
 @shared_task(base=OpenwispCeleryTask)
 def invalidate_device_checksum_view_cache(organization_id):
+    from .utils import invalidate_organization_cache
+
+    invalidate_organization_cache(organization_id)
+
+
+@shared_task(base=OpenwispCeleryTask)
+def flush_device_ip_batch(batch):
+    """
+    Saves the device addresses buffered by ``buffer_device_ip``
+    """
     from .controller.views import DeviceChecksumView
+    from .utils import get_device_ip_batch
 
     Device = load_model("config", "Device")
-    for device in (
-        Device.objects.filter(organization_id=organization_id).only("id").iterator()
-    ):
-        DeviceChecksumView.invalidate_get_device_cache(device)
+    addresses = get_device_ip_batch(batch)
+    if not addresses:
+        return
+    DeviceChecksumView.bulk_invalidate_get_device_cache(
+        Device.bulk_update_ip(addresses)
+    )
@@ -20,6 +20,7 @@ Device = load_model("config", "Device")
 Template = load_model("config", "Template")
 Vpn = load_model("config", "Vpn")
 Ca = load_model("django_x509", "Ca")
+OrganizationConfigSettings = load_model("config", "OrganizationConfigSettings")
 
 
 class TestConfig(
@@ -838,6 +839,55 @@ class TestConfig(
         system_context = config.get_system_context()
         self.assertNotIn("test", system_context.keys())
 
+    def test_prefetch_context(self):
+        org = self._get_org()
+        OrganizationConfigSettings.objects.create(
+            organization=org, context={"org_var": "org"}
+        )
+        group = self._create_device_group(
+            organization=org, context={"group_var": "group"}
+        )
+        template = self._create_template(
+            type="vpn", auto_cert=True, vpn=self._create_vpn()
+        )
+        for index in range(3):
+            device = self._create_device(
+                name=f"device{index}",
+                mac_address=f"00:11:22:33:44:{index:02}",
+                organization=org,
+                group=group,
+            )
+            config = self._create_config(device=device)
+            config.templates.add(template)
+        expected = {config.pk: config.get_context() for config in Config.objects.all()}
+        configs = list(Config.objects.all())
+        Config.prefetch_context(configs)
+        with self.assertNumQueries(0):
+            for config in configs:
+                self.assertEqual(config.get_context(), expected[config.pk])
+        self.assertEqual(config.get_context()["org_var"], "org")
+        self.assertEqual(config.get_context()["group_var"], "group")
+        config.invalidate_context()
+        self.assertEqual(config._context_blocks, {})
+        self.assertNotIn("vpnclient_set", config._prefetched_objects_cache)
+
+    def test_bulk_get_cached_checksum(self):
+        org = self._get_org()
+        for index in range(3):
+            self._create_config(
+                device=self._create_device(
+                    name=f"device{index}",
+                    mac_address=f"00:11:22:33:44:{index:02}",
+                    organization=org,
+                )
+            )
+        checksums = Config.bulk_get_cached_checksum(
+            Config.objects.select_related("device"), chunk_size=2
+        )
+        self.assertEqual(len(checksums), 3)
+        for config in Config.objects.all():
+            self.assertEqual(checksums[config.pk], config.get_cached_checksum())
+
     def test_initial_status(self):
         config = self._create_config(
             organization=self._get_org(), context={"test": "value"}
@@ -1,6 +1,9 @@
+import os
 from hashlib import md5
-from unittest.mock import patch
+from tempfile import TemporaryDirectory
+from unittest.mock import AsyncMock, patch
 
+from asgiref.sync import async_to_sync
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.http.response import Http404
@@ -12,6 +15,7 @@ from openwisp_utils.tests import capture_any_output, catch_signal
 
 from .. import settings as app_settings
 from ..base.config import logger as config_model_logger
+from ..controller.asgi import DeviceChecksumFastPath
 from ..controller.views import DeviceChecksumView
 from ..controller.views import logger as controller_views_logger
 from ..signals import (
@@ -21,6 +25,17 @@ from ..signals import (
     config_status_changed,
     device_registered,
 )
+from ..tasks import (
+    flush_device_ip_batch,
+    invalidate_device_checksum_view_cache,
+    prune_config_archives,
+)
+from ..utils import (
+    bulk_invalidate_cache,
+    get_organization_cache_generation,
+    get_organization_cache_generation_key,
+    invalidate_organization_cache,
+)
 from .utils import CreateConfigTemplateMixin, TestVpnX509Mixin
 
 TEST_MACADDR = "00:11:22:33:44:55"
@@ -67,7 +82,8 @@ class TestController(CreateConfigTemplateMixin, TestVpnX509Mixin, TestCase):
         # Disable organization
         org = org or getattr(obj, "organization")
         org.is_active = False
-        org.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            org.save()
         response = method(url, {"key": obj.key})
         self.assertEqual(response.status_code, 404)
 
@@ -171,6 +187,131 @@ class TestController(CreateConfigTemplateMixin, TestVpnX509Mixin, TestCase):
                 with self.assertRaises(Http404):
                     view.get_device()
 
+    def test_bulk_invalidate_cache(self):
+        org = self._get_org()
+        devices = [
+            self._create_device_config(
+                device_opts={
+                    "name": f"device{index}",
+                    "mac_address": f"00:11:22:33:44:0{index}",
+                    "organization": org,
+                }
+            )
+            for index in range(3)
+        ]
+        views = []
+        for device in devices:
+            view = DeviceChecksumView()
+            view.kwargs = {"pk": str(device.pk)}
+            view.get_device()
+            device.config.get_cached_checksum()
+            views.append(view)
+
+        with self.subTest("device cache invalidated in chunks"):
+            with patch(
+                "django.core.cache.cache.delete_many", wraps=cache.delete_many
+            ) as mocked_delete_many:
+                DeviceChecksumView.bulk_invalidate_get_device_cache(
+                    [device.pk for device in devices]
+                )
+            self.assertEqual(mocked_delete_many.call_count, 1)
+            for view in views:
+                self.assertIsNone(cache.get(view.get_device.get_cache_key(view)))
+
+        with self.subTest("checksum cache invalidated in chunks"):
+            configs = [device.config for device in devices]
+            with patch("django.core.cache.cache.delete_many") as mocked_delete_many:
+                self.assertEqual(bulk_invalidate_cache(["a", "b", "c"], 2), 3)
+                self.assertEqual(mocked_delete_many.call_count, 2)
+            Config.bulk_invalidate_get_cached_checksum(
+                {"device__organization_id": org.pk}
+            )
+            for config in configs:
+                self.assertIsNone(
+                    cache.get(config.get_cached_checksum.get_cache_key(config))
+                )
+
+    def test_organization_cache_generation(self):
+        org = self._get_org()
+        device = self._create_device_config(device_opts={"organization": org})
+        config = device.config
+        view = DeviceChecksumView()
+        view.kwargs = {"pk": str(device.pk)}
+        view.get_cached_device()
+        checksum = config.get_cached_checksum()
+        checksum_key = config.get_cached_checksum.get_cache_key(config)
+        self.assertEqual(cache.get(checksum_key), checksum)
+
+        with self.subTest("cache hits do not query the DB"):
+            with self.assertNumQueries(0):
+                self.assertEqual(view.get_cached_device(), device)
+
+        generation = get_organization_cache_generation(org.pk)
+
+        with self.subTest("organization cache invalidated with one operation"):
+            with patch(
+                "django.core.cache.cache.delete_many", wraps=cache.delete_many
+            ) as mocked_delete_many:
+                invalidate_device_checksum_view_cache(str(org.pk))
+            mocked_delete_many.assert_not_called()
+            self.assertEqual(get_organization_cache_generation(org.pk), generation + 1)
+            self.assertNotEqual(
+                config.get_cached_checksum.get_cache_key(config), checksum_key
+            )
+            with self.assertNumQueries(1):
+                cached_device = view.get_cached_device()
+            self.assertEqual(
+                cached_device._organization_cache_generation, generation + 1
+            )
+            with self.assertNumQueries(0):
+                view.get_cached_device()
+
+        with self.subTest("other organizations are not affected"):
+            other_org = self._create_org(name="other", slug="other")
+            other_generation = get_organization_cache_generation(other_org.pk)
+            invalidate_device_checksum_view_cache(str(org.pk))
+            self.assertEqual(
+                get_organization_cache_generation(other_org.pk), other_generation
+            )
+
+        with self.subTest("changing the organization context bumps generation"):
+            config_settings = OrganizationConfigSettings.objects.create(
+                organization=org, context={}
+            )
+            config_settings.context = {"interface_type": "virtual"}
+            with self.captureOnCommitCallbacks(execute=True):
+                config_settings.save()
+                # the generation is incremented after the commit
+                self.assertEqual(
+                    get_organization_cache_generation(org.pk), generation + 2
+                )
+            self.assertEqual(get_organization_cache_generation(org.pk), generation + 3)
+
+        with self.subTest("evicted generation is seeded with a random value"):
+            cache.delete(get_organization_cache_generation_key(org.pk))
+            with patch("secrets.randbits", return_value=123456) as mocked_randbits:
+                self.assertEqual(get_organization_cache_generation(org.pk), 123456)
+            mocked_randbits.assert_called_once_with(48)
+
+        with self.subTest("device retrieved during an invalidation is not stamped"):
+            view.get_device.invalidate(view)
+            get_object = view.get_object
+
+            def get_object_and_invalidate(*args, **kwargs):
+                obj = get_object(*args, **kwargs)
+                invalidate_organization_cache(org.pk)
+                return obj
+
+            with patch.object(view, "get_object", get_object_and_invalidate):
+                self.assertIsNone(view.get_device()._organization_cache_generation)
+            # the device is retrieved again
+            with self.assertNumQueries(1):
+                cached_device = view.get_cached_device()
+            self.assertEqual(
+                cached_device._organization_cache_generation,
+                get_organization_cache_generation(org.pk),
+            )
+
     def test_get_cached_checksum(self):
         d = self._create_device_config()
         # avoid cache to be invalidated by the update of the addresses
@@ -242,6 +383,84 @@ class TestController(CreateConfigTemplateMixin, TestVpnX509Mixin, TestCase):
                 self.assertEqual(d.config.get_cached_checksum(), d.config.checksum)
                 mocked_debug.assert_called_once()
 
+    def test_device_checksum_asgi_fast_path(self):
+        d = self._create_device_config()
+        url = reverse("controller:device_checksum", args=[d.pk])
+        fallback = AsyncMock()
+        app = DeviceChecksumFastPath(fallback)
+
+        async def request(query_string, path=url):
+            messages = []
+
+            async def receive():
+                return {"type": "http.request"}
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {
+                "type": "http",
+                "method": "GET",
+                "path": path,
+                "query_string": query_string.encode(),
+                "headers": [],
+                "client": ("127.0.0.1", 12345),
+            }
+            await app(scope, receive, send)
+            if app._queue:
+                await app._queue.join()
+            return messages
+
+        with self.subTest("cache miss is handled by the django application"):
+            DeviceChecksumView.invalidate_get_device_cache(d)
+            messages = async_to_sync(request)(f"key={d.key}")
+            self.assertEqual(messages, [])
+            fallback.assert_awaited_once()
+
+        # populates the cache
+        response = self.client.get(url, {"key": d.key})
+        checksum = response.content.decode()
+
+        with self.subTest("checksum is returned from the cache"):
+            fallback.reset_mock()
+            with catch_signal(checksum_requested) as handler:
+                with self.assertNumQueries(0):
+                    messages = async_to_sync(request)(f"key={d.key}")
+                handler.assert_called_once_with(
+                    signal=checksum_requested,
+                    sender=Device,
+                    instance=d,
+                    request=None,
+                )
+            fallback.assert_not_awaited()
+            self.assertEqual(messages[0]["status"], 200)
+            self.assertIn((b"x-openwisp-controller", b"true"), messages[0]["headers"])
+            self.assertEqual(messages[1]["body"], checksum.encode())
+
+        for query_string in [
+            "",
+            "key=wrong",
+            f"key={d.key}&management_ip=10.0.0.2",
+        ]:
+            with self.subTest(query_string=query_string):
+                fallback.reset_mock()
+                messages = async_to_sync(request)(query_string)
+                self.assertEqual(messages, [])
+                fallback.assert_awaited_once()
+
+        with self.subTest("outdated organization cache is handled by django"):
+            fallback.reset_mock()
+            invalidate_device_checksum_view_cache(str(d.organization_id))
+            messages = async_to_sync(request)(f"key={d.key}")
+            self.assertEqual(messages, [])
+            fallback.assert_awaited_once()
+
+        with self.subTest("other URLs are handled by the django application"):
+            fallback.reset_mock()
+            download_url = reverse("controller:device_download_config", args=[d.pk])
+            async_to_sync(request)(f"key={d.key}", path=download_url)
+            fallback.assert_awaited_once()
+
     def test_device_checksum_requested_signal_is_emitted(self):
         d = self._create_device_config()
         url = reverse("controller:device_checksum", args=[d.pk])
@@ -317,6 +536,79 @@ class TestController(CreateConfigTemplateMixin, TestVpnX509Mixin, TestCase):
         self.assertIsNotNone(d.last_ip)
         self.assertIsNone(d.management_ip)
 
+    def test_device_download_config_cached_archive(self):
+        d = self._create_device_config()
+        config = d.config
+        checksum_url = reverse("controller:device_checksum", args=[d.pk])
+        download_url = reverse("controller:device_download_config", args=[d.pk])
+        response = self.client.get(checksum_url, {"key": d.key})
+        checksum = response.content.decode()
+        archive = cache.get(Config.get_archive_cache_key(checksum))
+        self.assertIsNotNone(archive)
+        self.assertEqual(md5(archive).hexdigest(), checksum)
+
+        with self.subTest("download does not render the archive again"):
+            with patch.object(Config, "generate") as mocked_generate:
+                response = self.client.get(download_url, {"key": d.key})
+                mocked_generate.assert_not_called()
+            self.assertEqual(response.content, archive)
+
+        with self.subTest("archive is rendered again if missing from cache"):
+            cache.delete(Config.get_archive_cache_key(checksum))
+            self.assertEqual(config.get_cached_archive(), (checksum, archive))
+            self.assertEqual(cache.get(Config.get_archive_cache_key(checksum)), archive)
+
+    def test_device_download_config_sendfile(self):
+        d = self._create_device_config()
+        url = reverse("controller:device_download_config", args=[d.pk])
+        checksum, archive = d.config.get_cached_archive()
+        with TemporaryDirectory() as root:
+            path = os.path.join(root, f"{checksum}.tar.gz")
+            with patch.object(app_settings, "CONFIG_ARCHIVE_ROOT", root):
+                with self.subTest("X-Accel-Redirect"):
+                    with patch.object(
+                        app_settings, "CONFIG_ARCHIVE_SENDFILE", "X-Accel-Redirect"
+                    ):
+                        response = self.client.get(url, {"key": d.key})
+                    self.assertEqual(response.content, b"")
+                    self.assertEqual(
+                        response["X-Accel-Redirect"],
+                        f"/config-archives/{checksum}.tar.gz",
+                    )
+                    self.assertEqual(
+                        response["Content-Disposition"],
+                        "attachment; filename=test.tar.gz",
+                    )
+                    self._check_header(response)
+                    with open(path, "rb") as file:
+                        self.assertEqual(file.read(), archive)
+
+                with self.subTest("X-Sendfile"):
+                    with patch.object(
+                        app_settings, "CONFIG_ARCHIVE_SENDFILE", "X-Sendfile"
+                    ):
+                        response = self.client.get(url, {"key": d.key})
+                    self.assertEqual(response.content, b"")
+                    self.assertEqual(response["X-Sendfile"], path)
+
+                with self.subTest("outdated archives are pruned"):
+                    outdated_path = os.path.join(root, "outdated.tar.gz")
+                    with open(outdated_path, "wb") as file:
+                        file.write(archive)
+                    os.utime(outdated_path, (0, 0))
+                    prune_config_archives()
+                    self.assertFalse(os.path.exists(outdated_path))
+                    self.assertTrue(os.path.exists(path))
+
+                with self.subTest("downloads prevent pruning"):
+                    os.utime(path, (0, 0))
+                    with patch.object(
+                        app_settings, "CONFIG_ARCHIVE_SENDFILE", "X-Sendfile"
+                    ):
+                        self.client.get(url, {"key": d.key})
+                    prune_config_archives()
+                    self.assertTrue(os.path.exists(path))
+
     def test_deactivated_device_download_config(self):
         self._test_deactivating_deactivated_device_view("device_download_config")
 
@@ -1254,7 +1546,8 @@ class TestController(CreateConfigTemplateMixin, TestVpnX509Mixin, TestCase):
         )
         self.assertEqual(response.status_code, 200)
         org.is_active = False
-        org.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            org.save()
         response = self.client.get(
             reverse("controller:device_checksum", args=[c.device.pk]),
             {"key": c.device.key},
@@ -1355,6 +1648,86 @@ class TestController(CreateConfigTemplateMixin, TestVpnX509Mixin, TestCase):
             cached_device1 = view.get_device()
             self.assertIsNone(cached_device1.management_ip)
 
+    @patch.object(app_settings, "DEVICE_IP_FLUSH_INTERVAL", 60)
+    @patch.object(app_settings, "SHARED_MANAGEMENT_IP_ADDRESS_SPACE", False)
+    def test_device_ip_write_behind(self):
+        org1 = self._get_org()
+        c1 = self._create_config(organization=org1)
+        d2 = self._create_device(
+            organization=org1, name="testdup", mac_address="00:11:22:33:66:77"
+        )
+        c2 = self._create_config(device=d2)
+        org2 = self._create_org(name="org2", shared_secret="123456")
+        c3 = self._create_config(organization=org2)
+        d4 = self._create_device(
+            organization=org2,
+            name="testdup2",
+            mac_address="00:11:22:33:66:88",
+            management_ip="192.168.1.99",
+        )
+        c4 = self._create_config(device=d4)
+
+        with patch.object(flush_device_ip_batch, "apply_async") as mocked_flush:
+            for config in [c1, c2, c3]:
+                self.client.get(
+                    reverse("controller:device_checksum", args=[config.device.pk]),
+                    {"key": config.device.key, "management_ip": "192.168.1.99"},
+                )
+            # repeated requests do not touch the database
+            with self.assertNumQueries(0):
+                self.client.get(
+                    reverse("controller:device_checksum", args=[c1.device.pk]),
+                    {"key": c1.device.key, "management_ip": "192.168.1.99"},
+                )
+            mocked_flush.assert_called_once()
+        batch = mocked_flush.call_args.kwargs["args"][0]
+        c1.device.refresh_from_db()
+        self.assertIsNone(c1.device.last_ip)
+        self.assertIsNone(c1.device.management_ip)
+
+        flush_device_ip_batch.delay(batch)
+        for config in [c1, c2, c3, c4]:
+            config.device.refresh_from_db()
+        # the device which reported the address last keeps it
+        self.assertIsNone(c1.device.management_ip)
+        self.assertIsNone(c1.device.last_ip)
+        self.assertEqual(c2.device.management_ip, "192.168.1.99")
+        self.assertEqual(c2.device.last_ip, "127.0.0.1")
+        self.assertEqual(c3.device.management_ip, "192.168.1.99")
+        self.assertEqual(c3.device.last_ip, "127.0.0.1")
+        # conflicting device of the same organization
+        self.assertIsNone(c4.device.management_ip)
+
+        with self.subTest("test interaction with DeviceChecksumView caching"):
+            view = DeviceChecksumView()
+            view.kwargs = {"pk": str(c2.device.pk)}
+            self.assertEqual(view.get_device().management_ip, "192.168.1.99")
+            view.kwargs = {"pk": str(c4.device.pk)}
+            self.assertIsNone(view.get_device().management_ip)
+
+        with self.subTest("batch is consumed"):
+            with self.assertNumQueries(0):
+                flush_device_ip_batch.delay(batch)
+
+        with self.subTest("addresses reverted before flushing are not written"):
+            url = reverse("controller:device_checksum", args=[c2.device.pk])
+            # the next time window
+            with patch.object(
+                flush_device_ip_batch, "apply_async"
+            ) as mocked_flush, patch(
+                "openwisp_controller.config.utils.time", return_value=(batch + 1) * 60
+            ):
+                self.client.get(
+                    url, {"key": c2.device.key, "management_ip": "192.168.1.98"}
+                )
+                self.client.get(
+                    url, {"key": c2.device.key, "management_ip": "192.168.1.99"}
+                )
+            batch = mocked_flush.call_args.kwargs["args"][0]
+            flush_device_ip_batch.delay(batch)
+            c2.device.refresh_from_db()
+            self.assertEqual(c2.device.management_ip, "192.168.1.99")
+
     @patch.object(app_settings, "SHARED_MANAGEMENT_IP_ADDRESS_SPACE", True)
     def test_organization_shares_management_ip_address_space(self):
         org1 = self._get_org()
@@ -9,6 +9,8 @@ from openwisp_utils.tests import AssertNumQueriesSubTestMixin, catch_signal
 
 from .. import settings as app_settings
 from ..signals import (
+    config_bulk_modified,
+    config_bulk_status_changed,
     config_deactivated,
     config_deactivating,
     config_modified,
@@ -512,6 +514,86 @@ class TestDevice(
             self._create_device(name="test", organization=org, group=device_group)
         handler.assert_not_called()
 
+    def test_manage_devices_group_templates(self):
+        org = self._get_org()
+        t1 = self._create_template(name="t1")
+        t2 = self._create_template(name="t2")
+        t3 = self._create_template(name="t3", backend="netjsonconfig.OpenWisp")
+        required = self._create_template(name="required", required=True)
+        dg1 = self._create_device_group(name="dg1", organization=org)
+        dg1.templates.add(t1, required)
+        dg2 = self._create_device_group(name="dg2", organization=org)
+        dg2.templates.add(t2, t3)
+        devices = [
+            self._create_device(
+                name=f"device{i}",
+                mac_address=f"00:11:22:33:44:0{i}",
+                organization=org,
+                group=dg1,
+            )
+            for i in range(3)
+        ]
+        device_without_config = self._create_device(
+            name="device-without-config",
+            mac_address="00:11:22:33:44:10",
+            organization=org,
+        )
+        Device.objects.filter(pk=device_without_config.pk).update(group=dg2)
+        Config.objects.update(status="applied")
+        with catch_signal(config_modified) as config_modified_handler, catch_signal(
+            config_bulk_modified
+        ) as bulk_modified_handler, catch_signal(
+            config_bulk_status_changed
+        ) as bulk_status_changed_handler, mock.patch.object(
+            Config, "clean_templates", wraps=Config.clean_templates
+        ) as mocked_clean_templates:
+            Device.manage_devices_group_templates(
+                device_ids=[device.pk for device in devices]
+                + [device_without_config.pk],
+                old_group_ids=[dg1.pk, dg1.pk, dg1.pk, None],
+                group_id=dg2.pk,
+            )
+        config_modified_handler.assert_not_called()
+        # the configs share the same resulting templates
+        mocked_clean_templates.assert_called_once()
+        bulk_modified_handler.assert_called_once()
+        call_kwargs = bulk_modified_handler.call_args.kwargs
+        self.assertEqual(call_kwargs["action"], "m2m_templates_changed")
+        # the config created for the device without config is not included
+        self.assertEqual(
+            {config.device_id for config in call_kwargs["instances"]},
+            {device.pk for device in devices},
+        )
+        bulk_status_changed_handler.assert_called_once()
+        self.assertEqual(
+            len(bulk_status_changed_handler.call_args.kwargs["instances"]), 3
+        )
+        for device in devices:
+            config = Config.objects.get(device=device)
+            self.assertEqual(config.status, "modified")
+            # required templates are not removed,
+            # templates of other backends are not added
+            self.assertEqual(set(config.templates.all()), {required, t2})
+        config = Config.objects.get(device=device_without_config)
+        self.assertEqual(set(config.templates.all()), {required, t2})
+
+        with self.subTest("no changes"):
+            with catch_signal(config_bulk_modified) as bulk_modified_handler:
+                Device.manage_devices_group_templates(
+                    device_ids=[devices[0].pk],
+                    old_group_ids=[dg1.pk],
+                    group_id=dg2.pk,
+                )
+            bulk_modified_handler.assert_not_called()
+
+        with self.subTest("templates of other organizations are rejected"):
+            org2 = self._create_org(name="org2")
+            t4 = self._create_template(name="t4", organization=org2)
+            config = Config.objects.get(device=devices[0])
+            with self.assertRaises(ValidationError):
+                Config.bulk_manage_group_templates([(config, [t4], [t2])])
+            self.assertEqual(set(config.templates.all()), {required, t2})
+
     def test_device_field_changed_checks(self):
         self._create_device()
         device_group = self._create_device_group()
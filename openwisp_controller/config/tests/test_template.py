@@ -13,7 +13,12 @@ from swapper import load_model
 from openwisp_utils.tests import catch_signal
 
 from .. import settings as app_settings
-from ..signals import config_modified, config_status_changed
+from ..signals import (
+    config_bulk_modified,
+    config_bulk_status_changed,
+    config_modified,
+    config_status_changed,
+)
 from ..tasks import logger as task_logger
 from ..tasks import update_template_related_config_status
 from .utils import CreateConfigTemplateMixin, TestVpnX509Mixin
@@ -67,6 +72,38 @@ class TestTemplate(CreateConfigTemplateMixin, TestVpnX509Mixin, TestCase):
                 sender=Config, signal=config_status_changed, instance=c
             )
 
+    @mock.patch.object(app_settings, "TEMPLATE_UPDATE_CHUNK_SIZE", 2)
+    def test_update_related_config_status_chunks(self):
+        t = self._create_template()
+        configs = []
+        for index in range(3):
+            device = self._create_device(
+                name=f"test-chunk-{index}", mac_address=f"00:11:22:33:44:0{index}"
+            )
+            config = self._create_config(device=device)
+            config.templates.add(t)
+            configs.append(config)
+        Config.objects.filter(pk=configs[0].pk).update(status="applied")
+        with catch_signal(config_bulk_modified) as modified_handler, catch_signal(
+            config_bulk_status_changed
+        ) as status_handler:
+            t._update_related_config_status()
+        self.assertEqual(modified_handler.call_count, 2)
+        instances = []
+        for call in modified_handler.call_args_list:
+            self.assertEqual(call.kwargs["action"], "related_template_changed")
+            instances.extend(call.kwargs["instances"])
+        self.assertEqual(
+            sorted(config.pk for config in instances),
+            sorted(config.pk for config in configs),
+        )
+        status_handler.assert_called_once()
+        self.assertEqual(
+            [config.pk for config in status_handler.call_args.kwargs["instances"]],
+            [configs[0].pk],
+        )
+        self.assertEqual(Config.objects.filter(status="modified").count(), 3)
+
     def test_no_auto_hostname(self):
         t = self._create_template()
         self.assertNotIn("general", t.backend_instance.config)
@@ -541,21 +578,21 @@ class TestTemplateTransaction(
         t.full_clean()
 
         with self.subTest("signal is sent if related config is in applied status"):
-            with catch_signal(config_status_changed) as handler:
+            with catch_signal(config_bulk_status_changed) as handler:
                 t.save()
                 c.refresh_from_db()
                 handler.assert_called_once_with(
-                    sender=Config, signal=config_status_changed, instance=c
+                    sender=Config, signal=config_bulk_status_changed, instances=[c]
                 )
                 self.assertEqual(c.status, "modified")
 
         with self.subTest("signal not sent if config is already modified"):
             # status has already changed to modified
             # sgnal should not be triggered again
-            with catch_signal(config_status_changed) as handler:
+            with catch_signal(config_bulk_status_changed) as handler:
                 t.config["interfaces"][0]["name"] = "eth2"
                 t.full_clean()
-                with self.assertNumQueries(10):
+                with self.assertNumQueries(8):
                     t.save()
                 c.refresh_from_db()
                 handler.assert_not_called()
@@ -644,17 +681,14 @@ class TestTemplateTransaction(
         conf.set_status_applied()
 
         with self.subTest("signal sent after changing a template"):
-            with catch_signal(config_modified) as handler:
+            with catch_signal(config_bulk_modified) as handler:
                 template1.config["interfaces"][0]["name"] = "eth1"
                 template1.full_clean()
                 template1.save()
                 handler.assert_called_once_with(
                     sender=Config,
-                    signal=config_modified,
-                    instance=conf,
-                    device=conf.device,
-                    config=conf,
-                    previous_status="modified",
+                    signal=config_bulk_modified,
+                    instances=[conf],
                     action="related_template_changed",
                 )
                 conf.refresh_from_db()
@@ -663,18 +697,15 @@ class TestTemplateTransaction(
         with self.subTest("signal sent also if config is already in modified status"):
             # status has already changed to modified
             # signal should be triggered anyway
-            with catch_signal(config_modified) as handler:
+            with catch_signal(config_bulk_modified) as handler:
                 template1.config["interfaces"][0]["name"] = "eth2"
                 template1.full_clean()
                 template1.save()
                 conf.refresh_from_db()
                 handler.assert_called_once_with(
                     sender=Config,
-                    signal=config_modified,
-                    instance=conf,
-                    device=conf.device,
-                    config=conf,
-                    previous_status="modified",
+                    signal=config_bulk_modified,
+                    instances=[conf],
                     action="related_template_changed",
                 )
                 self.assertEqual(conf.status, "modified")
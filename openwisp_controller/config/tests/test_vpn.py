@@ -4,6 +4,7 @@ from unittest import mock
 
 from celery.exceptions import Retry, SoftTimeLimitExceeded
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db.models.signals import post_save
 from django.db.utils import IntegrityError
@@ -15,11 +16,12 @@ from swapper import load_model
 from openwisp_utils.tests import catch_signal
 
 from ...vpn_backends import OpenVpn
+from .. import keypool
 from .. import settings as app_settings
 from ..exceptions import ZeroTierIdentityGenerationError
 from ..settings import API_TASK_RETRY_OPTIONS
 from ..signals import config_modified, vpn_peers_changed, vpn_server_modified
-from ..tasks import create_vpn_dh
+from ..tasks import create_vpn_dh, refill_key_pool
 from .utils import (
     CreateConfigTemplateMixin,
     TestVpnX509Mixin,
@@ -335,6 +337,51 @@ class TestVpn(BaseTestVpn, TestCase):
         self.assertTrue(v.dh.startswith("-----BEGIN DH PARAMETERS-----"))
         self.assertTrue(v.dh.endswith("-----END DH PARAMETERS-----\n"))
 
+    @mock.patch.dict(app_settings.KEY_POOL_SIZE, {"dh": 2, "wireguard": 2})
+    @mock.patch.object(refill_key_pool, "delay")
+    @mock.patch.object(create_vpn_dh, "delay")
+    @mock.patch.object(Vpn, "dhparam")
+    def test_key_pool(self, dhparam, create_vpn_dh_delay, refill_delay):
+        self.addCleanup(cache.clear)
+        dhparam.return_value = self._dh
+
+        with self.subTest("refill"):
+            self.assertEqual(keypool.refill("dh"), 2)
+            self.assertEqual(keypool.get_stock("dh"), 2)
+            self.assertEqual(keypool.refill("dh"), 0)
+            self.assertEqual(dhparam.call_count, 2)
+
+        with self.subTest("VPN server takes DH parameters from the pool"):
+            with self.captureOnCommitCallbacks(execute=True):
+                vpn = self._create_vpn(dh="")
+            self.assertEqual(vpn.dh, self._dh)
+            create_vpn_dh_delay.assert_not_called()
+            refill_delay.assert_called_once()
+            self.assertEqual(keypool.get_stock("dh"), 1)
+            self.assertEqual(dhparam.call_count, 2)
+
+        with self.subTest("WireGuard keys taken from the pool"):
+            keypool.refill("wireguard")
+            private_key, public_key = keypool.pop("wireguard")
+            self.assertEqual(len(private_key), 44)
+            self.assertEqual(len(public_key), 44)
+            self.assertEqual(keypool.get_stock("wireguard"), 1)
+
+        with self.subTest("empty pool"):
+            self.assertIsNotNone(keypool.pop("dh"))
+            self.assertIsNone(keypool.pop("dh"))
+            self.assertEqual(keypool.refill("dh"), 2)
+            self.assertEqual(keypool.get_stock("dh"), 2)
+
+        with self.subTest("expired items are replaced"):
+            head = cache.get(keypool._get_cache_key("dh", "head"))
+            cache.delete(keypool._get_cache_key("dh", head + 1))
+            self.assertEqual(keypool.refill("dh"), 1)
+            # the expired item is treated as missing
+            self.assertIsNone(keypool.pop("dh"))
+            self.assertEqual(keypool.pop("dh"), self._dh)
+            self.assertEqual(keypool.pop("dh"), self._dh)
+
     @mock.patch.dict(app_settings.CONTEXT, {"vpnserver1": "vpn.testdomain.com"})
     def test_get_context_empty_vpn(self):
         v = Vpn()
@@ -607,6 +654,60 @@ class TestWireguard(BaseTestVpn, TestWireguardVpnMixin, TestCase):
             "VPN IP address must be within the VPN subnet", message_dict["ip"]
         )
 
+    def test_peer_cache_incremental_update(self):
+        device, vpn, template = self._create_wireguard_vpn_template()
+        vpnclient = device.config.vpnclient_set.first()
+        vpn._invalidate_peer_cache(update=True)
+
+        with self.subTest("peer modified"):
+            vpnclient.public_key = vpn.public_key
+            with self.captureOnCommitCallbacks(execute=True):
+                vpnclient.save()
+            with self.assertNumQueries(0):
+                peers = vpn._get_wireguard_peers()
+            self.assertEqual(
+                peers,
+                [
+                    {
+                        "public_key": vpn.public_key,
+                        "allowed_ips": f"{vpnclient.ip.ip_address}/32",
+                    }
+                ],
+            )
+
+        with self.subTest("index deleted if locked by another process"):
+            lock_key = f"{vpn._get_peer_index_cache_key()}-lock"
+            cache.set(lock_key, True)
+            with self.captureOnCommitCallbacks(execute=True):
+                vpnclient.save()
+            cache.delete(lock_key)
+            with self.assertNumQueries(1):
+                self.assertEqual(len(vpn._get_wireguard_peers()), 1)
+
+        with self.subTest("regenerated index discarded if peers changed meanwhile"):
+            key = vpn._get_peer_index_cache_key()
+            cache.delete(key)
+            get_peer_queryset = vpn._get_peer_queryset
+
+            def _get_peer_queryset():
+                peers = list(get_peer_queryset())
+                # another process changes a peer while
+                # the index is being regenerated
+                vpn._update_peer_cache(clients=[vpnclient])
+                return peers
+
+            with mock.patch.object(vpn, "_get_peer_queryset", _get_peer_queryset):
+                self.assertEqual(len(vpn._get_peer_index()), 1)
+            self.assertIsNone(cache.get(key))
+            vpn._get_peer_index()
+            self.assertIsNotNone(cache.get(key))
+
+        with self.subTest("peer deleted"):
+            with self.captureOnCommitCallbacks(execute=True):
+                vpnclient.delete()
+            with self.assertNumQueries(0):
+                self.assertEqual(vpn._get_wireguard_peers(), [])
+
     def test_wireguard_schema(self):
         with self.subTest("wireguard schema shall be valid"):
             with self.assertRaises(ValidationError) as context_manager:
@@ -748,9 +849,9 @@ class TestWireguardTransaction(BaseTestVpn, TestWireguardVpnMixin, TransactionTe
 
         with self.subTest("cache updated when a new peer is deleted"):
             device2.delete(check_deactivated=False)
-            # cache is invalidated but not updated
-            # hence we expect queries to be generated
-            with self.assertNumQueries(1):
+            # the peer is removed from the cached peer index,
+            # hence no queries expected
+            with self.assertNumQueries(0):
                 vpn_config = vpn.get_config()["wireguard"][0]
             self.assertEqual(len(vpn_config.get("peers", [])), 1)
 
@@ -905,6 +1006,62 @@ class TestVxlan(BaseTestVpn, TestVxlanWireguardVpnMixin, TestCase):
             client.full_clean()
             client.save()
 
+    def test_vpn_client_bulk_provision(self):
+        tunnel, subnet = self._create_vxlan_tunnel()
+        template = self._create_template(
+            name="vxlan-wireguard",
+            type="vpn",
+            vpn=tunnel,
+            organization=tunnel.organization,
+            auto_cert=True,
+        )
+        c1 = self._create_config(device=self._create_device())
+        client = VpnClient(vpn=tunnel, config=c1, auto_cert=True, template=template)
+        client.full_clean()
+        client.save()
+        clients = []
+        for index in range(2, 5):
+            device = self._create_device(
+                name=f"d{index}", mac_address=f"16:DB:7F:E8:50:0{index}"
+            )
+            config = self._create_config(device=device)
+            clients.append(
+                VpnClient(vpn=tunnel, config=config, auto_cert=True, template=template)
+            )
+        with mock.patch.object(
+            Vpn, "_update_peer_cache"
+        ) as mocked_update, catch_signal(post_save) as handler:
+            with self.captureOnCommitCallbacks(execute=True):
+                VpnClient.bulk_provision(clients)
+        mocked_update.assert_called_once_with(clients=clients)
+        self.assertEqual(handler.call_count, 3)
+        self.assertEqual(VpnClient.objects.filter(vpn=tunnel).count(), 4)
+        self.assertEqual(
+            [client.vni for client in VpnClient.objects.order_by("vni")],
+            [1, 2, 3, 4],
+        )
+        self.assertEqual(
+            sorted(client.ip.ip_address for client in clients),
+            ["10.0.0.3", "10.0.0.4", "10.0.0.5"],
+        )
+        self.assertEqual(IpAddress.objects.filter(subnet=subnet).count(), 5)
+        for client in clients:
+            self.assertEqual(len(client.private_key), 44)
+            self.assertEqual(len(client.public_key), 44)
+
+        with self.subTest("invalid clients are not provisioned"):
+            device = self._create_device(name="d5", mac_address="16:DB:7F:E8:50:05")
+            config = self._create_config(device=device)
+            clients = [
+                VpnClient(vpn=tunnel, config=config, auto_cert=True, template=template),
+                # duplicated client
+                VpnClient(vpn=tunnel, config=c1, auto_cert=True, template=template),
+            ]
+            with self.assertRaises(ValidationError):
+                VpnClient.bulk_provision(clients)
+            self.assertEqual(VpnClient.objects.filter(vpn=tunnel).count(), 4)
+            self.assertEqual(IpAddress.objects.filter(subnet=subnet).count(), 5)
+
     def test_vxlan_schema(self):
         with self.assertRaises(ValidationError) as context_manager:
             self._create_vxlan_tunnel(config={"wireguard": []})
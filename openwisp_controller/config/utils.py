@@ -1,5 +1,10 @@
 import logging
+import os
+import secrets
+import tempfile
+from time import time
 
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db.models import Q
 from django.http import Http404, HttpResponse
@@ -7,6 +12,8 @@ from django.shortcuts import get_object_or_404 as base_get_object_or_404
 from django.urls import path, re_path
 from openwisp_notifications.utils import _get_object_link
 
+from . import settings as app_settings
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,15 +48,73 @@ def send_file(filename, contents):
     return response
 
 
+def send_offloaded_file(filename, name, contents):
+    """
+    writes ``contents`` in ``CONFIG_ARCHIVE_ROOT`` (unless already
+    present) and returns a ``ControllerResponse`` which instructs
+    the web server to send the file as attachment
+    """
+    root = app_settings.CONFIG_ARCHIVE_ROOT
+    path = os.path.join(root, name)
+    try:
+        # the modification time tracks the last download,
+        # archives still in use are not pruned
+        os.utime(path)
+    except FileNotFoundError:
+        os.makedirs(root, exist_ok=True)
+        # write to a temporary file first to avoid
+        # serving partially written files
+        with tempfile.NamedTemporaryFile(dir=root, delete=False) as temp_file:
+            temp_file.write(contents)
+        os.chmod(temp_file.name, 0o640)
+        os.replace(temp_file.name, path)
+    response = send_file(filename, contents=b"")
+    header = app_settings.CONFIG_ARCHIVE_SENDFILE
+    if header == "X-Accel-Redirect":
+        response[header] = "{0}{1}".format(app_settings.CONFIG_ARCHIVE_URL, name)
+    else:
+        response[header] = path
+    return response
+
+
+def prune_offloaded_files(max_age=None):
+    """
+    deletes the archives written in ``CONFIG_ARCHIVE_ROOT`` which have
+    not been downloaded in the last ``max_age`` seconds (defaults to
+    ``CONFIG_ARCHIVE_CACHE_TIMEOUT``), returns the amount of files deleted
+    """
+    root = app_settings.CONFIG_ARCHIVE_ROOT
+    if not root or not os.path.isdir(root):
+        return 0
+    if max_age is None:
+        max_age = app_settings.CONFIG_ARCHIVE_CACHE_TIMEOUT
+    threshold = time() - max_age
+    count = 0
+    with os.scandir(root) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < threshold:
+                    os.remove(entry.path)
+                    count += 1
+            # deleted concurrently
+            except FileNotFoundError:
+                continue
+    return count
+
+
 def send_device_config(config, request):
     """
     calls ``update_last_ip`` and returns a ``ControllerResponse``
     which includes the configuration tar.gz as attachment
     """
     update_last_ip(config.device, request)
-    return send_file(
-        filename="{0}.tar.gz".format(config.name), contents=config.generate().getvalue()
-    )
+    filename = "{0}.tar.gz".format(config.name)
+    checksum, archive = config.get_cached_archive()
+    if app_settings.CONFIG_ARCHIVE_SENDFILE:
+        return send_offloaded_file(
+            filename, name="{0}.tar.gz".format(checksum), contents=archive
+        )
+    return send_file(filename=filename, contents=archive)
 
 
 def send_vpn_config(vpn, request):
@@ -82,6 +147,181 @@ def update_last_ip(device, request):
     return bool(update_fields)
 
 
+def _get_device_ip_cache_key(device_id):
+    return f"device-{device_id}-ip"
+
+
+def _get_device_ip_batch_key(batch):
+    return f"device-ip-batch-{batch}"
+
+
+def buffer_device_ip(device, request):
+    """
+    write-behind variant of ``update_last_ip``: stores the addresses
+    in the cache and adds the device to the batch of the current
+    ``DEVICE_IP_FLUSH_INTERVAL`` time window; returns the batch number
+    only to the first caller of each time window, which is in charge
+    of scheduling the flush of the batch, ``None`` otherwise
+    """
+    ip = request.META.get("REMOTE_ADDR")
+    management_ip = request.GET.get("management_ip")
+    key = _get_device_ip_cache_key(device.pk)
+    if device.last_ip == ip and device.management_ip == management_ip:
+        # the addresses reverted to the saved ones: drops the addresses
+        # buffered earlier, which would be written when flushing
+        cache.delete(key)
+        return None
+    interval = app_settings.DEVICE_IP_FLUSH_INTERVAL
+    timeout = interval * 10
+    batch = int(time() // interval)
+    # the most recent addresses win
+    cache.set(key, (ip, management_ip), timeout)
+    if not cache.add(f"device-{device.pk}-ip-batch-{batch}", True, timeout):
+        return None
+    batch_key = _get_device_ip_batch_key(batch)
+    cache.add(batch_key, 0, timeout)
+    index = cache.incr(batch_key)
+    cache.set(f"{batch_key}-{index}", device.pk, timeout)
+    return batch if index == 1 else None
+
+
+def get_device_ip_batch_countdown(batch):
+    """
+    returns the amount of seconds until the end of the time window
+    """
+    interval = app_settings.DEVICE_IP_FLUSH_INTERVAL
+    return max((batch + 1) * interval - time(), 0) + 1
+
+
+def get_device_ip_batch(batch):
+    """
+    returns (and removes from the cache) the addresses buffered
+    in ``batch`` as a dict which maps device PKs to a tuple
+    of ``(last_ip, management_ip)``
+    """
+    batch_key = _get_device_ip_batch_key(batch)
+    size = cache.get(batch_key)
+    if not size:
+        return {}
+    index_keys = [f"{batch_key}-{index}" for index in range(1, size + 1)]
+    device_ids = cache.get_many(index_keys).values()
+    ip_keys = {_get_device_ip_cache_key(pk): pk for pk in device_ids}
+    addresses = {
+        ip_keys[key]: value for key, value in cache.get_many(ip_keys.keys()).items()
+    }
+    cache.delete_many([batch_key] + index_keys + list(ip_keys.keys()))
+    return addresses
+
+
+def bulk_invalidate_cache(keys, chunk_size=1000):
+    """
+    deletes the cache ``keys`` (any iterable) with
+    one ``delete_many`` call for each chunk of keys,
+    returns the amount of keys deleted
+    """
+    count = 0
+    chunk = []
+    for key in keys:
+        chunk.append(key)
+        if len(chunk) == chunk_size:
+            cache.delete_many(chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        cache.delete_many(chunk)
+        count += len(chunk)
+    return count
+
+
+def get_organization_cache_generation_key(organization_id):
+    return f"organization-cache-generation-{organization_id}"
+
+
+ORGANIZATION_CACHE_EPOCH_KEY = "organization-cache-epoch"
+
+
+def _seed_organization_cache_generation(key):
+    """
+    stores a random initial generation (unless already present), after
+    an eviction of the key a counter starting from zero would make
+    valid again the entries stamped with the previous generations
+    """
+    cache.add(key, secrets.randbits(48), timeout=None)
+
+
+def get_organization_cache_epoch():
+    """
+    returns a value which changes whenever the cache entries of any
+    organization are invalidated, it must be read before retrieving
+    from the DB the objects which are going to be stamped with the
+    generation of their organization (whose ID is not known yet)
+    """
+    epoch = cache.get(ORGANIZATION_CACHE_EPOCH_KEY)
+    if epoch is None:
+        _seed_organization_cache_generation(ORGANIZATION_CACHE_EPOCH_KEY)
+        epoch = cache.get(ORGANIZATION_CACHE_EPOCH_KEY)
+    return epoch
+
+
+def get_organization_cache_generation(organization_id, epoch=None):
+    """
+    returns the current generation of the cache entries
+    of the organization (see ``invalidate_organization_cache``);
+    if ``epoch`` (see ``get_organization_cache_epoch``) is passed,
+    ``None`` is returned when the cache of any organization has been
+    invalidated since ``epoch`` was read, because the objects
+    retrieved from the DB in the meantime may be outdated
+    """
+    key = get_organization_cache_generation_key(organization_id)
+    if epoch is None:
+        values = {key: cache.get(key)}
+    else:
+        values = cache.get_many([key, ORGANIZATION_CACHE_EPOCH_KEY])
+        if values.get(ORGANIZATION_CACHE_EPOCH_KEY) != epoch:
+            return None
+    generation = values.get(key)
+    if generation is None:
+        _seed_organization_cache_generation(key)
+        generation = cache.get(key)
+    return generation
+
+
+def get_organization_cache_generations(organization_ids):
+    """
+    returns a dict mapping each of ``organization_ids``
+    to its cache generation, with one cache lookup
+    (plus one for the missing generations)
+    """
+    keys = {
+        get_organization_cache_generation_key(org_id): org_id
+        for org_id in set(organization_ids)
+    }
+    generations = cache.get_many(keys.keys())
+    missing = keys.keys() - generations.keys()
+    if missing:
+        for key in missing:
+            _seed_organization_cache_generation(key)
+        generations.update(cache.get_many(missing))
+    return {org_id: generations.get(key) for key, org_id in keys.items()}
+
+
+def invalidate_organization_cache(organization_id):
+    """
+    invalidates the cache entries which depend on the organization
+    (eg: cached checksums and devices) in O(1) by incrementing its
+    generation, the outdated entries are not looked up anymore
+    and are left to expire according to their timeout; when the
+    organization is being changed, it must be called only after
+    the transaction is committed (see ``transaction.on_commit``)
+    """
+    # the epoch is incremented first, see get_organization_cache_generation
+    _seed_organization_cache_generation(ORGANIZATION_CACHE_EPOCH_KEY)
+    cache.incr(ORGANIZATION_CACHE_EPOCH_KEY)
+    key = get_organization_cache_generation_key(organization_id)
+    _seed_organization_cache_generation(key)
+    return cache.incr(key)
+
+
 def forbid_unallowed(request, param_group, param, allowed_values=None):
     """
     checks for malformed requests - eg: missing parameters (HTTP 400)
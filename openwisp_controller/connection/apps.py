@@ -10,7 +10,7 @@ from swapper import get_model_name, load_model
 
 from openwisp_utils.admin_theme.menu import register_menu_subitem
 
-from ..config.signals import config_deactivating, config_modified
+from ..config.signals import config_bulk_modified, config_deactivating, config_modified
 from .signals import is_working_changed
 
 
@@ -44,6 +44,10 @@ class ConnectionConfig(AppConfig):
         config_deactivating.connect(
             self.config_modified_receiver, dispatch_uid="connection.update_config"
         )
+        config_bulk_modified.connect(
+            self.config_bulk_modified_receiver,
+            dispatch_uid="connection.bulk_update_config",
+        )
 
         post_save.connect(
             Credentials.auto_add_credentials_to_device,
@@ -66,6 +70,16 @@ class ConnectionConfig(AppConfig):
     def config_modified_receiver(cls, **kwargs):
         transaction.on_commit(lambda: cls._launch_update_config(kwargs["device"].pk))
 
+    @classmethod
+    def config_bulk_modified_receiver(cls, instances, **kwargs):
+        device_ids = [instance.device_id for instance in instances]
+
+        def launch_update_config():
+            for device_id in device_ids:
+                cls._launch_update_config(device_id)
+
+        transaction.on_commit(launch_update_config)
+
     @classmethod
     def command_save_receiver(cls, sender, created, instance, **kwargs):
         from .api.serializers import CommandSerializer
@@ -83,12 +97,12 @@ class ConnectionConfig(AppConfig):
     @classmethod
     def _launch_update_config(cls, device_id):
         """
-        Calls the background task update_config only if
-        no other tasks are running for the same device
+        Schedules the background task update_config only if
+        it is not already scheduled for the same device
         """
-        from .tasks import update_config
+        from .tasks import schedule_update_config
 
-        update_config.delay(device_id)
+        schedule_update_config(device_id)
 
     @classmethod
     def is_working_changed_receiver(
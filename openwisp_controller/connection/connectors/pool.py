@@ -0,0 +1,117 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from .. import settings as app_settings
+
+logger = logging.getLogger(__name__)
+
+
+class SshConnectionPool(object):
+    """
+    Per process pool of authenticated SSH clients.
+
+    Establishing an SSH session with low power devices can take a few
+    seconds, the pool allows sequential operations performed on the same
+    device (eg: push configuration, execute a command, verify the result)
+    to reuse the same authenticated transport.
+
+    Clients are keyed by connection parameters and address, they are
+    closed when they stay idle for longer than ``idle_timeout`` seconds,
+    when they fail the liveness check or when the pool exceeds
+    ``max_size`` (least recently released clients are evicted first).
+    A ``max_size`` of ``0`` disables the pool.
+    """
+
+    def __init__(self, max_size, idle_timeout):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    @staticmethod
+    def get_key(params, address):
+        params = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.sha256(params.encode()).hexdigest()
+        return f"{digest}-{address}"
+
+    def acquire(self, key):
+        """
+        Returns a working client for ``key`` or ``None``.
+
+        The returned client is removed from the pool until it is released.
+        """
+        with self._lock:
+            entry = self._clients.pop(key, None)
+        if entry is None:
+            return None
+        client, released_at = entry
+        if self._is_expired(released_at) or not self._is_alive(client):
+            client.close()
+            return None
+        logger.debug("Reusing pooled SSH connection")
+        return client
+
+    def release(self, key, client):
+        """
+        Gives ``client`` back to the pool.
+
+        The client is closed if the pool is disabled or it's not working.
+        """
+        if not self.enabled or not self._is_alive(client):
+            client.close()
+            return
+        evicted = []
+        with self._lock:
+            previous = self._clients.pop(key, None)
+            if previous and previous[0] is not client:
+                evicted.append(previous[0])
+            self._clients[key] = (client, time.monotonic())
+            for pooled_key, (pooled_client, released_at) in list(self._clients.items()):
+                if len(self._clients) > self.max_size or self._is_expired(released_at):
+                    del self._clients[pooled_key]
+                    evicted.append(pooled_client)
+        for evicted_client in evicted:
+            evicted_client.close()
+
+    def clear(self):
+        """
+        Closes all the pooled clients.
+        """
+        with self._lock:
+            clients = [client for client, _ in self._clients.values()]
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+    def __len__(self):
+        return len(self._clients)
+
+    def _is_expired(self, released_at):
+        return time.monotonic() - released_at > self.idle_timeout
+
+    @staticmethod
+    def _is_alive(client):
+        transport = client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            # sends a packet which the other end ignores,
+            # raises an exception if the connection is broken
+            transport.send_ignore()
+        except Exception:
+            return False
+        return True
+
+
+ssh_connection_pool = SshConnectionPool(
+    max_size=app_settings.SSH_CONNECTION_POOL_SIZE,
+    idle_timeout=app_settings.SSH_CONNECTION_POOL_IDLE_TIMEOUT,
+)
@@ -11,6 +11,7 @@ from scp import SCPClient
 
 from .. import settings as app_settings
 from .exceptions import CommandFailedException
+from .pool import ssh_connection_pool
 
 logger = logging.getLogger(__name__)
 
@@ -59,8 +60,14 @@ class Ssh(object):
     def __init__(self, params, addresses):
         self._params = params
         self.addresses = addresses
-        self.shell = paramiko.SSHClient()
-        self.shell.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self._pool_key = None
+        self.shell = self._get_ssh_client()
+
+    @staticmethod
+    def _get_ssh_client():
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        return client
 
     @classmethod
     def validate(cls, params):
@@ -121,6 +128,8 @@ class Ssh(object):
             # Do not establish a new connection if
             # a connection was already established.
             return
+        if self._connect_from_pool():
+            return
         for address in addresses:
             try:
                 self._connect(address)
@@ -128,11 +137,27 @@ class Ssh(object):
                 exception = e
             else:
                 success = True
+                self._pool_key = ssh_connection_pool.get_key(self._params, address)
                 break
         if not success:
             self.disconnect()
             raise exception
 
+    def _connect_from_pool(self):
+        """
+        Reuses an authenticated client of the connection pool, if any
+        """
+        if not ssh_connection_pool.enabled:
+            return False
+        for address in self.addresses:
+            key = ssh_connection_pool.get_key(self._params, address)
+            client = ssh_connection_pool.acquire(key)
+            if client:
+                self.shell = client
+                self._pool_key = key
+                return True
+        return False
+
     def _connect(self, address):
         """
         Tries to instantiate the SSH connection,
@@ -166,7 +191,13 @@ class Ssh(object):
                 break
 
     def disconnect(self):
-        self.shell.close()
+        if ssh_connection_pool.enabled and self._pool_key and self.is_connected:
+            # keep the authenticated session for subsequent operations
+            ssh_connection_pool.release(self._pool_key, self.shell)
+            self.shell = self._get_ssh_client()
+        else:
+            self.shell.close()
+        self._pool_key = None
 
     def exec_command(
         self,
@@ -39,9 +39,14 @@ SSH_AUTH_TIMEOUT = getattr(settings, "OPENWISP_SSH_AUTH_TIMEOUT", 2)
 SSH_BANNER_TIMEOUT = getattr(settings, "OPENWISP_SSH_BANNER_TIMEOUT", 60)
 SSH_COMMAND_TIMEOUT = getattr(settings, "OPENWISP_SSH_COMMAND_TIMEOUT", 30)
 SSH_CONNECTION_TIMEOUT = getattr(settings, "OPENWISP_SSH_CONNECTION_TIMEOUT", 5)
+SSH_CONNECTION_POOL_SIZE = getattr(settings, "OPENWISP_SSH_CONNECTION_POOL_SIZE", 0)
+SSH_CONNECTION_POOL_IDLE_TIMEOUT = getattr(
+    settings, "OPENWISP_SSH_CONNECTION_POOL_IDLE_TIMEOUT", 60
+)
 
 # this may get overridden by openwisp-monitoring
 UPDATE_CONFIG_MODEL = getattr(settings, "OPENWISP_UPDATE_CONFIG_MODEL", "config.Device")
+UPDATE_CONFIG_DELAY = getattr(settings, "OPENWISP_CONTROLLER_UPDATE_CONFIG_DELAY", 2)
 USER_COMMANDS = getattr(settings, "OPENWISP_CONTROLLER_USER_COMMANDS", [])
 ORGANIZATION_ENABLED_COMMANDS = getattr(
     settings, "OPENWISP_CONTROLLER_ORGANIZATION_ENABLED_COMMANDS", {"__all__": "*"}
@@ -1,9 +1,9 @@
 import logging
-import time
 
 import swapper
-from celery import current_app, shared_task
+from celery import shared_task
 from celery.exceptions import SoftTimeLimitExceeded
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.translation import gettext_lazy as _
 from swapper import load_model
@@ -12,19 +12,30 @@ from . import settings as app_settings
 from .exceptions import NoWorkingDeviceConnectionError
 
 logger = logging.getLogger(__name__)
-_TASK_NAME = "openwisp_controller.connection.tasks.update_config"
+# maximum amount of time an update_config operation is expected to take,
+# the lock is released automatically after this amount of seconds
+# in case the worker running the operation dies
+_UPDATE_CONFIG_LOCK_TIMEOUT = 10 * 60
 
 
-def _is_update_in_progress(device_id):
-    active = current_app.control.inspect().active()
-    if not active:
+def get_update_config_cache_key(device_id, context):
+    return f"update_config_{context}_{device_id}"
+
+
+def schedule_update_config(device_id):
+    """
+    Schedules the ``update_config`` task of a device
+    after ``OPENWISP_CONTROLLER_UPDATE_CONFIG_DELAY`` seconds,
+    unless it has been already scheduled: multiple saves of
+    the same device are collapsed in a single ``update_config``
+    """
+    delay = app_settings.UPDATE_CONFIG_DELAY
+    scheduled_key = get_update_config_cache_key(device_id, "scheduled")
+    # the timeout is a safety net in case the task is never executed
+    if not cache.add(scheduled_key, True, timeout=delay + 60):
         return False
-    # check if there's any other running task before adding it
-    for task_list in active.values():
-        for task in task_list:
-            if task["name"] == _TASK_NAME and str(device_id) in task["args"]:
-                return True
-    return False
+    update_config.apply_async(args=[device_id], countdown=delay)
+    return True
 
 
 @shared_task
@@ -35,9 +46,9 @@ def update_config(device_id):
     """
     Device = swapper.load_model(*swapper.split(app_settings.UPDATE_CONFIG_MODEL))
     DeviceConnection = swapper.load_model("connection", "DeviceConnection")
-    # wait for the saving operations of this device to complete
-    # (there may be multiple ones happening at the same time)
-    time.sleep(2)
+    # from now on, new changes to the device
+    # will need to schedule another update_config
+    cache.delete(get_update_config_cache_key(device_id, "scheduled"))
     try:
         device = Device.objects.select_related("config").get(pk=device_id)
         # abort operation if device shouldn't be updated
@@ -47,15 +58,18 @@ def update_config(device_id):
     except ObjectDoesNotExist as e:
         logger.warning(f'update_config("{device_id}") failed: {e}')
         return
-    if _is_update_in_progress(device_id):
+    lock_key = get_update_config_cache_key(device_id, "lock")
+    # abort if another update of the same device is in progress
+    if not cache.add(lock_key, True, timeout=_UPDATE_CONFIG_LOCK_TIMEOUT):
         return
     try:
         device_conn = DeviceConnection.get_working_connection(device)
-    except NoWorkingDeviceConnectionError:
-        return
-    else:
         logger.info(f"Updating {device} (pk: {device_id})")
         device_conn.update_config()
+    except NoWorkingDeviceConnectionError:
+        return
+    finally:
+        cache.delete(lock_key)
 
 
 # task timeout is SSH_COMMAND_TIMEOUT plus a 20% margin
@@ -3,6 +3,7 @@ from unittest import mock
 
 import paramiko
 from django.contrib.auth.models import ContentType
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.test import TestCase, TransactionTestCase, tag
 from django.utils import timezone
@@ -20,7 +21,7 @@ from ..commands import (
 )
 from ..exceptions import NoWorkingDeviceConnectionError
 from ..signals import is_working_changed
-from ..tasks import _TASK_NAME, update_config
+from ..tasks import get_update_config_cache_key, update_config
 from .utils import CreateConnectionsMixin
 
 Config = load_model("config", "Config")
@@ -926,8 +927,7 @@ class TestModelsTransaction(BaseTestModels, TransactionTestCase):
 
     @capture_any_output()
     @mock.patch(_connect_path)
-    @mock.patch("time.sleep")
-    def test_device_config_created(self, mocked_sleep, mocked_connect):
+    def test_device_config_created(self, mocked_connect):
         """
         The update_config task must not be initiated when
         the device has just been created
@@ -940,8 +940,7 @@ class TestModelsTransaction(BaseTestModels, TransactionTestCase):
 
     @capture_any_output()
     @mock.patch(_connect_path)
-    @mock.patch("time.sleep")
-    def test_device_config_update(self, mocked_sleep, mocked_connect):
+    def test_device_config_update(self, mocked_connect):
         def _assert_version_check_command(mocked_exec):
             args, _ = mocked_exec.call_args_list[0]
             self.assertEqual(
@@ -1021,46 +1020,44 @@ class TestModelsTransaction(BaseTestModels, TransactionTestCase):
             # exit code 1 considers the update not successful
             self.assertEqual(conf.status, "modified")
 
-    @mock.patch("time.sleep")
     @mock.patch.object(DeviceConnection, "update_config")
     @mock.patch.object(DeviceConnection, "get_working_connection")
     def test_device_update_config_in_progress(
-        self, mocked_get_working_connection, update_config, mocked_sleep
+        self, mocked_get_working_connection, update_config
     ):
         conf = self._prepare_conf_object()
-
-        with mock.patch("celery.app.control.Inspect.active") as mocked_active:
-            mocked_active.return_value = {
-                "task": [{"name": _TASK_NAME, "args": [str(conf.device.pk)]}]
-            }
-            conf.config = {"general": {"timezone": "UTC"}}
-            conf.full_clean()
-            conf.save()
-            mocked_active.assert_called_once()
+        lock_key = get_update_config_cache_key(conf.device.pk, "lock")
+        cache.set(lock_key, True)
+        try:
+            with mock.patch("celery.app.control.Inspect.active") as mocked_active:
+                conf.config = {"general": {"timezone": "UTC"}}
+                conf.full_clean()
+                conf.save()
+                # workers are not inspected anymore
+                mocked_active.assert_not_called()
             mocked_get_working_connection.assert_not_called()
             update_config.assert_not_called()
+        finally:
+            cache.delete(lock_key)
 
-    @mock.patch("time.sleep")
     @mock.patch.object(DeviceConnection, "update_config")
     @mock.patch.object(DeviceConnection, "get_working_connection")
     def test_device_update_config_not_in_progress(
-        self, mocked_get_working_connection, mocked_update_config, mocked_sleep
+        self, mocked_get_working_connection, mocked_update_config
     ):
         conf = self._prepare_conf_object()
         mocked_get_working_connection.return_value = (
             conf.device.deviceconnection_set.first()
         )
-
-        with mock.patch("celery.app.control.Inspect.active") as mocked_active:
-            mocked_active.return_value = {
-                "task": [{"name": _TASK_NAME, "args": ["..."]}]
-            }
-            conf.config = {"general": {"timezone": "UTC"}}
-            conf.full_clean()
-            conf.save()
-            mocked_active.assert_called_once()
-            mocked_get_working_connection.assert_called_once()
-            mocked_update_config.assert_called_once()
+        conf.config = {"general": {"timezone": "UTC"}}
+        conf.full_clean()
+        conf.save()
+        mocked_get_working_connection.assert_called_once()
+        mocked_update_config.assert_called_once()
+        # the lock is released at the end of the operation
+        self.assertIsNone(
+            cache.get(get_update_config_cache_key(conf.device.pk, "lock"))
+        )
 
     @mock.patch(_connect_path)
     def test_schedule_command_called(self, connect_mocked):
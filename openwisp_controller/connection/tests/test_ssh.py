@@ -6,6 +6,8 @@ from django.test import TestCase
 from paramiko.ssh_exception import AuthenticationException
 from swapper import load_model
 
+from ..connectors import ssh
+from ..connectors.pool import SshConnectionPool
 from ..connectors.ssh import logger as ssh_logger
 from .utils import CreateConnectionsMixin, SshServer
 
@@ -108,3 +110,57 @@ class TestSsh(CreateConnectionsMixin, TestCase):
         ckey = self._create_credentials_with_key(port=self.ssh_server.port)
         dc = self._create_device_connection(credentials=ckey)
         self.assertEqual(dc.connector_instance.is_connected, False)
+
+    def test_connection_pool(self):
+        pool = SshConnectionPool(max_size=2, idle_timeout=60)
+        ckey = self._create_credentials_with_key(port=self.ssh_server.port)
+        dc = self._create_device_connection(credentials=ckey)
+        with mock.patch.object(ssh, "ssh_connection_pool", pool):
+            dc.connect()
+            self.assertTrue(dc.is_working)
+            dc.disconnect()
+            self.assertEqual(len(pool), 1)
+            # a new connector instance reuses the pooled session
+            dc = DeviceConnection.objects.get(pk=dc.pk)
+            with mock.patch("paramiko.SSHClient.connect") as mocked_connect:
+                dc.connect()
+            mocked_connect.assert_not_called()
+            self.assertTrue(dc.is_working)
+            self.assertEqual(len(pool), 0)
+            output, exit_code = dc.connector_instance.exec_command("echo test")
+            self.assertEqual(output, "test\n")
+            dc.disconnect()
+            self.assertEqual(len(pool), 1)
+
+        with self.subTest("idle clients are not reused"):
+            pool.idle_timeout = -1
+            dc = DeviceConnection.objects.get(pk=dc.pk)
+            with mock.patch(
+                "paramiko.SSHClient.close", autospec=True
+            ) as mocked_close, mock.patch.object(ssh, "ssh_connection_pool", pool):
+                self.assertFalse(dc.connector_instance._connect_from_pool())
+            mocked_close.assert_called_once()
+            self.assertEqual(len(pool), 0)
+
+    def test_connection_pool_release(self):
+        pool = SshConnectionPool(max_size=1, idle_timeout=60)
+        clients = [mock.MagicMock() for _ in range(3)]
+        with self.subTest("broken clients are closed"):
+            clients[0].get_transport.return_value = None
+            pool.release("key0", clients[0])
+            clients[0].close.assert_called_once()
+            self.assertEqual(len(pool), 0)
+
+        with self.subTest("least recently released clients are evicted"):
+            pool.release("key1", clients[1])
+            pool.release("key2", clients[2])
+            clients[1].close.assert_called_once()
+            clients[2].close.assert_not_called()
+            self.assertIsNone(pool.acquire("key1"))
+            self.assertIs(pool.acquire("key2"), clients[2])
+
+        with self.subTest("disabled pool"):
+            pool.max_size = 0
+            pool.release("key2", clients[2])
+            clients[2].close.assert_called_once()
+            self.assertEqual(len(pool), 0)
@@ -4,9 +4,11 @@ from io import StringIO
 from unittest import mock
 
 from celery.exceptions import SoftTimeLimitExceeded
+from django.core.cache import cache
 from django.test import TestCase
 from swapper import load_model
 
+from .. import settings as app_settings
 from .. import tasks
 from .utils import CreateConnectionsMixin
 
@@ -20,24 +22,38 @@ class TestTasks(CreateConnectionsMixin, TestCase):
     )
 
     @mock.patch("logging.Logger.warning")
-    @mock.patch("time.sleep")
-    def test_update_config_missing_config(self, mocked_sleep, mocked_warning):
+    def test_update_config_missing_config(self, mocked_warning):
         pk = self._create_device().pk
         tasks.update_config.delay(pk)
         mocked_warning.assert_called_with(
             f'update_config("{pk}") failed: Device has no config.'
         )
-        mocked_sleep.assert_called_once()
 
     @mock.patch("logging.Logger.warning")
-    @mock.patch("time.sleep")
-    def test_update_config_missing_device(self, mocked_sleep, mocked_warning):
+    def test_update_config_missing_device(self, mocked_warning):
         pk = uuid.uuid4()
         tasks.update_config.delay(pk)
         mocked_warning.assert_called_with(
             f'update_config("{pk}") failed: Device matching query does not exist.'
         )
-        mocked_sleep.assert_called_once()
+
+    @mock.patch.object(tasks.update_config, "apply_async")
+    def test_schedule_update_config(self, mocked_apply_async):
+        pk = uuid.uuid4()
+        self.assertTrue(tasks.schedule_update_config(pk))
+        mocked_apply_async.assert_called_once_with(
+            args=[pk], countdown=app_settings.UPDATE_CONFIG_DELAY
+        )
+        with self.subTest("subsequent calls are collapsed"):
+            self.assertFalse(tasks.schedule_update_config(pk))
+            self.assertFalse(tasks.schedule_update_config(pk))
+            mocked_apply_async.assert_called_once()
+        with self.subTest("can be scheduled again once the task starts"):
+            with mock.patch("logging.Logger.warning"):
+                tasks.update_config(pk)
+            self.assertTrue(tasks.schedule_update_config(pk))
+            self.assertEqual(mocked_apply_async.call_count, 2)
+        cache.delete(tasks.get_update_config_cache_key(pk, "scheduled"))
 
     @mock.patch("logging.Logger.warning")
     def test_launch_command_missing(self, mocked_warning):
@@ -0,0 +1,147 @@
+import uuid
+from ipaddress import ip_network
+
+from django.core.cache import cache
+from django.db import transaction
+from swapper import load_model
+
+Subnet = load_model("openwisp_ipam", "Subnet")
+
+
+class SubnetAllocator(object):
+    """
+    Allocates the free address space of a master subnet.
+
+    The free space is computed from the subnets which already belong
+    to the master subnet, hence the subnets released by deleted objects
+    are reused. The master subnet row is locked (``SELECT ... FOR UPDATE``)
+    to serialize concurrent allocations, therefore the allocator must be
+    instantiated and used inside a ``transaction.atomic`` block which also
+    saves the allocated subnets.
+
+    Loading and parsing every subnet of the master subnet takes time
+    proportional to their amount, hence the free space left by each
+    allocation is cached when the transaction is committed; the next
+    allocator reuses it (counting the subnets instead of loading them)
+    unless the subnets of the master subnet have been changed in the
+    meantime (see ``invalidate_cache``) or their amount doesn't match.
+    """
+
+    cache_timeout = 60 * 60 * 24
+
+    def __init__(self, master_subnet):
+        self.master_subnet = master_subnet
+        network = ip_network(str(master_subnet.subnet))
+        self.max_prefixlen = network.max_prefixlen
+        self._network_class = type(network)
+        # locks the master subnet until the end of the transaction
+        list(
+            Subnet.objects.select_for_update()
+            .filter(pk=master_subnet.pk)
+            .values_list("pk", flat=True)
+        )
+        key = self.get_cache_key(master_subnet.pk)
+        self._version = cache.get(f"{key}-version")
+        cached = cache.get(key)
+        if cached and cached["version"] == self._version:
+            self._count = Subnet.objects.filter(
+                master_subnet_id=master_subnet.pk
+            ).count()
+            if self._count == cached["count"]:
+                self.is_empty = not self._count
+                # sorted list of free [start, end) intervals
+                self._free = cached["free"]
+                transaction.on_commit(self._cache_free_space)
+                return
+        used = []
+        for subnet in Subnet.objects.filter(
+            master_subnet_id=master_subnet.pk
+        ).values_list("subnet", flat=True):
+            subnet = ip_network(str(subnet))
+            used.append(
+                (int(subnet.network_address), int(subnet.broadcast_address) + 1)
+            )
+        used.sort()
+        self._count = len(used)
+        self.is_empty = not used
+        # sorted list of free [start, end) intervals
+        self._free = []
+        start = int(network.network_address)
+        for used_start, used_end in used:
+            if used_start > start:
+                self._free.append([start, used_start])
+            start = max(start, used_end)
+        end = int(network.broadcast_address) + 1
+        if end > start:
+            self._free.append([start, end])
+        transaction.on_commit(self._cache_free_space)
+
+    @staticmethod
+    def get_cache_key(master_subnet_id):
+        return f"subnet-allocator-{master_subnet_id}"
+
+    @classmethod
+    def invalidate_cache(cls, master_subnet_id):
+        key = cls.get_cache_key(master_subnet_id)
+        # random values, unlike counters, are never
+        # reused if the key is evicted from the cache
+        cache.set(f"{key}-version", uuid.uuid4().hex, cls.cache_timeout)
+        cache.delete(key)
+
+    @classmethod
+    def invalidate_cache_receiver(cls, instance, **kwargs):
+        """
+        Invalidates the cached free space of the master subnet
+        when one of its subnets is changed or deleted outside
+        of the allocator, once the transaction is committed
+        """
+        master_subnet_id = instance.master_subnet_id
+        if master_subnet_id:
+            transaction.on_commit(lambda: cls.invalidate_cache(master_subnet_id))
+
+    def _cache_free_space(self):
+        """
+        Caches the free space left once the allocated subnets
+        are saved, unless the subnets of the master subnet
+        have been changed by somebody else in the meantime
+        """
+        key = self.get_cache_key(self.master_subnet.pk)
+        if cache.get(f"{key}-version") != self._version:
+            return
+        cache.set(
+            key,
+            {"version": self._version, "count": self._count, "free": self._free},
+            self.cache_timeout,
+        )
+
+    def allocate(self, prefixlen, count=1):
+        """
+        Returns a list of at most ``count`` free subnets having
+        ``prefixlen`` as prefix length, looking for them from the
+        lowest address of the master subnet (first fit); less
+        subnets are returned when the master subnet runs out of space
+        """
+        size = 2 ** (self.max_prefixlen - prefixlen)
+        subnets = []
+        index = 0
+        while index < len(self._free) and len(subnets) < count:
+            start, end = self._free[index]
+            # subnets must be aligned to their size
+            address = -(-start // size) * size
+            if address + size > end:
+                index += 1
+                continue
+            remaining = []
+            if address > start:
+                remaining.append([start, address])
+            while address + size <= end and len(subnets) < count:
+                subnets.append(self._network_class((address, prefixlen)))
+                address += size
+            if end > address:
+                remaining.append([address, end])
+            del self._free[index]
+            for interval in reversed(remaining):
+                self._free.insert(index, interval)
+            index += len(remaining)
+        self._count += len(subnets)
+        return subnets
@@ -14,6 +14,8 @@ class SubnetDivisionConfig(AppConfig):
     default_auto_field = "django.db.models.AutoField"
 
     def ready(self):
+        from .allocator import SubnetAllocator
+
         super().ready()
         self._load_models()
         self._add_config_context_method()
@@ -47,11 +49,22 @@ class SubnetDivisionConfig(AppConfig):
             sender=self.subnetdivisionrule_model_,
             dispatch_uid="subnetdivisionrule_post_delete",
         )
+        post_save.connect(
+            receiver=SubnetAllocator.invalidate_cache_receiver,
+            sender=self.subnet_model_,
+            dispatch_uid="subnet_allocator_invalidate_cache_post_save",
+        )
+        post_delete.connect(
+            receiver=SubnetAllocator.invalidate_cache_receiver,
+            sender=self.subnet_model_,
+            dispatch_uid="subnet_allocator_invalidate_cache_post_delete",
+        )
 
     def _load_models(self):
         self.subnetdivisionrule_model_ = load_model(
             "subnet_division", "SubnetDivisionRule"
         )
+        self.subnet_model_ = load_model("openwisp_ipam", "Subnet")
 
     def _add_config_context_method(self):
         from openwisp_controller.config.tests import CreateConfigTemplateMixin
@@ -195,8 +195,9 @@ class AbstractSubnetDivisionRule(TimeStampedEditableModel, OrgMixin):
             return
         else:
             if "label" in modified_fields:
-                tasks.update_subnet_division_index.delay(rule_id=str(self.id))
-                tasks.update_subnet_name_description(rule_id=str(self.id))
+                tasks.update_subnet_division_rule_label.delay(
+                    rule_id=str(self.id), old_label=modified_fields["label"]
+                )
             if "number_of_ips" in modified_fields:
                 tasks.provision_extra_ips.delay(
                     rule_id=str(self.id),
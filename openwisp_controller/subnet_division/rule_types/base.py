@@ -1,15 +1,17 @@
 import logging
+from bisect import bisect_right
 from ipaddress import ip_network
 from operator import attrgetter
 
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import connection, transaction
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import transaction
+from django.db.models import Q
 from django.dispatch import Signal
 from django.utils.translation import gettext_lazy as _
-from netaddr import IPNetwork
 from openwisp_notifications.signals import notify
 from swapper import load_model
 
+from ..allocator import SubnetAllocator
 from ..signals import subnet_provisioned
 
 logger = logging.getLogger(__name__)
@@ -33,6 +35,9 @@ class BaseSubnetDivisionRuleType(object):
     organization_id_path = None
     subnet_path = None
     config_path = "config"
+    # amount of objects provisioned in each
+    # transaction by "bulk_provision"
+    provision_batch_size = 1000
 
     @classmethod
     def validate_rule_type(cls):
@@ -119,15 +124,18 @@ class BaseSubnetDivisionRuleType(object):
             return
 
         master_subnet = division_rule.master_subnet
-        max_subnet = cls.get_max_subnet(master_subnet, division_rule)
         generated_indexes = []
-        generated_subnets = cls.create_subnets(
-            config, division_rule, max_subnet, generated_indexes
-        )
-        generated_ips = cls.create_ips(
-            config, division_rule, generated_subnets, generated_indexes
-        )
-        SubnetDivisionIndex.objects.bulk_create(generated_indexes)
+        with transaction.atomic():
+            allocator = SubnetAllocator(master_subnet)
+            if allocator.is_empty:
+                cls.create_reserved_subnet(master_subnet, division_rule, allocator)
+            generated_subnets = cls.create_subnets(
+                config, division_rule, allocator, generated_indexes
+            )
+            generated_ips = cls.create_ips(
+                config, division_rule, generated_subnets, generated_indexes
+            )
+            SubnetDivisionIndex.objects.bulk_create(generated_indexes)
         return {"subnets": generated_subnets, "ip_addresses": generated_ips}
 
     @classmethod
@@ -149,11 +157,14 @@ class BaseSubnetDivisionRuleType(object):
         ).iterator()
 
     @classmethod
-    def get_config(cls, instance):
+    def _get_config(cls, instance):
         if cls.config_path == "self":
-            config = instance
-        else:
-            config = attrgetter(cls.config_path)(instance)
+            return instance
+        return attrgetter(cls.config_path)(instance)
+
+    @classmethod
+    def get_config(cls, instance):
+        config = cls._get_config(instance)
         # check for real existence in DB to workaround
         # this django-import-export bug:
         # https://github.com/django-import-export/django-import-export/issues/1078
@@ -164,74 +175,251 @@ class BaseSubnetDivisionRuleType(object):
         return config
 
     @staticmethod
-    def get_max_subnet(master_subnet, division_rule):
-        # Only PostgreSQL supports ordering queryset using the "subnet"
-        # field. If the project is using any other database backend, then
-        # "created" field is used for ordering the queryset.
-        order_field = "-subnet" if connection.vendor == "postgresql" else "-created"
+    def create_reserved_subnet(master_subnet, division_rule, allocator):
+        """
+        Creates a reserved subnet at the start of an empty master subnet,
+        which leaves room for the addresses assigned outside of
+        the subnet division rules (eg: gateways)
+        """
         try:
-            max_subnet = (
-                # Get the highest subnet created for this master_subnet
-                Subnet.objects.filter(master_subnet_id=master_subnet.id)
-                .order_by(order_field)
-                .first()
-                .subnet
+            required_subnet = allocator.allocate(division_rule.size)[0]
+        except IndexError:
+            return
+        subnet_obj = Subnet(
+            name=f"Reserved Subnet {required_subnet}",
+            subnet=str(required_subnet),
+            description=_("Automatically generated reserved subnet."),
+            master_subnet_id=master_subnet.id,
+            organization_id=master_subnet.organization_id,
+        )
+        subnet_obj.full_clean()
+        subnet_obj.save()
+        return subnet_obj
+
+    @classmethod
+    def create_subnets(cls, config, division_rule, allocator, generated_indexes):
+        required_subnets = allocator.allocate(
+            division_rule.size, division_rule.number_of_subnets
+        )
+        generated_subnets = cls._build_subnets(
+            config, division_rule, required_subnets, generated_indexes
+        )
+        if len(required_subnets) < division_rule.number_of_subnets:
+            cls._notify_subnets_exhausted(config, division_rule.master_subnet)
+        Subnet.objects.bulk_create(generated_subnets)
+        return generated_subnets
+
+    @classmethod
+    def create_ips(cls, config, division_rule, generated_subnets, generated_indexes):
+        generated_ips = cls._build_ips(
+            config, division_rule, generated_subnets, generated_indexes
+        )
+        IpAddress.objects.bulk_create(generated_ips)
+        return generated_ips
+
+    @classmethod
+    def bulk_provision(cls, queryset, division_rule):
+        """
+        Provisions subnets and IP addresses of "division_rule" for all
+        the objects of "queryset", which are processed in chunks of
+        "provision_batch_size" objects, each one in its own transaction;
+        the subnets checked by "_validate_overlapping_subnets" are loaded
+        only once and the subnets created by each chunk are added to them
+        """
+        existing_subnets = cls._get_overlapping_candidates(division_rule)
+        chunk = []
+        for instance in queryset.iterator(chunk_size=cls.provision_batch_size):
+            chunk.append(instance)
+            if len(chunk) == cls.provision_batch_size:
+                cls.bulk_create_subnets_ips(chunk, division_rule, existing_subnets)
+                chunk = []
+        if chunk:
+            cls.bulk_create_subnets_ips(chunk, division_rule, existing_subnets)
+
+    @classmethod
+    def bulk_create_subnets_ips(cls, instances, division_rule, existing_subnets=None):
+        """
+        Provisions subnets and IP addresses of "division_rule" for
+        all the "instances" (which must exist in the database) with
+        a single allocation pass and chunked inserts, then calls
+        "post_provision_handler" and emits "subnet_provisioned"
+        for each instance; "existing_subnets" (see
+        "_get_overlapping_candidates") is updated with the created subnets
+        """
+        master_subnet = division_rule.master_subnet
+        number_of_subnets = division_rule.number_of_subnets
+        generated_subnets = []
+        generated_ips = []
+        generated_indexes = []
+        provisioned = []
+        with transaction.atomic():
+            allocator = SubnetAllocator(master_subnet)
+            if allocator.is_empty:
+                reserved_subnet = cls.create_reserved_subnet(
+                    master_subnet, division_rule, allocator
+                )
+                if reserved_subnet and existing_subnets is not None:
+                    existing_subnets.append(ip_network(str(reserved_subnet.subnet)))
+            required_subnets = allocator.allocate(
+                division_rule.size, number_of_subnets * len(instances)
             )
-        except AttributeError:
-            # If there is no existing subnet, create a reserved subnet
-            # and use it as starting point
-            required_subnet = next(
-                IPNetwork(str(master_subnet.subnet)).subnet(
-                    prefixlen=division_rule.size
+            for position, instance in enumerate(instances):
+                config = cls._get_config(instance)
+                start = position * number_of_subnets
+                end = start + number_of_subnets
+                subnets = cls._build_subnets(
+                    config,
+                    division_rule,
+                    required_subnets[start:end],
+                    generated_indexes,
+                    validate=False,
                 )
+                if len(subnets) < number_of_subnets:
+                    cls._notify_subnets_exhausted(config, master_subnet)
+                ips = cls._build_ips(
+                    config, division_rule, subnets, generated_indexes, validate=False
+                )
+                generated_subnets.extend(subnets)
+                generated_ips.extend(ips)
+                provisioned.append(
+                    (instance, {"subnets": subnets, "ip_addresses": ips})
+                )
+            # the subnets differ only in the network, which is checked
+            # for the whole batch by "_validate_overlapping_subnets";
+            # the IP addresses are derived from the subnets, hence
+            # validating the first one covers the rest of the batch
+            if generated_subnets:
+                generated_subnets[0].clean_fields()
+                cls._validate_overlapping_subnets(
+                    division_rule, generated_subnets, existing_subnets
+                )
+            Subnet.objects.bulk_create(
+                generated_subnets, batch_size=cls.provision_batch_size
             )
-            subnet_obj = Subnet(
-                name=f"Reserved Subnet {required_subnet}",
-                subnet=str(required_subnet),
-                description=_("Automatically generated reserved subnet."),
-                master_subnet_id=master_subnet.id,
-                organization_id=master_subnet.organization_id,
+            if existing_subnets is not None:
+                existing_subnets.extend(
+                    ip_network(str(subnet.subnet)) for subnet in generated_subnets
+                )
+            if generated_ips:
+                generated_ips[0].full_clean()
+            IpAddress.objects.bulk_create(
+                generated_ips, batch_size=cls.provision_batch_size
+            )
+            SubnetDivisionIndex.objects.bulk_create(
+                generated_indexes, batch_size=cls.provision_batch_size
+            )
+        for instance, instance_provisioned in provisioned:
+            cls.post_provision_handler(
+                instance, instance_provisioned, created=True, rule=division_rule
             )
-            subnet_obj.full_clean()
-            subnet_obj.save()
-            max_subnet = subnet_obj.subnet
-        return max_subnet
+            cls.subnet_provisioned_signal_emitter(instance, instance_provisioned)
+        return provisioned
 
     @staticmethod
-    def create_subnets(config, division_rule, max_subnet, generated_indexes):
+    def _get_overlapping_candidates(division_rule):
+        """
+        Returns the networks of the subnets which the subnets
+        generated by "division_rule" may overlap with
+        """
         master_subnet = division_rule.master_subnet
-        required_subnet = IPNetwork(str(max_subnet)).next()
-        generated_subnets = []
+        organization_id = division_rule.organization_id
+        if master_subnet.organization_id is None or organization_id is None:
+            organization_query = Q()
+        else:
+            organization_query = Q(organization_id=organization_id) | Q(
+                organization_id__isnull=True
+            )
+        # the ancestors of the generated subnets contain them legitimately
+        ancestor_pks = []
+        parent_subnet = master_subnet
+        while parent_subnet:
+            ancestor_pks.append(parent_subnet.pk)
+            parent_subnet = parent_subnet.master_subnet
+        version = ip_network(str(master_subnet.subnet)).version
+        queryset = (
+            Subnet.objects.filter(organization_query)
+            .exclude(pk__in=ancestor_pks)
+            .values_list("subnet", flat=True)
+        )
+        return [
+            subnet
+            for subnet in (ip_network(str(subnet)) for subnet in queryset.iterator())
+            if subnet.version == version
+        ]
 
-        for subnet_id in range(1, division_rule.number_of_subnets + 1):
-            if not ip_network(str(required_subnet)).subnet_of(master_subnet.subnet):
-                notify.send(
-                    sender=config,
-                    type="generic_message",
-                    target=config.device,
-                    action_object=master_subnet,
-                    level="error",
-                    message=_(
-                        "Failed to provision subnets for"
-                        " [{notification.target}]({notification.target_link})"
-                    ),
-                    description=_(
-                        "The [{notification.action_object}]({notification.action_link})"
-                        " subnet has run out of space."
-                    ),
-                )
-                logger.info(f"Cannot create more subnets of {master_subnet}")
-                break
+    @classmethod
+    def _validate_overlapping_subnets(
+        cls, division_rule, generated_subnets, existing_subnets=None
+    ):
+        """
+        Performs the overlapping and uniqueness checks of "Subnet.clean"
+        on all the "generated_subnets" (which belong to the same master
+        subnet and organization) against "existing_subnets", which are
+        loaded with "_get_overlapping_candidates" when not passed,
+        raises "ValidationError" like "full_clean"
+        """
+        if existing_subnets is None:
+            existing_subnets = cls._get_overlapping_candidates(division_rule)
+        if (
+            division_rule.master_subnet.organization_id is None
+            or division_rule.organization_id is None
+        ):
+            error_message = _("Subnet overlaps with a subnet of another organization.")
+        else:
+            error_message = _("Subnet overlaps with {0}.")
+        generated = sorted(
+            (int(subnet.network_address), int(subnet.broadcast_address) + 1)
+            for subnet in (ip_network(str(obj.subnet)) for obj in generated_subnets)
+        )
+        starts = [start for start, end in generated]
+        for subnet in existing_subnets:
+            start = int(subnet.network_address)
+            end = int(subnet.broadcast_address) + 1
+            # the generated subnets are disjoint, hence only the one
+            # containing "start" and the next one may overlap "subnet"
+            index = bisect_right(starts, start) - 1
+            if (index >= 0 and generated[index][1] > start) or (
+                index + 1 < len(generated) and generated[index + 1][0] < end
+            ):
+                raise ValidationError({"subnet": error_message.format(subnet)})
+
+    @staticmethod
+    def _notify_subnets_exhausted(config, master_subnet):
+        notify.send(
+            sender=config,
+            type="generic_message",
+            target=config.device,
+            action_object=master_subnet,
+            level="error",
+            message=_(
+                "Failed to provision subnets for"
+                " [{notification.target}]({notification.target_link})"
+            ),
+            description=_(
+                "The [{notification.action_object}]({notification.action_link})"
+                " subnet has run out of space."
+            ),
+        )
+        logger.info(f"Cannot create more subnets of {master_subnet}")
+
+    @staticmethod
+    def _build_subnets(
+        config, division_rule, required_subnets, generated_indexes, validate=True
+    ):
+        master_subnet = division_rule.master_subnet
+        generated_subnets = []
+        for subnet_id, required_subnet in enumerate(required_subnets, start=1):
             subnet_obj = Subnet(
                 name=f"{division_rule.label}_subnet{subnet_id}",
-                subnet=str(required_subnet),
+                subnet=required_subnet,
                 description=_(
                     f"Automatically generated using {division_rule.label} rule."
                 ),
                 master_subnet_id=master_subnet.id,
                 organization_id=division_rule.organization_id,
             )
-            subnet_obj.full_clean()
+            if validate:
+                subnet_obj.full_clean()
             generated_subnets.append(subnet_obj)
             generated_indexes.append(
                 SubnetDivisionIndex(
@@ -241,12 +429,12 @@ class BaseSubnetDivisionRuleType(object):
                     config=config,
                 )
             )
-            required_subnet = required_subnet.next()
-        Subnet.objects.bulk_create(generated_subnets)
         return generated_subnets
 
     @staticmethod
-    def create_ips(config, division_rule, generated_subnets, generated_indexes):
+    def _build_ips(
+        config, division_rule, generated_subnets, generated_indexes, validate=True
+    ):
         generated_ips = []
         for subnet_obj in generated_subnets:
             # don't assign first ip address of a subnet,
@@ -267,7 +455,8 @@ class BaseSubnetDivisionRuleType(object):
                     subnet_id=subnet_obj.id,
                     ip_address=str(subnet_obj.subnet[ip_index]),
                 )
-                ip_obj.full_clean()
+                if validate:
+                    ip_obj.full_clean()
                 generated_ips.append(ip_obj)
                 # ensure human friendly labels (starting from 1 instead of 0)
                 keyword_index = ip_index if index_start == 1 else ip_index + 1
@@ -280,7 +469,6 @@ class BaseSubnetDivisionRuleType(object):
                         config=config,
                     )
                 )
-        IpAddress.objects.bulk_create(generated_ips)
         return generated_ips
 
     @classmethod
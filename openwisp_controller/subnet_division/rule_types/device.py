@@ -44,9 +44,7 @@ class DeviceSubnetDivisionRuleType(BaseSubnetDivisionRuleType):
 
     @classmethod
     def provision_for_existing_objects(cls, rule_obj):
-        for config in (
-            Config.objects.select_related("device", "device__organization")
-            .filter(device__organization_id=rule_obj.organization_id)
-            .iterator()
-        ):
-            cls.provision_receiver(config, created=True, rule=rule_obj)
+        queryset = Config.objects.select_related("device").filter(
+            device__organization_id=rule_obj.organization_id
+        )
+        cls.bulk_provision(queryset, rule_obj)
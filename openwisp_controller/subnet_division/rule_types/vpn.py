@@ -35,11 +35,10 @@ class VpnSubnetDivisionRuleType(BaseSubnetDivisionRuleType):
             .filter(organization_filter)
             .values_list("id")
         )
-        qs = VpnClient.objects.filter(
+        qs = VpnClient.objects.select_related("config__device", "ip").filter(
             vpn__in=vpn_qs, config__device__organization_id=rule_obj.organization_id
         )
-        for vpn_client in qs:
-            cls.provision_receiver(instance=vpn_client, created=True)
+        cls.bulk_provision(qs, rule_obj)
 
     @staticmethod
     def post_provision_handler(instance, provisioned, **kwargs):
@@ -2,6 +2,8 @@ import logging
 
 from celery import shared_task
 from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
 from django.utils.translation import gettext_lazy as _
 from swapper import load_model
 
@@ -17,7 +19,7 @@ VpnClient = load_model("config", "VpnClient")
 
 
 @shared_task
-def update_subnet_division_index(rule_id):
+def update_subnet_division_index(rule_id, old_label=None):
     try:
         division_rule = SubnetDivisionRule.objects.get(id=rule_id)
     except SubnetDivisionRule.DoesNotExist as e:
@@ -26,46 +28,107 @@ def update_subnet_division_index(rule_id):
             f'with id: "{rule_id}", reason: {e}'
         )
         return
+    with transaction.atomic():
+        _update_index_keywords(division_rule, old_label)
+    _invalidate_config_checksums(division_rule)
 
-    for index in division_rule.subnetdivisionindex_set.only("keyword").iterator():
-        identifiers = index.keyword.split("_")
-        if index.ip_id is not None:
-            required_identifiers = 2
-        else:
-            required_identifiers = 1
-        index.keyword = "_".join(
-            [division_rule.label] + identifiers[-required_identifiers:]
+
+@shared_task
+def update_subnet_name_description(rule_id, old_label=None):
+    try:
+        division_rule = SubnetDivisionRule.objects.get(id=rule_id)
+    except SubnetDivisionRule.DoesNotExist as e:
+        logger.warning(
+            "Failed to update subnets related to Subnet Division Rule "
+            f'with id: "{rule_id}", reason: {e}'
         )
-        index.save()
+        return
+    with transaction.atomic():
+        _update_subnet_names(division_rule, old_label)
 
 
 @shared_task
-def update_subnet_name_description(rule_id):
+def update_subnet_division_rule_label(rule_id, old_label):
+    """
+    Rewrites the keywords of the indexes and the names of the subnets
+    of a rule whose label has changed in one transaction, then
+    invalidates the cached checksum of the affected configs
+    """
     try:
         division_rule = SubnetDivisionRule.objects.get(id=rule_id)
     except SubnetDivisionRule.DoesNotExist as e:
         logger.warning(
-            "Failed to update subnets related to Subnet Division Rule "
+            "Failed to update label of Subnet Division Rule "
             f'with id: "{rule_id}", reason: {e}'
         )
         return
+    with transaction.atomic():
+        _update_index_keywords(division_rule, old_label)
+        _update_subnet_names(division_rule, old_label)
+    _invalidate_config_checksums(division_rule)
+
+
+def _replace_label(field_name, old_label, label):
+    """
+    Returns an expression which replaces the "old_label"
+    prefix of "field_name" with "label"
+    """
+    return Concat(Value(label), Substr(field_name, len(old_label) + 1))
+
+
+def _update_index_keywords(division_rule, old_label=None):
+    index_queryset = division_rule.subnetdivisionindex_set
+    if old_label is not None:
+        index_queryset.filter(keyword__startswith=f"{old_label}_").update(
+            keyword=_replace_label("keyword", old_label, division_rule.label)
+        )
+        return
+    # the previous label is unknown, the keywords
+    # are rebuilt from their trailing identifiers
+    indexes = []
+    for index in index_queryset.only("keyword", "ip_id").iterator():
+        identifiers = index.keyword.split("_")
+        if index.ip_id is not None:
+            required_identifiers = 2
+        else:
+            required_identifiers = 1
+        index.keyword = "_".join(
+            [division_rule.label] + identifiers[-required_identifiers:]
+        )
+        indexes.append(index)
+    SubnetDivisionIndex.objects.bulk_update(
+        indexes, fields=["keyword"], batch_size=1000
+    )
 
+
+def _update_subnet_names(division_rule, old_label=None):
     related_subnet_ids = division_rule.subnetdivisionindex_set.filter(
         subnet_id__isnull=False,
         ip_id__isnull=True,
     ).values_list("subnet_id")
     subnet_queryset = Subnet.objects.filter(id__in=related_subnet_ids)
-
-    for subnet in subnet_queryset:
-        identifiers = subnet.name.split("_")
-        identifiers[0] = division_rule.label
-        subnet.name = "_".join(identifiers)
-        subnet.description = _(
-            f"Automatically generated using {division_rule.label} rule."
+    description = _(f"Automatically generated using {division_rule.label} rule.")
+    if old_label is not None:
+        subnet_queryset.filter(name__startswith=f"{old_label}_").update(
+            name=_replace_label("name", old_label, division_rule.label),
+            description=Value(str(description)),
         )
-
-    Subnet.objects.bulk_update(
-        subnet_queryset, fields=["name", "description"], batch_size=20
+        return
+    subnets = list(subnet_queryset)
+    for subnet in subnets:
+        identifiers = subnet.name.split("_")
+        subnet.name = "_".join([division_rule.label, identifiers[-1]])
+        subnet.description = description
+    Subnet.objects.bulk_update(subnets, fields=["name", "description"], batch_size=1000)
+
+
+def _invalidate_config_checksums(division_rule):
+    Config.bulk_invalidate_get_cached_checksum(
+        {
+            "id__in": division_rule.subnetdivisionindex_set.filter(
+                config_id__isnull=False
+            ).values("config_id")
+        }
     )
 
 
@@ -1,7 +1,9 @@
 import uuid
+from ipaddress import ip_network
 from unittest import TestCase
 from unittest.mock import patch
 
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.test import TransactionTestCase
 from django.urls import reverse
@@ -11,12 +13,19 @@ from openwisp_controller.config.tests.utils import (
     TestVpnX509Mixin,
     TestWireguardVpnMixin,
 )
+from openwisp_controller.subnet_division.rule_types.device import (
+    DeviceSubnetDivisionRuleType,
+)
 from openwisp_controller.subnet_division.rule_types.vpn import VpnSubnetDivisionRuleType
 from openwisp_utils.tests import catch_signal
 
 from .. import tasks
+from ..allocator import SubnetAllocator
 from ..signals import subnet_provisioned
-from ..utils import get_subnet_division_config_context
+from ..utils import (
+    bulk_get_subnet_division_config_context,
+    get_subnet_division_config_context,
+)
 from .helpers import SubnetDivisionTestMixin
 
 Subnet = load_model("openwisp_ipam", "Subnet")
@@ -24,6 +33,7 @@ IpAddress = load_model("openwisp_ipam", "IpAddress")
 SubnetDivisionRule = load_model("subnet_division", "SubnetDivisionRule")
 SubnetDivisionIndex = load_model("subnet_division", "SubnetDivisionIndex")
 VpnClient = load_model("config", "VpnClient")
+Config = load_model("config", "Config")
 Device = load_model("config", "Device")
 OrganizationConfigSettings = load_model("config", "OrganizationConfigSettings")
 Notification = load_model("openwisp_notifications", "Notification")
@@ -57,6 +67,10 @@ class BaseSubnetDivisionRule:
         # Verify context of config
         context = get_subnet_division_config_context(self.config)
         self.assertIn(f"{rule.label}_prefixlen", context)
+        self.assertEqual(
+            bulk_get_subnet_division_config_context([self.config]),
+            {self.config.pk: context},
+        )
         for subnet_id in range(1, rule.number_of_subnets + 1):
             self.assertIn(f"{rule.label}_subnet{subnet_id}", context)
             for ip_id in range(1, rule.number_of_ips + 1):
@@ -334,7 +348,11 @@ class TestSubnetDivisionRule(
         index_count = index_queryset.count()
         subnet_count = subnet_queryset.count()
         rule.label = new_rule_label
-        rule.save()
+        with patch.object(
+            Config, "bulk_invalidate_get_cached_checksum"
+        ) as mocked_invalidate:
+            rule.save()
+        mocked_invalidate.assert_called_once()
         rule.refresh_from_db()
 
         self.assertEqual(rule.label, new_rule_label)
@@ -359,6 +377,34 @@ class TestSubnetDivisionRule(
             description__contains=new_rule_label,
         ).count()
         self.assertEqual(subnet_count, new_subnet_count)
+        self.assertEqual(
+            sorted(subnet_queryset.values_list("name", flat=True)),
+            [
+                f"{new_rule_label}_subnet{subnet_id}"
+                for subnet_id in range(1, rule.number_of_subnets + 1)
+            ],
+        )
+
+    def test_update_subnet_division_index_without_old_label(self):
+        rule = self._get_vpn_subdivision_rule(label="VPN_OW")
+        self.config.templates.add(self.template)
+        index_queryset = rule.subnetdivisionindex_set.filter(config_id=self.config.id)
+        keywords = sorted(index_queryset.values_list("keyword", flat=True))
+        SubnetDivisionRule.objects.filter(pk=rule.pk).update(label="TSDR")
+        tasks.update_subnet_division_index.run(rule.pk)
+        tasks.update_subnet_name_description.run(rule.pk)
+        self.assertEqual(
+            sorted(index_queryset.values_list("keyword", flat=True)),
+            [keyword.replace("VPN_OW", "TSDR", 1) for keyword in keywords],
+        )
+        self.assertEqual(
+            self.subnet_query.filter(
+                subnetdivisionindex__in=index_queryset, name__startswith="TSDR_"
+            )
+            .distinct()
+            .count(),
+            rule.number_of_subnets,
+        )
 
     def test_number_of_ips_updated(self):
         rule = self._get_vpn_subdivision_rule()
@@ -657,6 +703,85 @@ class TestSubnetDivisionRule(
             0,
         )
 
+    def test_freed_subnets_reused(self):
+        self._get_vpn_subdivision_rule()
+        self.config.templates.add(self.template)
+        freed_subnets = {
+            str(subnet.subnet)
+            for subnet in self.subnet_query.filter(
+                subnetdivisionindex__config=self.config
+            ).distinct()
+        }
+        config2 = self._create_config(
+            device=self._create_device(name="device2", mac_address="00:11:22:33:44:66")
+        )
+        config2.templates.add(self.template)
+        self.config.device.delete(check_deactivated=False)
+
+        config3 = self._create_config(
+            device=self._create_device(name="device3", mac_address="00:11:22:33:44:77")
+        )
+        config3.templates.add(self.template)
+        self.assertEqual(
+            {
+                str(subnet.subnet)
+                for subnet in self.subnet_query.filter(
+                    subnetdivisionindex__config=config3
+                ).distinct()
+            },
+            freed_subnets,
+        )
+
+    def test_allocator_free_space_cache(self):
+        rule = self._get_vpn_subdivision_rule()
+        self.config.templates.add(self.template)
+        key = SubnetAllocator.get_cache_key(self.master_subnet.pk)
+        child_subnets = Subnet.objects.filter(master_subnet=self.master_subnet)
+        self.assertEqual(cache.get(key)["count"], child_subnets.count())
+
+        def _get_next_subnet():
+            return str(ip_network((cache.get(key)["free"][0][0], rule.size)))
+
+        def _provision(name, mac_address):
+            config = self._create_config(
+                device=self._create_device(name=name, mac_address=mac_address)
+            )
+            config.templates.add(self.template)
+            return {
+                str(subnet.subnet)
+                for subnet in self.subnet_query.filter(
+                    subnetdivisionindex__config=config
+                )
+            }
+
+        with self.subTest("subnets changed outside the allocator invalidate it"):
+            next_subnet = _get_next_subnet()
+            self._create_subnet(
+                name="manual1",
+                subnet=next_subnet,
+                master_subnet=self.master_subnet,
+                organization=self.org,
+            )
+            self.assertIsNone(cache.get(key))
+            self.assertNotIn(next_subnet, _provision("device2", "00:11:22:33:44:66"))
+            self.assertEqual(cache.get(key)["count"], child_subnets.count())
+
+        with self.subTest("subnets created without signals are detected"):
+            next_subnet = _get_next_subnet()
+            Subnet.objects.bulk_create(
+                [
+                    Subnet(
+                        name="manual2",
+                        subnet=next_subnet,
+                        master_subnet=self.master_subnet,
+                        organization=self.org,
+                    )
+                ]
+            )
+            self.assertIsNotNone(cache.get(key))
+            self.assertNotIn(next_subnet, _provision("device3", "00:11:22:33:44:77"))
+            self.assertEqual(cache.get(key)["count"], child_subnets.count())
+
     def test_reserved_subnet(self):
         # An IP is already provisioned
         ip = self.master_subnet.request_ip()
@@ -815,6 +940,84 @@ class TestSubnetDivisionRule(
             self.ip_query.count(), (rule.number_of_subnets * rule.number_of_ips)
         )
 
+    @patch.object(DeviceSubnetDivisionRuleType, "provision_batch_size", 2)
+    def test_device_subnet_division_rule_existing_devices_bulk(self):
+        configs = [self.config]
+        for index in range(2, 5):
+            configs.append(
+                self._create_config(
+                    device=self._create_device(
+                        name=f"device{index}",
+                        mac_address=f"00:11:22:33:44:{index:02}",
+                    )
+                )
+            )
+        with patch.object(
+            DeviceSubnetDivisionRuleType,
+            "_get_overlapping_candidates",
+            wraps=DeviceSubnetDivisionRuleType._get_overlapping_candidates,
+        ) as mocked:
+            rule = self._get_device_subdivision_rule()
+            # the subnets are loaded once for all the chunks
+            mocked.assert_called_once()
+        subnets = set()
+        for config in configs:
+            config_subnets = self.subnet_query.filter(
+                subnetdivisionindex__config=config
+            ).distinct()
+            self.assertEqual(config_subnets.count(), rule.number_of_subnets)
+            self.assertEqual(
+                config.subnetdivisionindex_set.count(),
+                rule.number_of_subnets * (rule.number_of_ips + 1),
+            )
+            subnets.update(str(subnet.subnet) for subnet in config_subnets)
+        self.assertEqual(len(subnets), len(configs) * rule.number_of_subnets)
+        self.assertEqual(
+            self.ip_query.count(),
+            len(configs) * rule.number_of_subnets * rule.number_of_ips,
+        )
+
+    def test_bulk_provisioned_subnets_overlapping(self):
+        rule = self._get_device_subdivision_rule()
+        rule_type = DeviceSubnetDivisionRuleType
+        provisioned = self.subnet_query.filter(
+            subnetdivisionindex__config=self.config
+        ).first()
+        # the last subnet of the master subnet is free
+        free_subnet = ip_network(("10.0.255.240", rule.size))
+
+        def _validate(subnet):
+            rule_type._validate_overlapping_subnets(
+                rule, [Subnet(subnet=free_subnet), Subnet(subnet=ip_network(subnet))]
+            )
+
+        with self.subTest("free subnets are valid"):
+            _validate("10.0.255.224/28")
+
+        with self.subTest("subnet overlaps with a subnet of the master subnet"):
+            with self.assertRaises(ValidationError) as context_manager:
+                _validate(str(provisioned.subnet))
+            self.assertIn("subnet", context_manager.exception.message_dict)
+
+        with self.subTest("subnet overlaps with a shared subnet"):
+            Subnet.objects.bulk_create(
+                [Subnet(name="shared", subnet="10.0.128.0/24", organization=None)]
+            )
+            with self.assertRaises(ValidationError):
+                _validate("10.0.128.16/28")
+
+        with self.subTest("subnets of other organizations are ignored"):
+            Subnet.objects.bulk_create(
+                [
+                    Subnet(
+                        name="org2",
+                        subnet="10.0.64.0/24",
+                        organization=self._create_org(name="org2"),
+                    )
+                ]
+            )
+            _validate("10.0.64.16/28")
+
     def test_vpn_subnet_division_rule_existing_devices(self):
         subnet_query = self.subnet_query.filter(organization_id=self.org.id).exclude(
             id=self.master_subnet.id
@@ -1016,6 +1219,12 @@ class TestCeleryTasks(TestCase):
                 log_message.format(action="update subnets related to")
             )
 
+        with patch("logging.Logger.warning") as mocked_logger:
+            tasks.update_subnet_division_rule_label.run(id, old_label="OW")
+            mocked_logger.assert_called_once_with(
+                log_message.format(action="update label of")
+            )
+
         with patch("logging.Logger.warning") as mocked_logger:
             tasks.provision_extra_ips.run(id, old_number_of_ips=0)
             mocked_logger.assert_called_once_with(
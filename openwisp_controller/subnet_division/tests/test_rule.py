@@ -1,12 +1,8 @@
-from django.db import connection
-from django.test import TestCase, tag
+from django.test import TestCase
 from openwisp_ipam.tests import CreateModelsMixin as SubnetIpamMixin
-from swapper import load_model
 
+from ..allocator import SubnetAllocator
 from ..rule_types.base import BaseSubnetDivisionRuleType
-from ..rule_types.vpn import VpnSubnetDivisionRuleType
-
-SubnetDivisionRule = load_model("subnet_division", "SubnetDivisionRule")
 
 
 class TestBaseSubnetDivisionRuleType(SubnetIpamMixin, TestCase):
@@ -18,22 +14,33 @@ class TestBaseSubnetDivisionRuleType(SubnetIpamMixin, TestCase):
         with self.assertRaises(NotImplementedError):
             BaseSubnetDivisionRuleType.provision_for_existing_objects(rule_obj=None)
 
-    @tag("db_tests")
-    def test_get_max_subnet(self):
-        rule = SubnetDivisionRule(
-            **{
-                "label": "OW",
-                "size": 28,
-                "number_of_ips": 2,
-                "number_of_subnets": 2,
-                "type": VpnSubnetDivisionRuleType,
-            }
-        )
-        master_subnet = self._create_subnet(subnet="10.0.0.0/16")
+    def test_subnet_allocator(self):
+        master_subnet = self._create_subnet(subnet="10.0.0.0/24")
         self._create_subnet(subnet="10.0.0.16/28", master_subnet=master_subnet)
         self._create_subnet(subnet="10.0.0.0/28", master_subnet=master_subnet)
-        max_subnet = VpnSubnetDivisionRuleType.get_max_subnet(master_subnet, rule)
-        if connection.vendor == "postgresql":
-            self.assertEqual(str(max_subnet), "10.0.0.16/28")
-        else:
-            self.assertEqual(str(max_subnet), "10.0.0.0/28")
+        self._create_subnet(subnet="10.0.0.48/28", master_subnet=master_subnet)
+        self._create_subnet(subnet="10.0.0.72/29", master_subnet=master_subnet)
+        allocator = SubnetAllocator(master_subnet)
+        self.assertEqual(allocator.is_empty, False)
+        # free subnets between the existing ones are reused first
+        self.assertEqual(
+            [str(subnet) for subnet in allocator.allocate(28, 3)],
+            ["10.0.0.32/28", "10.0.0.80/28", "10.0.0.96/28"],
+        )
+        self.assertEqual(
+            [str(subnet) for subnet in allocator.allocate(29, 2)],
+            ["10.0.0.64/29", "10.0.0.112/29"],
+        )
+        # less subnets are returned when the master subnet runs out of space
+        self.assertEqual(len(allocator.allocate(26, 4)), 2)
+        self.assertEqual(allocator.allocate(28), [])
+        self.assertEqual(str(allocator.allocate(29)[0]), "10.0.0.120/29")
+
+    def test_subnet_allocator_empty(self):
+        master_subnet = self._create_subnet(subnet="fd00::/64")
+        allocator = SubnetAllocator(master_subnet)
+        self.assertEqual(allocator.is_empty, True)
+        self.assertEqual(
+            [str(subnet) for subnet in allocator.allocate(120, 2)],
+            ["fd00::/120", "fd00::100/120"],
+        )
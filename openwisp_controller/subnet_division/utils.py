@@ -1,3 +1,6 @@
+from swapper import load_model
+
+
 def get_subnet_division_config_context(config):
     """
     Returns SubnetDivision context containing subnet
@@ -5,23 +8,50 @@ def get_subnet_division_config_context(config):
 
     This function is called by "Config.get_context" method.
     """
-    context = {}
-    qs = config.subnetdivisionindex_set.values(
-        "keyword", "subnet__subnet", "ip__ip_address"
+    contexts = _get_subnet_division_contexts(config.subnetdivisionindex_set.all())
+    return contexts.get(config.pk, {})
+
+
+def bulk_get_subnet_division_config_context(configs):
+    """
+    Returns a dict which maps the PKs of "configs"
+    to their SubnetDivision context, using one query.
+
+    This function is called by "Config.prefetch_context" method.
+    """
+    SubnetDivisionIndex = load_model("subnet_division", "SubnetDivisionIndex")
+    return _get_subnet_division_contexts(
+        SubnetDivisionIndex.objects.filter(
+            config_id__in=[config.pk for config in configs]
+        )
+    )
+
+
+get_subnet_division_config_context.bulk = bulk_get_subnet_division_config_context
+
+
+def _get_subnet_division_contexts(queryset):
+    contexts = {}
+    qs = queryset.order_by("pk").values(
+        "config_id",
+        "keyword",
+        "subnet__subnet",
+        "ip__ip_address",
+        "rule__label",
+        "rule__size",
     )
     for entry in qs:
+        if entry["config_id"] not in contexts:
+            # the prefix length is taken from the first index
+            contexts[entry["config_id"]] = {
+                f'{entry["rule__label"]}_prefixlen': str(entry["rule__size"])
+            }
+        context = contexts[entry["config_id"]]
         if entry["ip__ip_address"] is None:
             context[entry["keyword"]] = str(entry["subnet__subnet"])
         else:
             context[entry["keyword"]] = str(entry["ip__ip_address"])
-    prefixlen = (
-        config.subnetdivisionindex_set.select_related("rule")
-        .values("rule__label", "rule__size")
-        .first()
-    )
-    if prefixlen:
-        context[f'{prefixlen["rule__label"]}_prefixlen'] = str(prefixlen["rule__size"])
-    return context
+    return contexts
 
 
 def subnet_division_vpnclient_auto_ip(vpn_client):
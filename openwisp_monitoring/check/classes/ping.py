@@ -1,3 +1,4 @@
+import logging
 import subprocess
 
 from django.core.exceptions import ValidationError
@@ -12,6 +13,8 @@ from .. import settings as app_settings
 from ..exceptions import OperationalError
 from .base import BaseCheck
 
+logger = logging.getLogger(__name__)
+
 Chart = load_model('monitoring', 'Chart')
 Metric = load_model('monitoring', 'Metric')
 AlertSettings = load_model('monitoring', 'AlertSettings')
@@ -69,23 +72,81 @@ class Ping(BaseCheck):
             raise ValidationError({'params': message}) from e
 
     def check(self, store=True):
+        ip = self._get_ip()
+        #  if the device has no available IP
+        if not ip:
+            return self._check_unreachable(store)
+        stdout, stderr = self._command(self._get_command([ip]))
+        # fpings shows statistics on stderr
+        output = stderr.decode('utf8')
+        result = self._parse_output(output)
+        if store:
+            self.timed_store(result)
+        return result
+
+    @classmethod
+    def batch_check(cls, checks, store=True, chunk_size=256):
+        """Pings the devices of several ping checks in one sweep.
+
+        ``fping`` accepts multiple targets, so checks are grouped by
+        their parameters and the related IPs are pinged with one
+        ``fping`` process for each chunk of ``chunk_size`` addresses,
+        instead of spawning a process (and a celery task) per check.
+        Returns a dict which maps check IDs to their results.
+        """
+        results = {}
+        groups = {}
+        for check in checks:
+            instance = check.check_instance
+            ip = instance._get_ip()
+            if not ip:
+                results[check.pk] = instance._check_unreachable(store)
+                continue
+            params = tuple(
+                instance._get_param(param)
+                for param in ('count', 'interval', 'bytes', 'timeout')
+            )
+            groups.setdefault(params, {}).setdefault(ip, []).append(instance)
+        for instances_by_ip in groups.values():
+            ips = list(instances_by_ip.keys())
+            for start in range(0, len(ips), chunk_size):
+                end = start + chunk_size
+                chunk = ips[start:end]
+                # all the instances of a group share the same parameters
+                instance = instances_by_ip[chunk[0]][0]
+                stdout, stderr = instance._command(instance._get_command(chunk))
+                outputs = cls._split_output(stderr.decode('utf8'))
+                for ip in chunk:
+                    for instance in instances_by_ip[ip]:
+                        try:
+                            result = instance._parse_output(outputs.get(ip, ''))
+                        except OperationalError as e:
+                            logger.warning(
+                                f'Ping check "{instance.check_instance}": {e}'
+                            )
+                            continue
+                        if store:
+                            instance.timed_store(result)
+                        results[instance.check_instance.pk] = result
+        return results
+
+    def _check_unreachable(self, store=True):
+        monitoring = self.related_object.monitoring
+        # device not known yet, ignore
+        if monitoring.status == 'unknown':
+            return
+        # device is known, simulate down
+        result = {'reachable': 0, 'loss': 100.0}
+        if store:
+            self.timed_store(result)
+        return result
+
+    def _get_command(self, ips):
         count = self._get_param('count')
         interval = self._get_param('interval')
         bytes_ = self._get_param('bytes')
         timeout = self._get_param('timeout')
-        ip = self._get_ip()
-        #  if the device has no available IP
-        if not ip:
-            monitoring = self.related_object.monitoring
-            # device not known yet, ignore
-            if monitoring.status == 'unknown':
-                return
-            # device is known, simulate down
-            result = {'reachable': 0, 'loss': 100.0}
-            if store:
-                self.timed_store(result)
-            return result
-        command = [
+        return [
             'fping',
             '-e',  # show elapsed (round-trip) time of packets
             '-c %s' % count,  # count of pings to send to each target,
@@ -93,11 +154,19 @@ class Ping(BaseCheck):
             '-b %s' % bytes_,  # amount of ping data to send
             '-t %s' % timeout,  # individual target initial timeout (in ms)
             '-q',
-            ip,
-        ]
-        stdout, stderr = self._command(command)
-        # fpings shows statistics on stderr
-        output = stderr.decode('utf8')
+        ] + ips
+
+    @staticmethod
+    def _split_output(output):
+        """Maps each target of a multi target fping run to its output line."""
+        outputs = {}
+        for line in output.splitlines():
+            target, sep, _ = line.partition(' : ')
+            if sep:
+                outputs[target.strip()] = line
+        return outputs
+
+    def _parse_output(self, output):
         try:
             parts = output.split('=')
             if len(parts) > 2:
@@ -115,8 +184,6 @@ class Ping(BaseCheck):
             result.update(
                 {'rtt_min': float(min), 'rtt_avg': float(avg), 'rtt_max': float(max)}
             )
-        if store:
-            self.timed_store(result)
         return result
 
     def store(self, result):
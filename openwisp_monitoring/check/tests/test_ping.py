@@ -296,3 +296,39 @@ class TestPing(TestDeviceMonitoringMixin, TransactionTestCase):
         self.assertEqual(Chart.objects.count(), 0)
         check.perform_check()
         self.assertEqual(Chart.objects.count(), 0)
+
+    def test_batch_check(self):
+        org = self._create_org()
+        output = (
+            '10.40.0.1 : xmt/rcv/%loss = 5/5/0%, min/avg/max = 0.04/0.08/0.15\n'
+            '10.40.0.2 : xmt/rcv/%loss = 5/0/100%\n'
+        )
+        checks = []
+        for index, ip in enumerate(['10.40.0.1', '10.40.0.2', '10.40.0.3']):
+            device = self._create_device(
+                organization=org,
+                name=f'device{index}',
+                mac_address=f'00:11:22:33:44:0{index}',
+                management_ip=ip,
+            )
+            checks.append(
+                Check(
+                    name='Ping check',
+                    check_type=self._PING,
+                    content_object=device,
+                    params={},
+                )
+            )
+        with patch.object(
+            Ping, '_command', return_value=('', bytes(output, encoding='utf8'))
+        ) as mocked_command:
+            results = Ping.batch_check(checks, store=False)
+        # all the IPs are pinged with a single fping process
+        mocked_command.assert_called_once()
+        command = mocked_command.call_args[0][0]
+        self.assertEqual(command[-3:], ['10.40.0.1', '10.40.0.2', '10.40.0.3'])
+        self.assertEqual(results[checks[0].pk]['reachable'], 1)
+        self.assertEqual(results[checks[0].pk]['rtt_avg'], 0.08)
+        self.assertEqual(results[checks[1].pk], {'reachable': 0, 'loss': 100.0})
+        with self.subTest('missing output is skipped'):
+            self.assertNotIn(checks[2].pk, results)
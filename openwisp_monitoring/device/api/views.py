@@ -25,6 +25,10 @@ from rest_framework.response import Response
 from swapper import load_model
 
 from openwisp_controller.config.api.views import DeviceListCreateView
+from openwisp_controller.config.utils import (
+    get_organization_cache_epoch,
+    get_organization_cache_generation,
+)
 from openwisp_controller.geo.api.views import (
     DevicePermission,
     GeoJsonLocationList,
@@ -117,6 +121,7 @@ class DeviceMetricView(
             '_is_deactivated',
             'id',
             'key',
+            'mac_address',
         )
         .all()
     )
@@ -147,7 +152,7 @@ class DeviceMetricView(
             pk = str(uuid.UUID(pk))
         except ValueError:
             return Response({'detail': 'not found'}, status=404)
-        self.instance = self.get_object(pk)
+        self.instance = self.get_cached_object(pk)
         response = super().get(request, pk)
         if not request.query_params.get('csv'):
             charts_data = dict(response.data)
@@ -171,10 +176,31 @@ class DeviceMetricView(
 
     @cache_memoize(CACHE_TIMEOUT, args_rewrite=get_device_args_rewrite)
     def get_object(self, pk):
-        return super().get_object()
+        # read before the device, which could otherwise be stamped with
+        # a generation incremented after retrieving outdated data
+        epoch = get_organization_cache_epoch()
+        instance = super().get_object()
+        # entries stamped with an older generation are outdated
+        instance._organization_cache_generation = get_organization_cache_generation(
+            instance.organization_id, epoch
+        )
+        return instance
+
+    def get_cached_object(self, pk):
+        """Returns the device from ``get_object``.
+
+        The device is retrieved again from the DB if the cache entry
+        is older than the cache generation of its organization.
+        """
+        instance = self.get_object(pk)
+        generation = get_organization_cache_generation(instance.organization_id)
+        if getattr(instance, '_organization_cache_generation', None) != generation:
+            self.get_object.invalidate(self, pk)
+            instance = self.get_object(pk)
+        return instance
 
     def post(self, request, pk):
-        self.instance = self.get_object(pk)
+        self.instance = self.get_cached_object(pk)
         if self.instance._is_deactivated:
             # If the device is deactivated, do not accept data.
             # We don't use "Device.is_deactivated()" to avoid
@@ -197,9 +223,14 @@ class DeviceMetricView(
             )
         except ValueError:
             return Response({'detail': _('Incorrect time format')}, status=400)
-        # writing data is intensive, let's pass that to the background workers
+        # writing data is intensive, let's pass that to the background workers;
+        # the data has already been validated, no need to repeat it in the task
         write_device_metrics.delay(
-            str(self.instance.pk), self.instance.data, time=time_obj, current=current
+            str(self.instance.pk),
+            self.instance.data,
+            time=time_obj,
+            current=current,
+            validated=True,
         )
         device_metrics_received.send(
             sender=self.model,
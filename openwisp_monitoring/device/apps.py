@@ -10,6 +10,7 @@ from django.utils.translation import gettext_lazy as _
 from swapper import get_model_name, load_model
 
 from openwisp_controller.config.signals import (
+    config_bulk_status_changed,
     config_status_changed,
     device_activated,
     device_deactivated,
@@ -27,11 +28,17 @@ from ..monitoring.signals import threshold_crossed
 from ..settings import MONITORING_API_BASEURL, MONITORING_API_URLCONF
 from ..utils import transaction_on_commit
 from . import settings as app_settings
-from .signals import device_metrics_received, health_status_changed
+from .signals import (
+    device_metrics_received,
+    health_status_bulk_changed,
+    health_status_changed,
+)
 from .utils import (
     get_device_cache_key,
+    get_device_recovery_batch_countdown,
     manage_default_retention_policy,
     manage_short_retention_policy,
+    queue_device_recovery,
 )
 
 
@@ -202,6 +209,11 @@ class DeviceMonitoringConfig(AppConfig):
             sender=DeviceMonitoring,
             dispatch_uid='recovery_health_status_changed',
         )
+        health_status_bulk_changed.connect(
+            self.manage_devices_recovery_cache_keys,
+            sender=DeviceMonitoring,
+            dispatch_uid='recovery_health_status_bulk_changed',
+        )
         device_metrics_received.connect(
             self.trigger_device_recovery_checks,
             sender=DeviceData,
@@ -222,15 +234,47 @@ class DeviceMonitoringConfig(AppConfig):
         else:
             cache.delete(cache_key)
 
+    @classmethod
+    def manage_devices_recovery_cache_keys(cls, device_ids, status, **kwargs):
+        """Bulk version of ``manage_device_recovery_cache_key``."""
+        Device = load_model('config', 'Device')
+        cache_keys = [get_device_cache_key(device=Device(pk=pk)) for pk in device_ids]
+        if status == 'critical':
+            cache.set_many(dict.fromkeys(cache_keys, 1), timeout=None)
+        else:
+            cache.delete_many(cache_keys)
+
     @classmethod
     def trigger_device_recovery_checks(cls, instance, **kwargs):
         from .tasks import trigger_device_critical_checks
 
         # Cache is managed by "manage_device_recovery_cache_key".
-        if cache.get(get_device_cache_key(device=instance), False):
+        if not cache.get(get_device_cache_key(device=instance), False):
+            return
+        if not app_settings.DEVICE_RECOVERY_CHECKS_WINDOW:
             transaction_on_commit(
                 lambda: trigger_device_critical_checks.delay(pk=instance.pk)
             )
+            return
+        transaction_on_commit(lambda: cls._queue_device_recovery(instance.pk))
+
+    @classmethod
+    def _queue_device_recovery(cls, pk):
+        """Coalesces the recovery checks of devices coming back online.
+
+        After an outage many devices come back online at the same time,
+        these are collected in batches which are processed at the end of
+        the ``DEVICE_RECOVERY_CHECKS_WINDOW``.
+        """
+        from .tasks import trigger_device_recovery_batch
+
+        batch = queue_device_recovery(pk)
+        # the batch has already been scheduled by another caller
+        if batch is None:
+            return
+        trigger_device_recovery_batch.apply_async(
+            args=[batch], countdown=get_device_recovery_batch_countdown(batch)
+        )
 
     @classmethod
     def connect_is_working_changed(cls):
@@ -290,6 +334,11 @@ class DeviceMonitoringConfig(AppConfig):
                 sender=Config,
                 dispatch_uid='monitoring.config_status_changed_receiver',
             )
+            config_bulk_status_changed.connect(
+                cls.config_bulk_status_changed_receiver,
+                sender=Config,
+                dispatch_uid='monitoring.config_bulk_status_changed_receiver',
+            )
 
     @classmethod
     def connect_wifi_client_signals(cls):
@@ -330,6 +379,28 @@ class DeviceMonitoringConfig(AppConfig):
         if check:
             transaction_on_commit(lambda: perform_check.delay(check.pk))
 
+    @classmethod
+    def config_bulk_status_changed_receiver(cls, sender, instances, **kwargs):
+        from django.contrib.contenttypes.models import ContentType
+
+        from ..check.tasks import perform_check
+
+        Check = load_model('check', 'Check')
+        DeviceData = load_model('device_monitoring', 'DeviceData')
+        check_ids = list(
+            Check.objects.filter(
+                content_type=ContentType.objects.get_for_model(DeviceData),
+                object_id__in=[instance.device_id for instance in instances],
+                check_type__contains='ConfigApplied',
+            ).values_list('pk', flat=True)
+        )
+
+        def launch_checks():
+            for check_id in check_ids:
+                perform_check.delay(check_id)
+
+        transaction_on_commit(launch_checks)
+
     def set_update_config_model(self):
         if not getattr(settings, 'OPENWISP_UPDATE_CONFIG_MODEL', None):
             setattr(
@@ -8,7 +8,7 @@ from cache_memoize import cache_memoize
 from dateutil.relativedelta import relativedelta
 from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.db.models.signals import post_delete
 from django.dispatch import receiver
 from django.utils.module_loading import import_string
@@ -30,10 +30,11 @@ from ...db import device_data_query, timeseries_db
 from ...monitoring.signals import threshold_crossed
 from ...monitoring.tasks import _timeseries_write
 from ...settings import CACHE_TIMEOUT
+from ...utils import json_dumps, json_loads
 from .. import settings as app_settings
 from .. import tasks
 from ..schema import schema
-from ..signals import health_status_changed
+from ..signals import health_status_bulk_changed, health_status_changed
 from ..utils import SHORT_RP, get_device_cache_key
 
 
@@ -160,7 +161,7 @@ class AbstractDeviceData(object):
         if not points:
             return None
         self.data_timestamp = points[0]['time']
-        return json.loads(points[0]['data'])
+        return json_loads(points[0]['data'])
 
     @data.setter
     def data(self, data):
@@ -256,20 +257,29 @@ class AbstractDeviceData(object):
         except NotRegisteredError:
             return ''
 
-    def save_data(self, time=None):
-        """Validates and saves data to Timeseries Database."""
-        self.validate_data()
+    def save_data(self, time=None, validated=False):
+        """Validates and saves data to Timeseries Database.
+
+        Validation is skipped when ``validated`` is ``True``, which is
+        the case when the data has already been validated by the caller
+        (eg: the ``DeviceMetricView`` API view).
+        """
+        if not validated:
+            self.validate_data()
         self._transform_data()
         time = time or now()
+        # serialize once and reuse the result for both the
+        # timeseries DB and the cache
+        serialized_data = self.json()
         options = dict(tags={'pk': self.pk}, timestamp=time, retention_policy=SHORT_RP)
-        _timeseries_write(name=self.__key, values={'data': self.json()}, **options)
+        _timeseries_write(name=self.__key, values={'data': serialized_data}, **options)
         cache_key = get_device_cache_key(device=self, context='current-data')
         # cache current data to allow getting it without querying the timeseries DB
         cache.set(
             cache_key,
             [
                 {
-                    'data': self.json(),
+                    'data': serialized_data,
                     'time': time.astimezone(tz=tz('UTC')).isoformat(timespec='seconds'),
                 }
             ],
@@ -279,7 +289,9 @@ class AbstractDeviceData(object):
             self.save_wifi_clients_and_sessions()
 
     def json(self, *args, **kwargs):
-        return json.dumps(self.data, *args, **kwargs)
+        if args or kwargs:
+            return json.dumps(self.data, *args, **kwargs)
+        return json_dumps(self.data)
 
     def save_wifi_clients_and_sessions(self):
         _WIFICLIENT_FIELDS = ['vendor', 'ht', 'vht', 'he', 'wmm', 'wds', 'wps']
@@ -376,6 +388,50 @@ class AbstractDeviceMonitoring(TimeStampedEditableModel):
 
         health_status_changed.send(sender=self.__class__, instance=self, status=value)
 
+    @classmethod
+    def bulk_update_status(cls, device_ids, value):
+        """Changes the health status of several devices at once.
+
+        ``device_ids`` can be any iterable of device primary keys or a
+        queryset returning them. Only the rows whose status is actually
+        changing are updated, using a single ``UPDATE`` query, after
+        which ``health_status_bulk_changed`` is emitted once with the
+        list of the affected devices (``health_status_changed`` is not
+        emitted for each device).
+
+        Returns the list of IDs of the devices whose status changed.
+        """
+        if value not in cls.STATUS:
+            raise ValueError(f'"{value}" is not a valid health status')
+        with transaction.atomic():
+            changed = list(
+                cls.objects.select_for_update()
+                .filter(device_id__in=device_ids)
+                .exclude(status=value)
+                .values_list('device_id', flat=True)
+            )
+            if not changed:
+                return []
+            cls.objects.filter(device_id__in=changed).update(
+                status=value, modified=now()
+            )
+            # clear device management_ip when devices are offline
+            clear_management_ip = (
+                value == 'critical' and app_settings.AUTO_CLEAR_MANAGEMENT_IP
+            )
+            if clear_management_ip:
+                load_model('config', 'Device').objects.filter(pk__in=changed).update(
+                    management_ip=None
+                )
+        if clear_management_ip:
+            # the update query doesn't emit the signals
+            # which invalidate the cached devices
+            from openwisp_controller.config.controller.views import DeviceChecksumView
+
+            DeviceChecksumView.bulk_invalidate_get_device_cache(changed)
+        health_status_bulk_changed.send(sender=cls, device_ids=changed, status=value)
+        return changed
+
     @property
     def related_metrics(self):
         Metric = load_model('monitoring', 'Metric')
@@ -461,12 +517,10 @@ class AbstractDeviceMonitoring(TimeStampedEditableModel):
 
         Returns: - None
         """
-        load_model('config', 'Device').objects.filter(
-            organization_id=organization_id
-        ).update(management_ip='')
-        cls.objects.filter(device__organization_id=organization_id).update(
-            status='unknown'
-        )
+        Device = load_model('config', 'Device')
+        devices = Device.objects.filter(organization_id=organization_id)
+        devices.update(management_ip='')
+        cls.bulk_update_status(devices.values('pk'), 'unknown')
 
     @classmethod
     def handle_deactivated_device(cls, instance, **kwargs):
@@ -479,7 +533,7 @@ class AbstractDeviceMonitoring(TimeStampedEditableModel):
 
         Returns: - None
         """
-        cls.objects.filter(device_id=instance.id).update(status='deactivated')
+        cls.bulk_update_status([instance.id], 'deactivated')
 
     @classmethod
     def handle_activated_device(cls, instance, **kwargs):
@@ -492,7 +546,7 @@ class AbstractDeviceMonitoring(TimeStampedEditableModel):
 
         Returns: - None
         """
-        cls.objects.filter(device_id=instance.id).update(status='unknown')
+        cls.bulk_update_status([instance.id], 'unknown')
 
     @classmethod
     def _get_critical_metric_keys(cls):
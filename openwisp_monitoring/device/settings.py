@@ -59,6 +59,9 @@ HEALTH_STATUS_LABELS = get_health_status_labels()
 AUTO_CLEAR_MANAGEMENT_IP = get_settings_value('AUTO_CLEAR_MANAGEMENT_IP', True)
 # Triggers spontaneous recovery of device based on corresponding signals
 DEVICE_RECOVERY_DETECTION = get_settings_value('DEVICE_RECOVERY_DETECTION', True)
+# Time window (in seconds) in which recovering devices are collected
+# and checked together, set to 0 to check each device independently
+DEVICE_RECOVERY_CHECKS_WINDOW = get_settings_value('DEVICE_RECOVERY_CHECKS_WINDOW', 10)
 MAC_VENDOR_DETECTION = get_settings_value('MAC_VENDOR_DETECTION', True)
 DASHBOARD_MAP = get_settings_value('DASHBOARD_MAP', True)
 WIFI_SESSIONS_ENABLED = get_settings_value('WIFI_SESSIONS_ENABLED', True)
@@ -4,6 +4,10 @@ health_status_changed = Signal()
 health_status_changed.__doc__ = """
 Providing arguments: ['instance', 'status']
 """
+health_status_bulk_changed = Signal()
+health_status_bulk_changed.__doc__ = """
+Providing arguments: ['device_ids', 'status']
+"""
 device_metrics_received = Signal()
 device_metrics_received.__doc__ = """
 Providing arguments: ['instance', 'request', 'time', 'current']
@@ -1,7 +1,9 @@
 import logging
 import warnings
+from collections import defaultdict
 
 from celery import shared_task
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.timezone import now, timedelta
 from swapper import load_model
@@ -9,6 +11,7 @@ from swapper import load_model
 from openwisp_utils.tasks import OpenwispCeleryTask
 
 from ..check.tasks import perform_check
+from .utils import get_device_recovery_batch
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +47,79 @@ def trigger_device_critical_checks(pk, recovery=True):
         perform_check.delay(check_id)
 
 
+@shared_task(base=OpenwispCeleryTask)
+def trigger_devices_critical_checks(pks, recovery=True):
+    """Triggers the monitoring checks of several devices at once.
+
+    Batched version of ``trigger_device_critical_checks``: the devices
+    and their checks are retrieved with a constant number of queries,
+    health status changes are applied with
+    ``DeviceMonitoring.bulk_update_status``, the ping checks of all the
+    devices are performed in one sweep (see ``Ping.batch_check``) while
+    the other critical checks are enqueued with ``perform_check`` as
+    usual.
+    """
+    from ..check.classes import Ping
+
+    DeviceData = load_model('device_monitoring', 'DeviceData')
+    DeviceMonitoring = load_model('device_monitoring', 'DeviceMonitoring')
+    Check = load_model('check', 'Check')
+    devices = {
+        str(pk): device
+        for pk, device in DeviceData.objects.select_related(
+            'monitoring', 'organization'
+        )
+        .in_bulk(pks)
+        .items()
+    }
+    checks_by_device = defaultdict(list)
+    for check in Check.objects.filter(
+        content_type=ContentType.objects.get_for_model(DeviceData),
+        object_id__in=list(devices.keys()),
+        is_active=True,
+        check_type__in=DeviceMonitoring.get_critical_checks(),
+    ).prefetch_related('content_object'):
+        checks_by_device[check.object_id].append(check)
+    ping_checks = []
+    without_checks = []
+    recovering = []
+    for pk, device in devices.items():
+        device_checks = checks_by_device.get(pk)
+        if not device_checks:
+            without_checks.append(pk)
+            continue
+        if recovery and device.monitoring.status == 'critical':
+            recovering.append(pk)
+        # same conditions checked in "Check.perform_check"
+        if device._is_deactivated or not device.organization.is_active:
+            continue
+        for check in device_checks:
+            if issubclass(check.check_class, Ping):
+                ping_checks.append(check)
+            else:
+                perform_check.delay(check.pk)
+    if without_checks:
+        DeviceMonitoring.bulk_update_status(
+            without_checks, 'ok' if recovery else 'critical'
+        )
+    if recovering:
+        DeviceMonitoring.bulk_update_status(recovering, 'problem')
+    if ping_checks:
+        Ping.batch_check(ping_checks)
+
+
+@shared_task(base=OpenwispCeleryTask)
+def trigger_device_recovery_batch(batch):
+    """Performs the critical checks of the devices queued in ``batch``.
+
+    The devices are queued by the recovery detection mechanism, see
+    ``openwisp_monitoring.device.utils.queue_device_recovery``.
+    """
+    pks = get_device_recovery_batch(batch)
+    if pks:
+        trigger_devices_critical_checks(pks, recovery=True)
+
+
 @shared_task(base=OpenwispCeleryTask)
 def trigger_device_checks(pk, recovery=True):
     """
@@ -77,13 +153,13 @@ def offline_device_close_session(device_id):
 
 
 @shared_task(base=OpenwispCeleryTask)
-def write_device_metrics(pk, data, time=None, current=False):
+def write_device_metrics(pk, data, time=None, current=False, validated=False):
     DeviceData = load_model('device_monitoring', 'DeviceData')
     try:
         device_data = DeviceData.get_devicedata(str(pk))
     except DeviceData.DoesNotExist:
         return
-    device_data.writer.write(data, time, current)
+    device_data.writer.write(data, time, current, validated=validated)
 
 
 @shared_task(base=OpenwispCeleryTask)
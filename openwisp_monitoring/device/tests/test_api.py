@@ -184,6 +184,8 @@ class TestDeviceApi(AuthenticationMixin, TestGeoMixin, DeviceMonitoringTestCase)
         r = self._post_data(device.id, device.key, data)
         self.assertEqual(r.status_code, 200)
         mocked_task.assert_called_once()
+        # data validated in the view must not be validated again in the task
+        self.assertTrue(mocked_task.call_args.kwargs['validated'])
 
     def test_200_traffic_counter_incremented(self):
         dd = self.create_test_data(no_resources=True)
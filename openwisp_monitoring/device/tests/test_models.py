@@ -9,13 +9,14 @@ from django.utils.timezone import now, timedelta
 from freezegun import freeze_time
 from swapper import load_model
 
+from openwisp_controller.config.controller.views import DeviceChecksumView
 from openwisp_controller.connection.tasks import update_config
 from openwisp_controller.connection.tests.base import CreateConnectionsMixin
 from openwisp_utils.tests import catch_signal
 
 from ...db import timeseries_db
 from .. import settings as app_settings
-from ..signals import health_status_changed
+from ..signals import health_status_bulk_changed, health_status_changed
 from ..tasks import delete_wifi_clients_and_sessions, trigger_device_critical_checks
 from ..utils import get_device_cache_key
 from . import (
@@ -317,6 +318,15 @@ class TestDeviceData(MonitoringTestMixin, DeviceMonitoringTestCase):
         dd.save_data()
         return dd
 
+    def test_save_data_already_validated(self):
+        dd = self._create_device_data()
+        dd.data = deepcopy(self._sample_data)
+        with patch.object(DeviceData, 'validate_data') as mocked_validate:
+            dd.save_data(validated=True)
+            mocked_validate.assert_not_called()
+        cached = cache.get(get_device_cache_key(device=dd, context='current-data'))
+        self.assertEqual(json.loads(cached[0]['data']), dd.data)
+
     def test_read_data(self):
         dd = self.test_save_data()
         dd = DeviceData(pk=dd.pk)
@@ -875,6 +885,61 @@ class TestDeviceMonitoring(
         self.assertEqual(self._read_metric(ping1), [])
         self.assertNotEqual(self._read_metric(ping2), [])
 
+    def test_bulk_update_status(self):
+        dm1 = self._create_device_monitoring()
+        device2 = self._create_device(
+            name='device2',
+            mac_address='00:11:22:33:44:66',
+            organization=dm1.device.organization,
+            management_ip='10.40.0.2',
+        )
+        dm2 = device2.monitoring
+        dm2.update_status('critical')
+        dm1.device.management_ip = '10.40.0.1'
+        dm1.device.save()
+        device_ids = [dm1.device.pk, device2.pk]
+
+        view = DeviceChecksumView()
+        view.kwargs = {'pk': str(dm1.device.pk)}
+        view.get_device()
+        device_cache_key = view.get_device.get_cache_key(view)
+        self.assertIsNotNone(cache.get(device_cache_key))
+
+        with self.subTest('only rows with a different status are updated'):
+            with catch_signal(health_status_bulk_changed) as handler:
+                changed = DeviceMonitoring.bulk_update_status(device_ids, 'critical')
+            self.assertEqual(changed, [dm1.device.pk])
+            handler.assert_called_once_with(
+                signal=health_status_bulk_changed,
+                sender=DeviceMonitoring,
+                device_ids=[dm1.device.pk],
+                status='critical',
+            )
+            dm1.refresh_from_db()
+            dm1.device.refresh_from_db()
+            self.assertEqual(dm1.status, 'critical')
+            self.assertIsNone(dm1.device.management_ip)
+            self.assertEqual(cache.get(get_device_cache_key(device=dm1.device)), 1)
+            # the cached device having the old management IP is invalidated
+            self.assertIsNone(cache.get(device_cache_key))
+
+        with self.subTest('signal is not emitted if nothing changes'):
+            with catch_signal(health_status_bulk_changed) as handler:
+                changed = DeviceMonitoring.bulk_update_status(device_ids, 'critical')
+            self.assertEqual(changed, [])
+            handler.assert_not_called()
+
+        with self.subTest('recovery cache keys are removed'):
+            DeviceMonitoring.bulk_update_status(device_ids, 'problem')
+            for device_id in device_ids:
+                dm = DeviceMonitoring.objects.get(device_id=device_id)
+                self.assertEqual(dm.status, 'problem')
+                self.assertIsNone(cache.get(get_device_cache_key(device=dm.device)))
+
+        with self.subTest('invalid status'):
+            with self.assertRaises(ValueError):
+                DeviceMonitoring.bulk_update_status(device_ids, 'wrong')
+
     def test_handle_disabled_organization(self):
         device_monitoring, _, _, _ = self._create_env()
         device = device_monitoring.device
@@ -4,9 +4,19 @@ from unittest.mock import patch
 from django.core.cache import cache
 from swapper import load_model
 
+from ...check.classes import Ping
+from .. import settings as app_settings
 from ..signals import health_status_changed
-from ..tasks import trigger_device_checks, trigger_device_critical_checks
-from ..utils import get_device_cache_key
+from ..tasks import (
+    trigger_device_checks,
+    trigger_device_critical_checks,
+    trigger_devices_critical_checks,
+)
+from ..utils import (
+    get_device_cache_key,
+    get_device_recovery_batch,
+    queue_device_recovery,
+)
 from . import DeviceMonitoringTestCase, DeviceMonitoringTransactionTestcase
 
 DeviceMonitoring = load_model('device_monitoring', 'DeviceMonitoring')
@@ -76,8 +86,45 @@ class TestRecovery(DeviceMonitoringTestCase):
         trigger_device_checks.delay(dm.device.pk)
         mocked_task.assert_called_once_with(dm.device.pk, True)
 
+    def _create_device_monitorings(self):
+        dm1 = self._create_device_monitoring()
+        device2 = self._create_device(
+            name='device2',
+            mac_address='00:11:22:33:44:66',
+            organization=dm1.device.organization,
+        )
+        return dm1, device2.monitoring
+
+    def test_devices_status_without_checks(self):
+        devices_monitoring = self._create_device_monitorings()
+        Check.objects.all().delete()
+        for dm in devices_monitoring:
+            dm.update_status('critical')
+        trigger_devices_critical_checks.delay(
+            [str(dm.device.pk) for dm in devices_monitoring]
+        )
+        for dm in devices_monitoring:
+            dm.refresh_from_db()
+            self.assertEqual(dm.status, 'ok')
+
+    @patch('openwisp_monitoring.device.utils.time', return_value=1000)
+    def test_queue_device_recovery(self, *args):
+        dm1, dm2 = self._create_device_monitorings()
+        batch = queue_device_recovery(dm1.device.pk)
+        self.assertIsNotNone(batch)
+        with self.subTest('device is queued only once'):
+            self.assertIsNone(queue_device_recovery(dm1.device.pk))
+        with self.subTest('batch is scheduled only once'):
+            self.assertIsNone(queue_device_recovery(dm2.device.pk))
+        self.assertEqual(
+            get_device_recovery_batch(batch),
+            [str(dm1.device.pk), str(dm2.device.pk)],
+        )
+        self.assertEqual(get_device_recovery_batch(batch), [])
+
 
 class TestRecoveryTransaction(DeviceMonitoringTransactionTestcase):
+    @patch.object(app_settings, 'DEVICE_RECOVERY_CHECKS_WINDOW', 0)
     @patch('openwisp_monitoring.device.tasks.perform_check.delay')
     def test_metrics_received_trigger_device_recovery_checks(self, mocked_task):
         device = self._create_config(organization=self._get_org()).device
@@ -130,3 +177,27 @@ class TestRecoveryTransaction(DeviceMonitoringTransactionTestcase):
             self.assertListEqual(sorted(triggered_check_types), sorted(critical_checks))
             device_monitoring.refresh_from_db()
             self.assertEqual(device_monitoring.status, 'problem')
+
+    @patch.object(Ping, 'batch_check')
+    @patch('openwisp_monitoring.device.tasks.perform_check.delay')
+    def test_metrics_received_coalesced_recovery_checks(
+        self, mocked_task, mocked_batch_check
+    ):
+        device = self._create_config(organization=self._get_org()).device
+        device_monitoring = device.monitoring
+        device_monitoring.update_status('critical')
+        response = self.client.post(
+            self._url(device.pk, key=device.key),
+            data=json.dumps(self._data()),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        # ping checks are performed in one sweep, the others are enqueued
+        mocked_batch_check.assert_called_once()
+        ping_checks = mocked_batch_check.call_args[0][0]
+        self.assertEqual(len(ping_checks), 1)
+        self.assertEqual(ping_checks[0].object_id, str(device.pk))
+        critical_checks = device_monitoring.get_critical_checks()
+        self.assertEqual(mocked_task.call_count, len(critical_checks) - 1)
+        device_monitoring.refresh_from_db()
+        self.assertEqual(device_monitoring.status, 'problem')
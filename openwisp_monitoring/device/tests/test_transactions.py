@@ -10,6 +10,7 @@ from openwisp_utils.tests import catch_signal
 
 from ...check.classes import Ping
 from ...check.tests import _FPING_REACHABLE, _FPING_UNREACHABLE
+from .. import settings as app_settings
 from ..tasks import trigger_device_critical_checks
 from . import DeviceMonitoringTransactionTestcase
 
@@ -36,6 +37,7 @@ class TestTransactions(CreateConnectionsMixin, DeviceMonitoringTransactionTestca
         self.assertEqual(c.status, 'modified')
         self.assertEqual(mock_method.call_count, 1)
 
+    @patch.object(app_settings, 'DEVICE_RECOVERY_CHECKS_WINDOW', 0)
     @patch.object(Ping, '_command', return_value=_FPING_REACHABLE)
     def test_trigger_device_recovery_task(self, mocked_method):
         d = self._create_device(organization=self._create_org())
@@ -1,3 +1,7 @@
+from time import time
+
+from django.core.cache import cache
+
 from ..db import timeseries_db
 from . import settings as app_settings
 
@@ -9,6 +13,50 @@ def get_device_cache_key(device, context='react-to-updates'):
     return f'device-{device.pk}-{context}'
 
 
+def _get_recovery_batch_key(batch):
+    return f'device-recovery-batch-{batch}'
+
+
+def queue_device_recovery(pk):
+    """Queues a device for the next batch of recovery checks.
+
+    Devices are grouped in batches which span
+    ``DEVICE_RECOVERY_CHECKS_WINDOW`` seconds, each device is queued at
+    most once per window. Returns the batch identifier if the caller is
+    the first one to queue a device in the batch (and is therefore in
+    charge of scheduling its processing), ``None`` otherwise.
+    """
+    window = app_settings.DEVICE_RECOVERY_CHECKS_WINDOW
+    if not cache.add(f'device-{pk}-recovery-queued', 1, timeout=window):
+        return None
+    batch = int(time() // window)
+    batch_key = _get_recovery_batch_key(batch)
+    timeout = window * 6
+    # "add" and "incr" are atomic, hence each device gets its own slot
+    # and only one caller is elected to schedule the batch
+    first = cache.add(batch_key, 0, timeout=timeout)
+    index = cache.incr(batch_key)
+    cache.set(f'{batch_key}-{index}', str(pk), timeout=timeout)
+    return batch if first else None
+
+
+def get_device_recovery_batch(batch):
+    """Returns (and removes from the cache) the devices queued in a batch."""
+    batch_key = _get_recovery_batch_key(batch)
+    count = cache.get(batch_key) or 0
+    keys = [f'{batch_key}-{index}' for index in range(1, count + 1)]
+    pks = list(cache.get_many(keys).values())
+    cache.delete_many(keys + [batch_key])
+    return pks
+
+
+def get_device_recovery_batch_countdown(batch):
+    """Returns the seconds to wait before processing a batch."""
+    # one extra second of slack for devices queued at the end of the window
+    eta = (batch + 1) * app_settings.DEVICE_RECOVERY_CHECKS_WINDOW + 1
+    return max(eta - time(), 0)
+
+
 def manage_short_retention_policy():
     """creates or updates the "short" retention policy"""
     duration = app_settings.SHORT_RETENTION_POLICY
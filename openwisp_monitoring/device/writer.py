@@ -59,12 +59,12 @@ class DeviceDataWriter(object):
             )
         )
 
-    def write(self, data, time=None, current=False):
+    def write(self, data, time=None, current=False, validated=False):
         time = datetime.strptime(time, '%d-%m-%Y_%H:%M:%S.%f').replace(tzinfo=UTC)
         self._init_previous_data()
         self.device_data.data = data
         # saves raw device data
-        self.device_data.save_data()
+        self.device_data.save_data(validated=validated)
         data = self.device_data.data
         ct = ContentType.objects.get_for_model(Device)
         device_extra_tags = self._get_extra_tags(self.device_data)
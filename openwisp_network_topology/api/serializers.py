@@ -42,12 +42,10 @@ def get_representation_data(obj):
     Returns a dict that represents
     a NetJSON NetworkGraph object.
     """
-    nodes = []
-    links = []
-    for link in obj.get_links_queryset():
-        links.append(link.json(dict=True, original=False))
-    for node in obj.get_nodes_queryset():
-        nodes.append(node.json(dict=True, original=False))
+    # nodes and links are taken from the cached graph
+    graph = obj.json(dict=True)
+    nodes = graph["nodes"]
+    links = graph["links"]
     netjson = OrderedDict(
         (
             ("type", "NetworkGraph"),
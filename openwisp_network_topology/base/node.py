@@ -2,10 +2,11 @@ import json
 from collections import OrderedDict
 from copy import deepcopy
 from datetime import timedelta
+from functools import partial
 
 import swapper
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils.functional import cached_property
@@ -187,7 +188,28 @@ class AbstractNode(ShareableOrgMixin, TimeStampedEditableModel):
         return qs.select_related("organization", "topology")
 
 
+@receiver(post_save, sender=swapper.get_model_name("topology", "Node"))
+def update_graph_cache(sender, instance, **kwargs):
+    # updated once by ``TopologyIndex.save``
+    if getattr(instance, "_bulk_update", False):
+        return
+    # changes rolled back must not be applied to the cached graph
+    transaction.on_commit(
+        partial(instance.topology._update_graph_cache, nodes=[instance])
+    )
+
+
+@receiver(post_delete, sender=swapper.get_model_name("topology", "Node"))
+def remove_from_graph_cache(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(instance.topology._update_graph_cache, removed_nodes=[instance.pk])
+    )
+
+
 @receiver(post_save, sender=swapper.get_model_name("topology", "Node"))
 @receiver(post_delete, sender=swapper.get_model_name("topology", "Node"))
 def send_topology_signal(sender, instance, **kwargs):
+    # sent once by ``TopologyIndex.save``
+    if getattr(instance, "_bulk_update", False):
+        return
     update_topology.send(sender=sender, topology=instance.topology)
@@ -1,24 +1,201 @@
+import json
+import zlib
+from datetime import date
+
 import swapper
+from django.core.cache import cache
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 from openwisp_utils.base import TimeStampedEditableModel
 
+# a new base snapshot is stored when the delta
+# is bigger than this fraction of the base
+MAX_DELTA_RATIO = 0.5
+SNAPSHOT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def compress(data):
+    return zlib.compress(data.encode(), 9)
+
+
+def decompress(data):
+    return zlib.decompress(data).decode()
+
+
+def _get_key(section, item):
+    if section == "nodes":
+        return item["id"]
+    return item["source"], item["target"]
+
+
+def get_delta(base, graph):
+    """
+    Returns the differences between the ``base`` and ``graph``
+    NetJSON NetworkGraph dicts, in a format similar to the output
+    of ``netdiff.diff`` (added, removed and changed nodes and links),
+    with the addition of the attributes of the graph
+    """
+    delta = {
+        "graph": {
+            key: None if key in ["nodes", "links"] else value
+            for key, value in graph.items()
+        },
+        "added": {"nodes": [], "links": []},
+        "removed": {"nodes": [], "links": []},
+        "changed": {"nodes": [], "links": []},
+    }
+    for section in ["nodes", "links"]:
+        base_items = {_get_key(section, item): item for item in base[section]}
+        items = {_get_key(section, item): item for item in graph[section]}
+        for key, item in items.items():
+            if key not in base_items:
+                delta["added"][section].append(item)
+            elif base_items[key] != item:
+                delta["changed"][section].append(item)
+        for key in base_items.keys() - items.keys():
+            delta["removed"][section].append(key)
+    return delta
+
+
+def apply_delta(base, delta):
+    """
+    Returns the NetJSON NetworkGraph dict obtained
+    by applying ``delta`` (see ``get_delta``) to ``base``
+    """
+    graph = dict(delta["graph"])
+    for section in ["nodes", "links"]:
+        items = {_get_key(section, item): item for item in base[section]}
+        for key in delta["removed"][section]:
+            items.pop(tuple(key) if section == "links" else key, None)
+        for item in delta["changed"][section] + delta["added"][section]:
+            items[_get_key(section, item)] = item
+        graph[section] = list(items.values())
+    return graph
+
+
+def encode_snapshot(data, base_data=None, base_size=None):
+    """
+    Returns a tuple containing the compressed representation of
+    the NetJSON NetworkGraph string ``data`` and a boolean which is
+    ``True`` when it's a delta against the snapshot ``base_data``
+    (``base_size`` is the size of its compressed representation).
+
+    The delta is used only if it reproduces ``data`` exactly.
+    """
+    if base_data is not None:
+        base = json.loads(base_data)
+        delta = get_delta(base, json.loads(data))
+        compressed = compress(json.dumps(delta, separators=(",", ":")))
+        if (
+            len(compressed) < base_size * MAX_DELTA_RATIO
+            and json.dumps(apply_delta(base, delta)) == data
+        ):
+            return compressed, True
+    return compress(data), False
+
+
+def decode_snapshot(compressed_data, base_compressed_data=None):
+    """
+    Returns the NetJSON NetworkGraph string of a snapshot, the
+    compressed data of the base snapshot is required for deltas
+    """
+    data = decompress(compressed_data)
+    if base_compressed_data is None:
+        return data
+    base = json.loads(decompress(base_compressed_data))
+    return json.dumps(apply_delta(base, json.loads(data)))
+
 
 class AbstractSnapshot(TimeStampedEditableModel):
     """
     NetJSON NetworkGraph Snapshot implementation
+
+    Snapshots are stored compressed, either entirely
+    (base snapshots) or as the differences with a previous
+    base snapshot of the same topology (delta snapshots).
     """
 
     topology = models.ForeignKey(
         swapper.get_model_name("topology", "Topology"), on_delete=models.CASCADE
     )
-    data = models.TextField(blank=False)
+    base = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.RESTRICT,
+        related_name="deltas",
+    )
+    compressed_data = models.BinaryField()
     date = models.DateField(auto_now=True)
 
+    _data = None
+    _encode = False
+
     class Meta:
         verbose_name_plural = _("snapshots")
         abstract = True
 
     def __str__(self):
         return "{0}: {1}".format(self.topology.label, self.date)
+
+    @property
+    def data(self):
+        """
+        NetJSON NetworkGraph string, deltas are
+        reconstructed on demand and cached
+        """
+        if self._data is None and self.compressed_data:
+            self._data = cache.get(self._get_cache_key())
+            if self._data is None:
+                self._data = decode_snapshot(
+                    self.compressed_data,
+                    self.base.compressed_data if self.base_id else None,
+                )
+                cache.set(self._get_cache_key(), self._data, SNAPSHOT_CACHE_TIMEOUT)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._encode = True
+
+    def save(self, *args, **kwargs):
+        if not self._encode:
+            return super().save(*args, **kwargs)
+        # the deltas which depend on this snapshot are encoded again
+        deltas = []
+        if not self._state.adding:
+            deltas = [(delta, delta.data) for delta in self.deltas.all()]
+        self._encode_data()
+        super().save(*args, **kwargs)
+        self._encode = False
+        cache.set(self._get_cache_key(), self._data, SNAPSHOT_CACHE_TIMEOUT)
+        for delta, data in deltas:
+            delta.data = data
+            # update_fields avoids changing the date of older snapshots
+            delta.save(update_fields=["base", "compressed_data", "modified"])
+
+    def _get_cache_key(self):
+        return f"topology-snapshot-{self.pk}-{self.modified.timestamp()}"
+
+    def _encode_data(self):
+        base = (
+            type(self)
+            .objects.filter(
+                topology_id=self.topology_id,
+                base__isnull=True,
+                date__lt=self.date or date.today(),
+            )
+            .exclude(pk=self.pk)
+            .order_by("-date")
+            .first()
+        )
+        if base:
+            compressed, is_delta = encode_snapshot(
+                self._data, base.data, len(base.compressed_data)
+            )
+        else:
+            compressed, is_delta = encode_snapshot(self._data)
+        self.base = base if is_delta else None
+        self.compressed_data = compressed
@@ -1,11 +1,17 @@
 import json
-from collections import OrderedDict
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
+from functools import partial
+from time import monotonic
+from urllib.parse import urlparse
 
 import swapper
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.urls import reverse
 from django.utils.functional import cached_property
@@ -19,7 +25,13 @@ from openwisp_users.mixins import ShareableOrgMixin
 from openwisp_utils.base import KeyField, TimeStampedEditableModel
 
 from ..contextmanagers import log_failure
-from ..settings import PARSERS, TIMEOUT
+from ..settings import (
+    FETCH_DEADLINE,
+    FETCH_HOST_WORKERS,
+    FETCH_WORKERS,
+    PARSERS,
+    TIMEOUT,
+)
 from ..signals import update_topology
 from ..tasks import handle_update_topology
 from ..utils import print_info
@@ -79,6 +91,9 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
     status = {"added": "up", "removed": "down", "changed": "up"}
     action = {"added": "add", "changed": "change", "removed": "remove"}
 
+    _GRAPH_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+    _GRAPH_LOCK_TIMEOUT = 30
+
     class Meta:
         verbose_name_plural = _("topologies")
         abstract = True
@@ -119,8 +134,13 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
         """
         gets latest topology data
         """
-        # if data is ``None`` it will be fetched from ``self.url``
-        latest = self.parser_class(data=data, url=self.url, timeout=TIMEOUT)
+        # if we get an instance of ``self.parser_class`` it means
+        # the data has already been fetched or parsed (eg: ``fetch``)
+        if isinstance(data, self.parser_class):
+            latest = data
+        else:
+            # if data is ``None`` it will be fetched from ``self.url``
+            latest = self.parser_class(data=data, url=self.url, timeout=TIMEOUT)
         # update topology attributes if needed
         changed = False
         for attr in ["protocol", "version", "metric"]:
@@ -134,12 +154,7 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
 
     def diff(self, data=None):
         """shortcut to netdiff.diff"""
-        # if we get an instance of ``self.parser_class`` it means
-        # ``self.get_topology_data`` has already been executed by ``receive``
-        if isinstance(data, self.parser_class):
-            latest = data
-        else:
-            latest = self.get_topology_data(data)
+        latest = self.get_topology_data(data)
         current = NetJsonParser(self.json(dict=True, omit_down=True, original=True))
         return diff(current, latest)
 
@@ -151,17 +166,24 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
 
     def json(self, dict=False, omit_down=False, original=False, **kwargs):
         """returns a dict that represents a NetJSON NetworkGraph object"""
+        # the default representation is cached already encoded
+        encoded = not any([dict, omit_down, original, kwargs])
+        if encoded:
+            netjson = cache.get(self._get_graph_cache_key("json"))
+            if netjson is not None:
+                return netjson
+        graph = self._get_graph()
+        key = "original" if original else "netjson"
         nodes = []
         links = []
-        links_queryset = self.get_links_queryset()
-        # needed to detect links coming back online
-        if omit_down:
-            links_queryset = links_queryset.filter(status="up")
         # populate graph
-        for link in links_queryset:
-            links.append(link.json(dict=True, original=original))
-        for node in self.get_nodes_queryset():
-            nodes.append(node.json(dict=True, original=original))
+        for link in graph["links"].values():
+            # needed to detect links coming back online
+            if omit_down and link["status"] != "up":
+                continue
+            links.append(link[key])
+        for node in graph["nodes"].values():
+            nodes.append(node[key])
         netjson = OrderedDict(
             (
                 ("type", "NetworkGraph"),
@@ -179,7 +201,168 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
         )
         if dict:
             return netjson
-        return json.dumps(netjson, cls=JSONEncoder, **kwargs)
+        netjson = json.dumps(netjson, cls=JSONEncoder, **kwargs)
+        if encoded:
+            cache.set(
+                self._get_graph_cache_key("json"), netjson, self._GRAPH_CACHE_TIMEOUT
+            )
+        return netjson
+
+    def _get_graph_cache_key(self, suffix="graph"):
+        return f"topology-{suffix}-{self.pk}"
+
+    def _get_graph(self):
+        """
+        Returns the graph of the topology, the result is cached.
+
+        The graph maps the primary key of each node and link to
+        their NetJSON representations (see ``_get_graph_entry``),
+        it's generated from the database only when it's not cached,
+        afterwards it's kept up to date by ``_update_graph_cache``.
+        """
+        key = self._get_graph_cache_key()
+        graph = cache.get(key)
+        if graph is None:
+            version = cache.get(self._get_graph_cache_key("graph-version"))
+            graph = {
+                "links": {
+                    str(link.pk): self._get_graph_entry(link, status=link.status)
+                    for link in self.get_links_queryset()
+                },
+                "nodes": {
+                    str(node.pk): self._get_graph_entry(node)
+                    for node in self.get_nodes_queryset()
+                },
+            }
+            self._set_graph(graph, version)
+        return graph
+
+    def _set_graph(self, graph, version):
+        """
+        Caches the graph generated from the database.
+
+        The graph is discarded if the topology changed after ``version``
+        was read (the changes may be missing from the graph), the
+        locking protocol is the same of ``_update_graph_cache``.
+        """
+        key = self._get_graph_cache_key()
+        lock_key = self._get_graph_cache_key("graph-lock")
+        dirty_key = self._get_graph_cache_key("graph-dirty")
+        if not cache.add(lock_key, True, self._GRAPH_LOCK_TIMEOUT):
+            return
+        try:
+            if cache.get(self._get_graph_cache_key("graph-version")) != version:
+                return
+            cache.set(key, graph, self._GRAPH_CACHE_TIMEOUT)
+            if cache.get(dirty_key):
+                cache.delete_many([key, dirty_key])
+        finally:
+            cache.delete(lock_key)
+
+    def _set_graph_version(self):
+        # random values, unlike counters, are never
+        # reused if the key is evicted from the cache
+        cache.set(
+            self._get_graph_cache_key("graph-version"),
+            uuid.uuid4().hex,
+            self._GRAPH_CACHE_TIMEOUT,
+        )
+
+    @staticmethod
+    def _get_graph_entry(item, **kwargs):
+        return dict(
+            netjson=item.json(dict=True),
+            original=item.json(dict=True, original=True),
+            **kwargs,
+        )
+
+    def _update_graph_cache(
+        self,
+        nodes=None,
+        links=None,
+        removed_nodes=None,
+        removed_links=None,
+        touched_links=None,
+        modified=None,
+    ):
+        """
+        Applies changes to the cached graph incrementally.
+
+        ``nodes`` and ``links`` are lists of items which have been
+        added or modified, ``removed_nodes`` and ``removed_links`` are
+        lists of primary keys of items which have been deleted,
+        ``touched_links`` is a list of primary keys of links whose
+        ``modified`` field has been set to ``modified``.
+        """
+        key = self._get_graph_cache_key()
+        lock_key = self._get_graph_cache_key("graph-lock")
+        dirty_key = self._get_graph_cache_key("graph-dirty")
+        # the encoded representation is generated again when needed
+        cache.delete(self._get_graph_cache_key("json"))
+        # graphs being generated from the database
+        # may miss these changes, hence they are discarded
+        self._set_graph_version()
+        # if the graph is being updated by another process,
+        # the changes could be lost, hence the graph is deleted and
+        # the other process is notified to delete it as well,
+        # it will be regenerated from the database when needed
+        if not cache.add(lock_key, True, self._GRAPH_LOCK_TIMEOUT):
+            cache.set(dirty_key, True, self._GRAPH_LOCK_TIMEOUT)
+            cache.delete(key)
+            return
+        try:
+            graph = cache.get(key)
+            # a missing graph is regenerated when needed
+            if graph is not None:
+                graph = self._apply_graph_changes(
+                    graph,
+                    nodes or [],
+                    links or [],
+                    removed_nodes or [],
+                    removed_links or [],
+                    touched_links or [],
+                    modified,
+                )
+            if graph is not None:
+                cache.set(key, graph, self._GRAPH_CACHE_TIMEOUT)
+            if graph is None or cache.get(dirty_key):
+                cache.delete_many([key, dirty_key])
+        finally:
+            cache.delete(lock_key)
+
+    def _apply_graph_changes(
+        self, graph, nodes, links, removed_nodes, removed_links, touched_links, modified
+    ):
+        """
+        returns ``graph`` with the changes applied, or ``None``
+        if it needs to be generated again from the database
+        """
+        for node in nodes:
+            entry = self._get_graph_entry(node)
+            previous = graph["nodes"].get(str(node.pk))
+            # the links of the node refer to its previous address
+            if previous and previous["original"]["id"] != entry["original"]["id"]:
+                return None
+            graph["nodes"][str(node.pk)] = entry
+        for link in links:
+            graph["links"][str(link.pk)] = self._get_graph_entry(
+                link, status=link.status
+            )
+        for pk in removed_nodes:
+            graph["nodes"].pop(str(pk), None)
+        for pk in removed_links:
+            graph["links"].pop(str(pk), None)
+        for pk in touched_links:
+            entry = graph["links"].get(str(pk))
+            if entry:
+                entry["netjson"]["properties"]["modified"] = modified
+        return graph
+
+    def _invalidate_graph_cache(self):
+        self._set_graph_version()
+        cache.delete_many(
+            [self._get_graph_cache_key(), self._get_graph_cache_key("json")]
+        )
 
     def _create_node(self, **kwargs):
         options = dict(organization=self.organization, topology=self)
@@ -193,14 +376,21 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
         link = self.link_model(**options)
         return link
 
-    def _update_added_items(self, items):
-        Link, Node = self.link_model, self.node_model
+    def _get_index(self, index=None):
+        """
+        returns ``index`` or a new ``TopologyIndex``
+        """
+        return index or TopologyIndex(self)
+
+    def _update_added_items(self, items, index=None):
+        save = index is None
+        index = self._get_index(index)
 
         for node_dict in items.get("nodes", []):
             # if node exists, update its properties
-            node = Node.get_from_address(node_dict["id"], topology=self)
+            node = index.get_node(node_dict["id"])
             if node:
-                self._update_node_properties(node, node_dict, section="added")
+                self._update_node_properties(node, node_dict, "added", index)
                 continue
             # if node doesn't exist create new
             addresses = [node_dict["id"]]
@@ -210,20 +400,20 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
             node = self._create_node(
                 label=label, addresses=addresses, properties=properties
             )
-            node.full_clean()
-            node.save()
+            # the related objects are known to exist and the
+            # primary key is generated, no need to query the DB
+            node.full_clean(exclude=["topology", "organization"], validate_unique=False)
+            index.add_node(node)
 
         for link_dict in items.get("links", []):
-            link = Link.get_from_nodes(
-                link_dict["source"], link_dict["target"], topology=self
-            )
+            link = index.get_link(link_dict["source"], link_dict["target"])
             # if link exists, update its properties
             if link:
-                self._update_link_properties(link, link_dict, section="added")
+                self._update_link_properties(link, link_dict, "added", index)
                 continue
             # if link does not exist create new
-            source = Node.get_from_address(link_dict["source"], self)
-            target = Node.get_from_address(link_dict["target"], self)
+            source = index.get_node(link_dict["source"])
+            target = index.get_node(link_dict["target"])
             link = self._create_link(
                 source=source,
                 target=target,
@@ -232,10 +422,16 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
                 properties=link_dict["properties"],
                 topology=self,
             )
-            link.full_clean()
-            link.save()
+            link.full_clean(
+                exclude=["topology", "organization", "source", "target"],
+                validate_unique=False,
+            )
+            index.add_link(link)
+
+        if save:
+            index.save()
 
-    def _update_node_properties(self, node, node_dict, section):
+    def _update_node_properties(self, node, node_dict, section, index):
         changed = False
         if node.label != node_dict.get("label"):
             changed = True
@@ -246,16 +442,20 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
             node.addresses = [node_dict["id"]]
             if local_addresses:
                 node.addresses += local_addresses
+            # reset cached_property
+            node.__dict__.pop("local_addresses", None)
         if node.properties != node_dict.get("properties"):
             changed = True
             node.properties = node_dict.get("properties")
         # perform writes only if needed
         if changed:
             with log_failure(self.action[section], node):
-                node.full_clean()
-                node.save()
+                # relations are not changed, validating them is not needed
+                node.clean_fields(exclude=["topology", "organization"])
+                node.clean()
+                index.node_changed(node)
 
-    def _update_link_properties(self, link, link_dict, section):
+    def _update_link_properties(self, link, link_dict, section, index):
         changed = False
         # if status of link is changed
         if self.link_status_changed(link, self.status[section]):
@@ -273,36 +473,45 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
         # perform writes only if needed
         if changed:
             with log_failure(self.action[section], link):
-                link.full_clean()
-                link.save()
+                link.clean_fields(
+                    exclude=["topology", "organization", "source", "target"]
+                )
+                link.clean()
+                index.link_changed(link)
+
+    def _update_changed_items(self, items, section="changed", index=None):
+        save = index is None
+        index = self._get_index(index)
 
-    def _update_changed_items(self, items, section="changed"):
-        Link, Node = self.link_model, self.node_model
         for node_dict in items.get("nodes", []):
-            node = Node.get_from_address(node_dict["id"], topology=self)
+            node = index.get_node(node_dict["id"])
             if node:
-                self._update_node_properties(node, node_dict, section=section)
+                self._update_node_properties(node, node_dict, section, index)
 
         for link_dict in items.get("links", []):
-            link = Link.get_from_nodes(
-                link_dict["source"], link_dict["target"], topology=self
-            )
+            link = index.get_link(link_dict["source"], link_dict["target"])
             if link:
-                self._update_link_properties(link, link_dict, section=section)
+                self._update_link_properties(link, link_dict, section, index)
+
+        if save:
+            index.save()
 
     def update_topology(self, diff):
+        """
+        applies ``diff`` to the nodes and links of the topology,
+        which are loaded once and written in bulk
+        """
+        index = self._get_index()
         if diff["added"]:
-            self._update_added_items(diff["added"])
+            self._update_added_items(diff["added"], index=index)
         if diff["changed"]:
-            self._update_changed_items(diff["changed"])
+            self._update_changed_items(diff["changed"], index=index)
         if diff["removed"]:
-            Link = self.link_model
             for link_dict in diff["removed"].get("links", []):
-                link = Link.get_from_nodes(
-                    link_dict["source"], link_dict["target"], topology=self
-                )
+                link = index.get_link(link_dict["source"], link_dict["target"])
                 if link:
-                    self._update_link_properties(link, link_dict, section="removed")
+                    self._update_link_properties(link, link_dict, "removed", index)
+        index.save()
 
     def update(self, data=None):
         """
@@ -313,6 +522,14 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
         diff = self.diff(data)
         handle_update_topology.delay(self.pk, diff)
 
+    def fetch(self):
+        """
+        Fetches and parses the topology data from ``url``,
+        the database is not accessed, which allows to
+        fetch many topologies concurrently (see ``update_all``)
+        """
+        return self.parser_class(url=self.url, timeout=TIMEOUT)
+
     def save_snapshot(self, **kwargs):
         """
         Saves the snapshot of topology
@@ -358,17 +575,49 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
         """
         if self.expiration_time > 0:
             data = self.get_topology_data(data)
-            Link = self.link_model
             netjson = data.json(dict=True)
             # update last modified date of all received links
-            for link_dict in netjson["links"]:
-                link = Link.get_from_nodes(
-                    link_dict["source"], link_dict["target"], topology=self
-                )
-                if link:
-                    link.save()
+            self.touch_links(netjson["links"])
         self.update(data)
 
+    def touch_links(self, links):
+        """
+        Updates the ``modified`` field of the existing ``links``
+        (list of NetJSON link dicts), which are looked up with one
+        query and updated with one query, without sending signals
+        since the status of the links is not changed.
+
+        Returns the amount of updated links.
+        """
+        received = set()
+        for link_dict in links:
+            received.add((link_dict["source"], link_dict["target"]))
+            received.add((link_dict["target"], link_dict["source"]))
+        if not received:
+            return 0
+        queryset = self.link_set.select_related("source", "target").only(
+            "id", "source", "target", "source__addresses", "target__addresses"
+        )
+        link_ids = []
+        for link in queryset.iterator():
+            for source in link.source.addresses:
+                if any(
+                    (source, target) in received for target in link.target.addresses
+                ):
+                    link_ids.append(link.pk)
+                    break
+        if not link_ids:
+            return 0
+        modified = now()
+        count = self.link_model.objects.filter(pk__in=link_ids).update(
+            modified=modified
+        )
+        # changes rolled back must not be applied to the cached graph
+        transaction.on_commit(
+            partial(self._update_graph_cache, touched_links=link_ids, modified=modified)
+        )
+        return count
+
     @classmethod
     def update_all(cls, label=None):
         """
@@ -379,13 +628,79 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
         queryset = cls.objects.filter(published=True, strategy="fetch")
         if label:
             queryset = queryset.filter(label__icontains=label)
-        for topology in queryset:
+        # the topologies are updated as soon as their data is fetched
+        for topology, latest in cls.fetch_all(queryset):
             print_info("Updating topology {0}".format(topology))
             with log_failure("update", topology):
-                topology.update()
+                if isinstance(latest, Exception):
+                    raise latest
+                topology.update(latest)
         cls().link_model.delete_expired_links()
         cls().node_model.delete_expired_nodes()
 
+    @classmethod
+    def fetch_all(cls, topologies):
+        """
+        Fetches the data of ``topologies`` concurrently with a pool of
+        ``FETCH_WORKERS`` threads, performing at most ``FETCH_HOST_WORKERS``
+        requests to the same host at the same time.
+
+        Yields a tuple ``(topology, latest)`` for each topology as soon
+        as it's fetched, ``latest`` is the exception raised in case of
+        failure. The topologies which are not fetched within
+        ``FETCH_DEADLINE`` seconds are yielded with a ``TimeoutError``.
+        """
+        deadline = monotonic() + FETCH_DEADLINE
+        # the topologies of each host are queued and submitted only
+        # when the previous requests to the same host are completed,
+        # hence no thread of the pool is kept waiting for a busy host
+        queues = {}
+        for topology in topologies:
+            host = urlparse(topology.url or "").hostname
+            queues.setdefault(host, deque()).append(topology)
+
+        def fetch(topology):
+            if monotonic() > deadline:
+                raise TimeoutError("deadline exceeded before fetching")
+            return topology.fetch()
+
+        executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+        futures = {}
+
+        def submit(host):
+            topology = queues[host].popleft()
+            futures[executor.submit(fetch, topology)] = (topology, host)
+
+        try:
+            for host, queue in queues.items():
+                for i in range(min(FETCH_HOST_WORKERS, len(queue))):
+                    submit(host)
+            while futures:
+                done, pending = wait(
+                    list(futures),
+                    timeout=max(deadline - monotonic(), 0),
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    break
+                for future in done:
+                    topology, host = futures.pop(future)
+                    if queues[host]:
+                        submit(host)
+                    try:
+                        latest = future.result()
+                    except Exception as e:
+                        latest = e
+                    yield topology, latest
+            for topology, host in futures.values():
+                yield topology, TimeoutError("deadline exceeded")
+            for queue in queues.values():
+                for topology in queue:
+                    yield topology, TimeoutError("deadline exceeded")
+        finally:
+            # threads still fetching are bounded by ``TIMEOUT``
+            executor.shutdown(wait=False, cancel_futures=True)
+
     @classmethod
     def save_snapshot_all(cls, label=None):
         """
@@ -401,6 +716,153 @@ class AbstractTopology(ShareableOrgMixin, TimeStampedEditableModel):
                 topology.save_snapshot()
 
 
+class TopologyIndex(object):
+    """
+    In-memory index of the nodes and links of a topology, which
+    allows to apply a diff without looking up each item in the DB:
+    nodes are indexed by address, links by their nodes; the changes
+    are collected and written in bulk by ``save()``
+    """
+
+    batch_size = 1000
+    node_fields = ["label", "addresses", "properties", "modified"]
+    link_fields = [
+        "status",
+        "cost",
+        "cost_text",
+        "properties",
+        "modified",
+        "status_changed",
+    ]
+
+    def __init__(self, topology):
+        self.topology = topology
+        self.nodes = {}
+        self.links = {}
+        self._new_nodes = []
+        self._new_links = []
+        self._changed_nodes = {}
+        self._changed_links = {}
+        nodes = {}
+        # if an address is shared, the oldest item wins,
+        # like in ``Node.get_from_address``
+        for node in topology.node_set.order_by("pk"):
+            nodes[node.pk] = node
+            for address in node.addresses:
+                self.nodes.setdefault(address, node)
+        for link in topology.link_set.order_by("pk"):
+            if link.source_id in nodes and link.target_id in nodes:
+                link.source = nodes[link.source_id]
+                link.target = nodes[link.target_id]
+            self.links.setdefault((link.source_id, link.target_id), link)
+
+    def get_node(self, address):
+        """
+        returns the node which has ``address`` or ``None``
+        """
+        return self.nodes.get(address)
+
+    def get_link(self, source, target):
+        """
+        returns the link between the nodes which have the
+        addresses ``source`` and ``target`` (or vice versa)
+        or ``None``
+        """
+        source = self.get_node(source)
+        target = self.get_node(target)
+        if source is None or target is None:
+            return None
+        return self.links.get((source.pk, target.pk)) or self.links.get(
+            (target.pk, source.pk)
+        )
+
+    def add_node(self, node):
+        self._new_nodes.append(node)
+        for address in node.addresses:
+            self.nodes.setdefault(address, node)
+
+    def add_link(self, link):
+        self._new_links.append(link)
+        self.links.setdefault((link.source_id, link.target_id), link)
+
+    def node_changed(self, node):
+        for address in node.addresses:
+            self.nodes.setdefault(address, node)
+        # the changes of new nodes are written by ``bulk_create``
+        if not node._state.adding:
+            self._changed_nodes[node.pk] = node
+
+    def link_changed(self, link):
+        if not link._state.adding:
+            self._changed_links[link.pk] = link
+
+    def save(self):
+        """
+        writes the changes in bulk, then sends the ``post_save`` and
+        ``link_status_changed`` signals of each item and the
+        ``update_topology`` signal once
+        """
+        Node = self.topology.node_model
+        Link = self.topology.link_model
+        changed_nodes = list(self._changed_nodes.values())
+        changed_links = list(self._changed_links.values())
+        if not any([self._new_nodes, self._new_links, changed_nodes, changed_links]):
+            return
+        timestamp = now()
+        for item in changed_nodes + changed_links:
+            item.modified = timestamp
+        for link in changed_links:
+            link.status_changed = timestamp
+        with transaction.atomic():
+            Node.objects.bulk_create(self._new_nodes, batch_size=self.batch_size)
+            Link.objects.bulk_create(self._new_links, batch_size=self.batch_size)
+            Node.objects.bulk_update(
+                changed_nodes, self.node_fields, batch_size=self.batch_size
+            )
+            Link.objects.bulk_update(
+                changed_links, self.link_fields, batch_size=self.batch_size
+            )
+        # changes rolled back must not be applied to the cached graph
+        transaction.on_commit(
+            partial(
+                self.topology._update_graph_cache,
+                nodes=self._new_nodes + changed_nodes,
+                links=self._new_links + changed_links,
+            )
+        )
+        for model, created, items in [
+            (Node, True, self._new_nodes),
+            (Link, True, self._new_links),
+            (Node, False, changed_nodes),
+            (Link, False, changed_links),
+        ]:
+            for item in items:
+                # ``update_topology`` is sent only once
+                item._bulk_update = True
+                post_save.send(
+                    sender=model,
+                    instance=item,
+                    created=created,
+                    update_fields=None,
+                    raw=False,
+                    using=item._state.db,
+                )
+        for link in self._new_links + changed_links:
+            if link.status != link._initial_status:
+                link.send_status_changed_signal()
+            link._initial_status = link.status
+        self._new_nodes, self._new_links = [], []
+        self._changed_nodes, self._changed_links = {}, {}
+        update_topology.send(sender=self.topology.__class__, topology=self.topology)
+
+
 @receiver(post_save, sender=swapper.get_model_name("topology", "Topology"))
 def send_topology_signal(sender, instance, **kwargs):
+    # the encoded representation contains the fields of the topology
+    cache.delete(instance._get_graph_cache_key("json"))
     update_topology.send(sender=sender, topology=instance)
+
+
+@receiver(post_delete, sender=swapper.get_model_name("topology", "Topology"))
+def invalidate_graph_cache(sender, instance, **kwargs):
+    instance._invalidate_graph_cache()
@@ -1,13 +1,22 @@
+from functools import partial
 from importlib import import_module
 
 import swapper
 from django.apps import AppConfig
+from django.conf import settings
 from django.db import transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.utils.translation import gettext_lazy as _
 
+from openwisp_controller.config.signals import device_name_changed
+
 from ...utils import link_status_changed
-from .tasks import create_device_node_relation, trigger_device_updates
+from . import settings as app_settings
+from .tasks import (
+    create_device_node_relation,
+    schedule_update_mesh_topology,
+    trigger_device_updates,
+)
 
 
 class OpenwispTopologyDeviceConfig(AppConfig):
@@ -22,6 +31,8 @@ class OpenwispTopologyDeviceConfig(AppConfig):
     def connect_signals(self):
         Node = swapper.load_model("topology", "Node")
         Link = swapper.load_model("topology", "Link")
+        DeviceNode = swapper.load_model("topology_device", "DeviceNode")
+        Device = swapper.load_model("config", "Device")
 
         post_save.connect(
             self.create_device_rel, sender=Node, dispatch_uid="node_to_device_rel"
@@ -31,6 +42,31 @@ class OpenwispTopologyDeviceConfig(AppConfig):
             sender=Link,
             dispatch_uid="controller_integration_link_status_chaged",
         )
+        # the name of the device is used as the label of the node
+        post_save.connect(
+            self.update_node_graph_cache,
+            sender=DeviceNode,
+            dispatch_uid="device_node_update_graph_cache",
+        )
+        post_delete.connect(
+            self.update_node_graph_cache,
+            sender=DeviceNode,
+            dispatch_uid="device_node_delete_update_graph_cache",
+        )
+        device_name_changed.connect(
+            self.device_name_changed_receiver,
+            sender=Device,
+            dispatch_uid="device_name_changed_update_graph_cache",
+        )
+        if "openwisp_monitoring.device" in settings.INSTALLED_APPS:
+            from openwisp_monitoring.device.signals import device_metrics_received
+
+            DeviceData = swapper.load_model("device_monitoring", "DeviceData")
+            device_metrics_received.connect(
+                self.device_metrics_received_receiver,
+                sender=DeviceData,
+                dispatch_uid="wifi_mesh_device_metrics_received",
+            )
 
     @classmethod
     def create_device_rel(cls, instance, created, **kwargs):
@@ -42,5 +78,45 @@ class OpenwispTopologyDeviceConfig(AppConfig):
     def link_status_changed_receiver(cls, link, **kwargs):
         transaction.on_commit(lambda: trigger_device_updates.delay(link.pk))
 
+    @classmethod
+    def update_node_graph_cache(cls, instance, **kwargs):
+        Node = swapper.load_model("topology", "Node")
+        # the node may have been deleted together with the device node
+        node = (
+            Node.objects.select_related("topology", "devicenode__device")
+            .filter(pk=instance.node_id)
+            .first()
+        )
+        if node:
+            transaction.on_commit(
+                partial(node.topology._update_graph_cache, nodes=[node])
+            )
+
+    @classmethod
+    def device_name_changed_receiver(cls, instance, **kwargs):
+        DeviceNode = swapper.load_model("topology_device", "DeviceNode")
+        device_nodes = DeviceNode.objects.select_related("node__topology").filter(
+            device=instance
+        )
+        for device_node in device_nodes:
+            device_node.device = instance
+            node = device_node.node
+            transaction.on_commit(
+                partial(node.topology._update_graph_cache, nodes=[node])
+            )
+
+    @classmethod
+    def device_metrics_received_receiver(cls, instance, time, **kwargs):
+        if not app_settings.WIFI_MESH_INTEGRATION:
+            return
+        WifiMesh = swapper.load_model("topology_device", "WifiMesh")
+        mesh_ids = WifiMesh.update_device_data(instance, time)
+        if not mesh_ids:
+            return
+        organization_id = str(instance.organization_id)
+        transaction.on_commit(
+            lambda: schedule_update_mesh_topology(organization_id, mesh_ids)
+        )
+
     def override_node_label(self):
         import_module("openwisp_network_topology.integrations.device.overrides")
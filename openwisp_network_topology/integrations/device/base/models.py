@@ -1,17 +1,21 @@
 import logging
+from datetime import datetime
 from ipaddress import ip_address, ip_network
+from urllib.parse import quote
 
 from django.conf import settings
-from django.core.exceptions import ImproperlyConfigured
-from django.db import models
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import models, transaction
 from django.utils.module_loading import import_string
-from django.utils.timezone import datetime, now, timedelta
+from django.utils.timezone import now, timedelta
 from django.utils.translation import gettext_lazy as _
 from swapper import get_model_name, load_model
 
 from openwisp_utils.base import UUIDModel
 
 from .. import settings as app_settings
+from ..tasks import schedule_update_mesh_topology
 
 logger = logging.getLogger(__name__)
 
@@ -271,32 +275,275 @@ class AbstractWifiMesh(UUIDModel):
     mesh_id = models.CharField(
         max_length=32, null=False, blank=False, verbose_name=_("Mesh ID")
     )
+    # copied from the topology, needed to keep mesh IDs
+    # unique within each organization at database level
+    organization = models.ForeignKey(
+        get_model_name("openwisp_users", "Organization"),
+        verbose_name=_("organization"),
+        on_delete=models.CASCADE,
+        editable=False,
+    )
 
     class Meta:
         abstract = True
+        unique_together = ("organization", "mesh_id")
+
+    _CACHE_TIMEOUT = 60 * 60 * 24
+    # the links of meshes whose data is unchanged are touched at most
+    # once in this amount of seconds, it must be lower than the
+    # expiration time of mesh topologies (see ``_get_mesh_topology``)
+    _TOUCH_INTERVAL = 60
+    # the lock of a mesh is released automatically after this amount
+    # of seconds in case the process updating its topology dies
+    _LOCK_TIMEOUT = 5 * 60
+
+    def clean(self):
+        if not self.topology_id:
+            return
+        if not self.topology.organization_id:
+            raise ValidationError(
+                {"topology": _("Shared topologies cannot be used for WiFi meshes.")}
+            )
+        self.organization_id = self.topology.organization_id
+        WifiMesh = load_model("topology_device", "WifiMesh")
+        if (
+            WifiMesh.objects.filter(
+                organization_id=self.organization_id, mesh_id=self.mesh_id
+            )
+            .exclude(pk=self.pk)
+            .exists()
+        ):
+            raise ValidationError(
+                {
+                    "mesh_id": _(
+                        "A WiFi mesh with this ID already exists in this organization."
+                    )
+                }
+            )
 
     @classmethod
     def create_topology(cls, organization_ids, discard_older_data_time):
+        """
+        Expires the monitoring data of the devices which have not sent
+        data in the last ``discard_older_data_time`` seconds and
+        updates the topologies of the meshes they were part of.
+
+        The topologies are kept up to date by ``update_device_data``
+        and ``update_mesh_topologies`` while the devices send data.
+        """
         if not app_settings.WIFI_MESH_INTEGRATION:
             raise ImproperlyConfigured(
                 '"OPENIWSP_NETWORK_TOPOLOGY_WIFI_MESH_INTEGRATION" is set to "False".'
             )
-        Link = load_model("topology", "Link")
+        discard_older_data_time = now() - timedelta(seconds=discard_older_data_time)
         for org_id in organization_ids:
-            intermediate_topologies = cls._create_intermediate_topologies(
-                org_id, discard_older_data_time
-            )
-            if not intermediate_topologies:
-                Link.objects.filter(
-                    topology__wifimesh__isnull=False, organization_id=org_id
-                ).exclude(topology__wifimesh__in=intermediate_topologies.keys()).update(
-                    status="down"
+            device_data = cls._get_cached_device_data(org_id)
+            expired = [
+                pk
+                for pk, data in device_data.items()
+                if data["interfaces"] and data["time"] <= discard_older_data_time
+            ]
+            mesh_ids = set()
+            entries = {}
+            for pk in expired:
+                data = device_data.pop(pk)
+                mesh_ids.update(cls._get_mesh_ids(data["interfaces"]))
+                # the entries are kept without interfaces, otherwise they
+                # would be restored by ``_get_cached_device_data``
+                entries[cls._get_cache_key(pk)] = dict(data, interfaces=[])
+            cache.set_many(entries, cls._CACHE_TIMEOUT)
+            busy_mesh_ids = cls.update_mesh_topologies(org_id, sorted(mesh_ids))
+            if busy_mesh_ids:
+                schedule_update_mesh_topology(org_id, busy_mesh_ids)
+            live_mesh_ids = set()
+            for data in device_data.values():
+                live_mesh_ids.update(cls._get_mesh_ids(data["interfaces"]))
+            cls._discard_topologies(org_id, exclude=list(live_mesh_ids))
+
+    @classmethod
+    def update_device_data(cls, device_data, time):
+        """
+        Called when a device sends monitoring data: stores its mesh
+        interfaces in the cache and returns the list of the IDs of the
+        meshes whose topology needs to be updated because the mesh
+        interfaces of the device have changed, or because the links
+        of the mesh need to be touched (see ``_TOUCH_INTERVAL``).
+        """
+        key = cls._get_cache_key(device_data.pk)
+        previous = cache.get(key)
+        if previous and previous["time"] and previous["time"] > time:
+            # data sent late (eg: after a connectivity outage)
+            return []
+        interfaces = cls._get_mesh_interfaces(device_data.data)
+        # the devices without mesh interfaces are cached once as well,
+        # otherwise they would be restored by ``_get_cached_device_data``
+        if not interfaces and previous and not previous["interfaces"]:
+            return []
+        cache.set(
+            key,
+            {
+                "time": time,
+                "mac_address": device_data.mac_address,
+                "interfaces": interfaces,
+            },
+            cls._CACHE_TIMEOUT,
+        )
+        organization_id = device_data.organization_id
+        if previous and previous["interfaces"] == interfaces:
+            # the links are not touched when the topology is not updated,
+            # hence they would expire while the devices keep reporting
+            return [
+                mesh_id
+                for mesh_id in sorted(cls._get_mesh_ids(interfaces))
+                if cache.add(
+                    cls._get_mesh_cache_key(organization_id, mesh_id, "touched"),
+                    True,
+                    cls._TOUCH_INTERVAL,
                 )
+            ]
+        mesh_ids = cls._get_mesh_ids(interfaces)
+        if previous:
+            mesh_ids.update(cls._get_mesh_ids(previous["interfaces"]))
+        # updating the topology touches the links
+        cache.set_many(
+            {
+                cls._get_mesh_cache_key(organization_id, mesh_id, "touched"): True
+                for mesh_id in mesh_ids
+            },
+            cls._TOUCH_INTERVAL,
+        )
+        return sorted(mesh_ids)
+
+    @staticmethod
+    def _get_mesh_cache_key(organization_id, mesh_id, context):
+        # mesh IDs contain the SSID, which may contain spaces
+        return f"wifi-mesh-{context}-{organization_id}-{quote(mesh_id)}"
+
+    @classmethod
+    def update_mesh_topologies(cls, organization_id, mesh_ids):
+        """
+        Updates the topologies of ``mesh_ids`` using
+        the monitoring data stored by ``update_device_data``.
+
+        The updates of each mesh are serialized with a cache lock:
+        the meshes which are being updated by another process are
+        skipped and their IDs are returned, they must be updated
+        again later because the other process may miss the latest data.
+        """
+        lock_keys = {}
+        for mesh_id in mesh_ids:
+            lock_key = cls._get_mesh_cache_key(organization_id, mesh_id, "lock")
+            if cache.add(lock_key, True, cls._LOCK_TIMEOUT):
+                lock_keys[mesh_id] = lock_key
+        try:
+            if lock_keys:
+                intermediate_topologies = cls._create_intermediate_topologies(
+                    cls._get_cached_device_data(organization_id), set(lock_keys)
+                )
+                cls._create_topology(intermediate_topologies, organization_id)
+                cls._discard_topologies(
+                    organization_id,
+                    mesh_ids=list(lock_keys),
+                    exclude=list(intermediate_topologies),
+                )
+        finally:
+            cache.delete_many(list(lock_keys.values()))
+        return [mesh_id for mesh_id in mesh_ids if mesh_id not in lock_keys]
+
+    @staticmethod
+    def _get_cache_key(device_id):
+        return f"wifi-mesh-device-{device_id}"
+
+    @classmethod
+    def _get_cached_device_data(cls, organization_id):
+        """
+        Returns a dict which maps the primary keys of the devices
+        of the organization to the data stored by ``update_device_data``,
+        the cache entries are retrieved with one lookup.
+
+        The entries missing from the cache (eg: after an upgrade or
+        a flush of the cache) are restored from the last data stored
+        in the timeseries database, otherwise the meshes of the
+        devices would be discarded until they send data again.
+        """
+        DeviceData = load_model("device_monitoring", "DeviceData")
+        device_ids = DeviceData.objects.filter(
+            organization_id=organization_id
+        ).values_list("pk", flat=True)
+        keys = {cls._get_cache_key(pk): pk for pk in device_ids}
+        cached = cache.get_many(keys.keys())
+        device_data = {pk: cached[key] for key, pk in keys.items() if key in cached}
+        missing = [pk for key, pk in keys.items() if key not in cached]
+        if missing:
+            device_data.update(cls._restore_device_data(missing))
+        return device_data
+
+    @classmethod
+    def _restore_device_data(cls, device_ids):
+        DeviceData = load_model("device_monitoring", "DeviceData")
+        restored = {}
+        queryset = DeviceData.objects.filter(pk__in=device_ids).only("mac_address")
+        for device_data in queryset.iterator():
+            data = device_data.data
+            time = None
+            if data is not None:
+                time = datetime.fromisoformat(device_data.data_timestamp)
+            restored[device_data.pk] = {
+                "time": time,
+                "mac_address": device_data.mac_address,
+                "interfaces": cls._get_mesh_interfaces(data),
+            }
+        cache.set_many(
+            {cls._get_cache_key(pk): data for pk, data in restored.items()},
+            cls._CACHE_TIMEOUT,
+        )
+        return restored
+
+    @classmethod
+    def _get_mesh_interfaces(cls, data):
+        """
+        Returns the mesh interfaces found in the monitoring data,
+        keeping only the information used to build the topology.
+        """
+        interfaces = []
+        client_fields = ["mac"] + cls._NODE_PROPERTIES + cls._LINK_PROPERTIES
+        for interface in (data or {}).get("interfaces", []):
+            if not cls._is_mesh_interfaces(interface):
                 continue
-            cls._create_topology(intermediate_topologies, org_id)
+            wireless = interface["wireless"]
+            clients = [
+                {
+                    field: value
+                    for field, value in client.items()
+                    if field in client_fields
+                }
+                for client in wireless.get("clients", [])
+            ]
+            interfaces.append(
+                {
+                    "mac": interface["mac"],
+                    "wireless": {
+                        "mode": wireless["mode"],
+                        "ssid": wireless["ssid"],
+                        "channel": wireless["channel"],
+                        "clients": clients,
+                    },
+                }
+            )
+        return interfaces
+
+    @staticmethod
+    def _get_mesh_id(interface):
+        return "{}@{}".format(
+            interface["wireless"]["ssid"], interface["wireless"]["channel"]
+        )
 
     @classmethod
-    def _create_intermediate_topologies(cls, organization_id, discard_older_data_time):
+    def _get_mesh_ids(cls, interfaces):
+        return {cls._get_mesh_id(interface) for interface in interfaces}
+
+    @classmethod
+    def _create_intermediate_topologies(cls, device_data, mesh_ids=None):
         """
         Creates an intermediate data structure for creating topologies.
         The intermediate topology contains intermediate data structure
@@ -308,26 +555,17 @@ class AbstractWifiMesh(UUIDModel):
         topology is created between device (hub) and clients (spoke).
         These individual topologies are then complied to create the
         complete mesh topology.
+
+        ``device_data`` is the dict returned by ``_get_cached_device_data``,
+        if ``mesh_ids`` is passed, only the topologies of these meshes
+        are created.
         """
-        DeviceData = load_model("device_monitoring", "DeviceData")
         intermediate_topologies = {}
-        query = DeviceData.objects.filter(organization_id=organization_id).only(
-            "mac_address"
-        )
-        discard_older_data_time = now() - timedelta(seconds=discard_older_data_time)
-        for device_data in query.iterator():
-            try:
-                assert device_data.data is not None
-                data_timestamp = datetime.fromisoformat(device_data.data_timestamp)
-                assert data_timestamp > discard_older_data_time
-            except (AttributeError, AssertionError):
-                continue
-            for interface in device_data.data.get("interfaces", []):
-                if not AbstractWifiMesh._is_mesh_interfaces(interface):
+        for data in device_data.values():
+            for interface in data["interfaces"]:
+                mesh_id = cls._get_mesh_id(interface)
+                if mesh_ids is not None and mesh_id not in mesh_ids:
                     continue
-                mesh_id = "{}@{}".format(
-                    interface["wireless"]["ssid"], interface["wireless"]["channel"]
-                )
                 if mesh_id not in intermediate_topologies:
                     intermediate_topologies[mesh_id] = {
                         "nodes": {},
@@ -339,7 +577,7 @@ class AbstractWifiMesh(UUIDModel):
                     collected_nodes,
                     collected_links,
                 ) = cls._get_intermediate_nodes_and_links(
-                    interface, device_data, topology["mac_mapping"]
+                    interface, data["mac_address"], topology["mac_mapping"]
                 )
                 AbstractWifiMesh._merge_nodes(
                     interface, topology["nodes"], collected_nodes
@@ -350,7 +588,7 @@ class AbstractWifiMesh(UUIDModel):
         return intermediate_topologies
 
     @classmethod
-    def _get_intermediate_nodes_and_links(cls, interface, device_data, mac_mapping):
+    def _get_intermediate_nodes_and_links(cls, interface, device_mac, mac_mapping):
         """
         Create intermediate data structures for nodes and links.
         These intermediate data structures are required because the
@@ -359,7 +597,7 @@ class AbstractWifiMesh(UUIDModel):
         quick lookup while mapping interface MAC address to the
         device MAC address.
         """
-        device_mac = device_data.mac_address.upper()
+        device_mac = device_mac.upper()
         interface_mac = interface["mac"].upper()
         channel = interface["wireless"]["channel"]
         device_node_id = f"{device_mac}@{channel}"
@@ -474,6 +712,26 @@ class AbstractWifiMesh(UUIDModel):
             }
             topology_obj.receive(topology)
 
+    @staticmethod
+    def _discard_topologies(organization_id, mesh_ids=None, exclude=None):
+        """
+        Marks as down the links of the meshes of the organization
+        for which there isn't any recent monitoring data
+        (``exclude`` are the IDs of the meshes which have data).
+        """
+        WifiMesh = load_model("topology_device", "WifiMesh")
+        queryset = WifiMesh.objects.select_related("topology").filter(
+            topology__organization_id=organization_id
+        )
+        if mesh_ids is not None:
+            queryset = queryset.filter(mesh_id__in=mesh_ids)
+        if exclude:
+            queryset = queryset.exclude(mesh_id__in=exclude)
+        for wifi_mesh in queryset:
+            topology = wifi_mesh.topology
+            if topology.link_set.filter(status="up").update(status="down"):
+                topology._invalidate_graph_cache()
+
     @staticmethod
     def _get_nodes_from_intermediate_topology(intermediate_topology):
         """
@@ -530,10 +788,7 @@ class AbstractWifiMesh(UUIDModel):
         try:
             mesh_topology = (
                 WifiMesh.objects.select_related("topology")
-                .get(
-                    mesh_id=mesh_id,
-                    topology__organization_id=organization_id,
-                )
+                .get(mesh_id=mesh_id, organization_id=organization_id)
                 .topology
             )
         except WifiMesh.DoesNotExist:
@@ -544,12 +799,13 @@ class AbstractWifiMesh(UUIDModel):
                 strategy="receive",
                 expiration_time=330,
             )
-            mesh_topology.full_clean()
-            mesh_topology.save()
             wifi_mesh = WifiMesh(
                 mesh_id=mesh_id,
                 topology=mesh_topology,
             )
-            wifi_mesh.full_clean()
-            wifi_mesh.save()
+            with transaction.atomic():
+                mesh_topology.full_clean()
+                mesh_topology.save()
+                wifi_mesh.full_clean()
+                wifi_mesh.save()
         return mesh_topology
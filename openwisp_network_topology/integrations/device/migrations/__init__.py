@@ -0,0 +1,25 @@
+# Manually written, used during migrations
+from openwisp_network_topology.migrations import get_model
+
+
+def populate_wifi_mesh_organization(apps, schema_editor):
+    WifiMesh = get_model(apps, "topology_device", "WifiMesh")
+    Topology = get_model(apps, "topology", "Topology")
+    queryset = WifiMesh.objects.select_related("topology").order_by("topology__created")
+    mesh_ids = set()
+    kept_topology_ids = set()
+    discarded_topology_ids = set()
+    for wifi_mesh in queryset.iterator():
+        organization_id = wifi_mesh.topology.organization_id
+        # duplicates created by concurrent updates (the oldest
+        # is kept) and shared topologies cannot be looked up
+        if organization_id is None or (organization_id, wifi_mesh.mesh_id) in mesh_ids:
+            discarded_topology_ids.add(wifi_mesh.topology_id)
+            wifi_mesh.delete()
+            continue
+        mesh_ids.add((organization_id, wifi_mesh.mesh_id))
+        kept_topology_ids.add(wifi_mesh.topology_id)
+        wifi_mesh.organization_id = organization_id
+        wifi_mesh.save(update_fields=["organization"])
+    # the topologies of the discarded meshes would be left orphaned
+    Topology.objects.filter(pk__in=discarded_topology_ids - kept_topology_ids).delete()
@@ -1,8 +1,39 @@
 import swapper
 from celery import shared_task
+from django.core.cache import cache
 
 from . import settings as app_settings
 
+# the update of the topology of a mesh is delayed by this amount of
+# seconds, the monitoring data sent by the devices of the mesh
+# in the meantime is collapsed in a single update
+_UPDATE_MESH_TOPOLOGY_DELAY = 5
+
+
+def schedule_update_mesh_topology(organization_id, mesh_ids):
+    """
+    Schedules the ``update_mesh_topology`` task of ``mesh_ids``
+    after ``_UPDATE_MESH_TOPOLOGY_DELAY`` seconds, except for the
+    meshes whose update has already been scheduled
+    """
+    WifiMesh = swapper.load_model("topology_device", "WifiMesh")
+    mesh_ids = [
+        mesh_id
+        for mesh_id in mesh_ids
+        # the timeout is a safety net in case the task is never executed
+        if cache.add(
+            WifiMesh._get_mesh_cache_key(organization_id, mesh_id, "scheduled"),
+            True,
+            timeout=_UPDATE_MESH_TOPOLOGY_DELAY + 60,
+        )
+    ]
+    if not mesh_ids:
+        return False
+    update_mesh_topology.apply_async(
+        args=[organization_id, mesh_ids], countdown=_UPDATE_MESH_TOPOLOGY_DELAY
+    )
+    return True
+
 
 @shared_task
 def create_device_node_relation(node_pk):
@@ -26,3 +57,21 @@ def create_mesh_topology(organization_ids, discard_older_data_time=360):
         return
     WifiMesh = swapper.load_model("topology_device", "WifiMesh")
     WifiMesh.create_topology(organization_ids, discard_older_data_time)
+
+
+@shared_task
+def update_mesh_topology(organization_id, mesh_ids):
+    if not app_settings.WIFI_MESH_INTEGRATION:
+        return
+    WifiMesh = swapper.load_model("topology_device", "WifiMesh")
+    # from now on, new monitoring data of these meshes
+    # will need to schedule another update_mesh_topology
+    cache.delete_many(
+        [
+            WifiMesh._get_mesh_cache_key(organization_id, mesh_id, "scheduled")
+            for mesh_id in mesh_ids
+        ]
+    )
+    busy_mesh_ids = WifiMesh.update_mesh_topologies(organization_id, mesh_ids)
+    if busy_mesh_ids:
+        schedule_update_mesh_topology(organization_id, busy_mesh_ids)
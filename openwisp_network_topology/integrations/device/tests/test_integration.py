@@ -182,7 +182,7 @@ class TestControllerIntegration(Base, TransactionTestCase):
         topology, device, cert = self._create_test_env(parser="netdiff.OpenvpnParser")
         self.assertEqual(DeviceNode.objects.count(), 0)
         with self.subTest("assert number of queries"):
-            with self.assertNumQueries(15):
+            with self.assertNumQueries(14):
                 node = self._init_test_node(topology, common_name=cert.common_name)
         self.assertEqual(DeviceNode.objects.count(), 1)
         device_node = DeviceNode.objects.first()
@@ -229,7 +229,7 @@ class TestControllerIntegration(Base, TransactionTestCase):
             except ValueError:
                 self.fail("ValueError raised")
         with self.subTest("assert number of queries"):
-            with self.assertNumQueries(15):
+            with self.assertNumQueries(14):
                 node = self._init_wireguard_test_node(topology)
         self.assertEqual(DeviceNode.objects.count(), 1)
         device_node = DeviceNode.objects.first()
@@ -253,7 +253,7 @@ class TestControllerIntegration(Base, TransactionTestCase):
         )
         self.assertEqual(DeviceNode.objects.count(), 0)
         with self.subTest("assert number of queries"):
-            with self.assertNumQueries(15):
+            with self.assertNumQueries(14):
                 node = self._init_zerotier_test_node(
                     topology, zt_member_id=zerotier_member_id
                 )
@@ -330,7 +330,7 @@ class TestControllerIntegration(Base, TransactionTestCase):
         )
         link.full_clean()
         link.save()
-        with self.assertNumQueries(6):
+        with self.assertNumQueries(4):
             link.status = "down"
             link.save()
         device.refresh_from_db()
@@ -354,7 +354,7 @@ class TestControllerIntegration(Base, TransactionTestCase):
         )
         link.full_clean()
         link.save()
-        with self.assertNumQueries(6):
+        with self.assertNumQueries(4):
             link.status = "up"
             link.save()
         device.refresh_from_db()
@@ -417,7 +417,7 @@ class TestControllerIntegration(Base, TransactionTestCase):
         topology, device, cert = self._create_test_env(parser="netdiff.OpenvpnParser")
         self._init_test_node(topology, common_name=cert.common_name)
         with self.subTest("assert number of queries"):
-            with self.assertNumQueries(2):
+            with self.assertNumQueries(0):
                 json = topology.json(dict=True)
         self.assertEqual(json["nodes"][0]["label"], device.name)
 
@@ -4,14 +4,18 @@ from unittest.mock import patch
 
 import swapper
 from django.core.cache import cache
-from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.test import TransactionTestCase, tag
 from django.urls import reverse
 from django.utils.timezone import now, timedelta
 from freezegun import freeze_time
 
 from .. import settings as app_settings
-from ..tasks import create_mesh_topology
+from ..tasks import (
+    create_mesh_topology,
+    schedule_update_mesh_topology,
+    update_mesh_topology,
+)
 from . import SIMPLE_MESH_DATA, SINGLE_NODE_MESH_DATA
 from .utils import TopologyTestMixin
 
@@ -86,7 +90,9 @@ class TestWifiMeshIntegration(TopologyTestMixin, TransactionTestCase):
         self.assertEqual(Topology.objects.filter(organization=org).count(), 1)
         topology = Topology.objects.filter(organization=org).first()
         self.assertEqual(
-            WifiMesh.objects.filter(topology=topology, mesh_id="Test Mesh@11").count(),
+            WifiMesh.objects.filter(
+                topology=topology, organization=org, mesh_id="Test Mesh@11"
+            ).count(),
             1,
         )
         self.assertEqual(
@@ -254,6 +260,115 @@ class TestWifiMeshIntegration(TopologyTestMixin, TransactionTestCase):
         self.assertEqual(topology.node_set.count(), 3)
         self.assertEqual(topology.link_set.filter(status="up").count(), 0)
 
+    def test_mesh_data_restored_after_cache_flush(self):
+        devices, org = self._populate_mesh(SIMPLE_MESH_DATA)
+        topology = Topology.objects.get(organization=org)
+        self.assertEqual(topology.link_set.filter(status="up").count(), 3)
+        cache.clear()
+        create_mesh_topology.delay(organization_ids=(org.id,))
+        self.assertEqual(topology.link_set.filter(status="up").count(), 3)
+        self.assertIsNotNone(cache.get(WifiMesh._get_cache_key(devices[0].pk)))
+
+    def test_mesh_updated_on_monitoring_data(self):
+        with patch.object(WifiMesh, "create_topology") as mocked:
+            devices, org = self._populate_mesh(SIMPLE_MESH_DATA)
+            mocked.assert_called_once()
+        topology = Topology.objects.get(organization=org)
+        self.assertEqual(topology.node_set.count(), 3)
+        self.assertEqual(topology.link_set.filter(status="up").count(), 3)
+        device = devices[0]
+        interfaces = deepcopy(SIMPLE_MESH_DATA[device.mac_address])
+
+        def _post_data():
+            response = self.client.post(
+                "{0}?key={1}&time={2}".format(
+                    reverse("monitoring:api_device_metric", args=[device.id]),
+                    device.key,
+                    now().utcnow().strftime("%d-%m-%Y_%H:%M:%S.%f"),
+                ),
+                data=json.dumps({"type": "DeviceMonitoring", "interfaces": interfaces}),
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 200)
+
+        with self.subTest("topology is not updated if mesh data is unchanged"):
+            interfaces[0]["wireless"]["tx_power"] = 20
+            with patch.object(update_mesh_topology, "apply_async") as mocked:
+                _post_data()
+                mocked.assert_not_called()
+
+        with self.subTest("links are touched periodically if mesh data is unchanged"):
+            link = topology.link_set.first()
+            modified = link.modified
+            # the touch interval has elapsed
+            cache.delete(
+                WifiMesh._get_mesh_cache_key(str(org.id), "Test Mesh@11", "touched")
+            )
+            with patch.object(
+                update_mesh_topology,
+                "apply_async",
+                wraps=update_mesh_topology.apply_async,
+            ) as mocked:
+                _post_data()
+                _post_data()
+                mocked.assert_called_once_with(
+                    args=[str(org.id), ["Test Mesh@11"]], countdown=5
+                )
+            link.refresh_from_db()
+            self.assertGreater(link.modified, modified)
+            self.assertEqual(topology.link_set.filter(status="up").count(), 3)
+
+        with self.subTest("topology is updated if mesh data changes"):
+            interfaces[0]["wireless"]["ssid"] = "New Mesh"
+            with patch.object(
+                update_mesh_topology,
+                "apply_async",
+                wraps=update_mesh_topology.apply_async,
+            ) as mocked:
+                _post_data()
+                mocked.assert_called_once_with(
+                    args=[str(org.id), ["New Mesh@11", "Test Mesh@11"]], countdown=5
+                )
+            new_topology = Topology.objects.get(wifimesh__mesh_id="New Mesh@11")
+            self.assertEqual(new_topology.node_set.count(), 1)
+
+    def test_mesh_topology_update_serialized(self):
+        devices, org = self._populate_mesh(SIMPLE_MESH_DATA)
+        organization_id = str(org.id)
+        lock_key = WifiMesh._get_mesh_cache_key(organization_id, "Test Mesh@11", "lock")
+
+        with self.subTest("meshes being updated by other workers are rescheduled"):
+            cache.add(lock_key, True)
+            with patch.object(WifiMesh, "_create_topology") as mocked_create:
+                with patch.object(update_mesh_topology, "apply_async") as mocked:
+                    update_mesh_topology(organization_id, ["Test Mesh@11"])
+                mocked_create.assert_not_called()
+                mocked.assert_called_once_with(
+                    args=[organization_id, ["Test Mesh@11"]], countdown=5
+                )
+            cache.delete(lock_key)
+
+        with self.subTest("scheduled updates are collapsed"):
+            cache.clear()
+            with patch.object(update_mesh_topology, "apply_async") as mocked:
+                schedule_update_mesh_topology(organization_id, ["Test Mesh@11"])
+                schedule_update_mesh_topology(
+                    organization_id, ["New Mesh@11", "Test Mesh@11"]
+                )
+            self.assertEqual(mocked.call_count, 2)
+            mocked.assert_called_with(
+                args=[organization_id, ["New Mesh@11"]], countdown=5
+            )
+
+        with self.subTest("mesh IDs are unique within the organization"):
+            wifi_mesh = WifiMesh(
+                mesh_id="Test Mesh@11",
+                topology=self._create_topology(organization=org),
+            )
+            with self.assertRaises(ValidationError) as context_manager:
+                wifi_mesh.full_clean()
+            self.assertIn("mesh_id", context_manager.exception.message_dict)
+
     def test_topology_admin(self):
         """
         Tests WifiMeshInlineAdmin is present in TopologyAdmin
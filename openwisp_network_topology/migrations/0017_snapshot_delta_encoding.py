@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from swapper import get_model_name
+
+from . import compress_snapshots, decompress_snapshots
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("topology", "0016_alter_topology_parser"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="snapshot",
+            name="base",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.RESTRICT,
+                related_name="deltas",
+                to=get_model_name("topology", "Snapshot"),
+            ),
+        ),
+        migrations.AddField(
+            model_name="snapshot",
+            name="compressed_data",
+            field=models.BinaryField(default=b""),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name="snapshot",
+            name="data",
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(compress_snapshots, reverse_code=decompress_snapshots),
+        migrations.RemoveField(
+            model_name="snapshot",
+            name="data",
+        ),
+    ]
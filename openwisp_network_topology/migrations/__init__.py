@@ -1,4 +1,7 @@
 # Manually written, used during migrations
+import json
+import zlib
+
 import swapper
 from django.contrib.auth.management import create_permissions
 
@@ -9,6 +12,83 @@ def get_model(apps, app_name, model):
     return apps.get_model(model_label, model)
 
 
+# The following helpers are copies of the ones defined in
+# ``openwisp_network_topology.base.snapshot`` as of migration 0017,
+# they must not be changed so that the migration keeps working
+# regardless of later changes to the snapshot encoding.
+_MAX_DELTA_RATIO = 0.5
+
+
+def _compress(data):
+    return zlib.compress(data.encode(), 9)
+
+
+def _decompress(data):
+    return zlib.decompress(data).decode()
+
+
+def _get_key(section, item):
+    if section == "nodes":
+        return item["id"]
+    return item["source"], item["target"]
+
+
+def _get_delta(base, graph):
+    delta = {
+        "graph": {
+            key: None if key in ["nodes", "links"] else value
+            for key, value in graph.items()
+        },
+        "added": {"nodes": [], "links": []},
+        "removed": {"nodes": [], "links": []},
+        "changed": {"nodes": [], "links": []},
+    }
+    for section in ["nodes", "links"]:
+        base_items = {_get_key(section, item): item for item in base[section]}
+        items = {_get_key(section, item): item for item in graph[section]}
+        for key, item in items.items():
+            if key not in base_items:
+                delta["added"][section].append(item)
+            elif base_items[key] != item:
+                delta["changed"][section].append(item)
+        for key in base_items.keys() - items.keys():
+            delta["removed"][section].append(key)
+    return delta
+
+
+def _apply_delta(base, delta):
+    graph = dict(delta["graph"])
+    for section in ["nodes", "links"]:
+        items = {_get_key(section, item): item for item in base[section]}
+        for key in delta["removed"][section]:
+            items.pop(tuple(key) if section == "links" else key, None)
+        for item in delta["changed"][section] + delta["added"][section]:
+            items[_get_key(section, item)] = item
+        graph[section] = list(items.values())
+    return graph
+
+
+def encode_snapshot(data, base_data=None, base_size=None):
+    if base_data is not None:
+        base = json.loads(base_data)
+        delta = _get_delta(base, json.loads(data))
+        compressed = _compress(json.dumps(delta, separators=(",", ":")))
+        if (
+            len(compressed) < base_size * _MAX_DELTA_RATIO
+            and json.dumps(_apply_delta(base, delta)) == data
+        ):
+            return compressed, True
+    return _compress(data), False
+
+
+def decode_snapshot(compressed_data, base_compressed_data=None):
+    data = _decompress(compressed_data)
+    if base_compressed_data is None:
+        return data
+    base = json.loads(_decompress(base_compressed_data))
+    return json.dumps(_apply_delta(base, json.loads(data)))
+
+
 def migrate_addresses(apps, schema_editor):
     Node = get_model(apps, "topology", "Node")
     for node in Node.objects.iterator():
@@ -36,6 +116,41 @@ def fix_link_properties(apps, schema_editor):
         link.save()
 
 
+def compress_snapshots(apps, schema_editor):
+    """
+    converts the snapshots of each topology to base
+    snapshots followed by the deltas against them
+    """
+    Snapshot = get_model(apps, "topology", "Snapshot")
+    base = None
+    for snapshot in Snapshot.objects.order_by("topology_id", "date").iterator():
+        if base and base.topology_id != snapshot.topology_id:
+            base = None
+        if base:
+            compressed, is_delta = encode_snapshot(
+                snapshot.data, base.data, len(base.compressed_data)
+            )
+        else:
+            compressed, is_delta = encode_snapshot(snapshot.data)
+        snapshot.base = base if is_delta else None
+        snapshot.compressed_data = compressed
+        # update_fields avoids changing the date of the snapshot
+        snapshot.save(update_fields=["base", "compressed_data"])
+        if not is_delta:
+            base = snapshot
+
+
+def decompress_snapshots(apps, schema_editor):
+    Snapshot = get_model(apps, "topology", "Snapshot")
+    for snapshot in Snapshot.objects.select_related("base").iterator():
+        snapshot.data = decode_snapshot(
+            snapshot.compressed_data,
+            snapshot.base.compressed_data if snapshot.base_id else None,
+        )
+        snapshot.save(update_fields=["data"])
+    Snapshot.objects.update(base=None)
+
+
 def create_default_permissions(apps, schema_editor):
     for app_config in apps.get_app_configs():
         app_config.models_module = True
@@ -37,6 +37,9 @@ DEFAULT_PARSERS = [
 PARSERS = DEFAULT_PARSERS + get_settings_value("PARSERS", [])
 SIGNALS = get_settings_value("SIGNALS", None)
 TIMEOUT = get_settings_value("TIMEOUT", 8)
+FETCH_WORKERS = get_settings_value("FETCH_WORKERS", 10)
+FETCH_HOST_WORKERS = get_settings_value("FETCH_HOST_WORKERS", 2)
+FETCH_DEADLINE = get_settings_value("FETCH_DEADLINE", 300)
 LINK_EXPIRATION = get_settings_value("LINK_EXPIRATION", 60)
 NODE_EXPIRATION = get_settings_value("NODE_EXPIRATION", False)
 VISUALIZER_CSS = get_settings_value("VISUALIZER_CSS", "netjsongraph/css/style.css")
@@ -1,5 +1,8 @@
+from functools import partial
+
 from asgiref.sync import async_to_sync
 from channels import layers
+from django.db import transaction
 from django.dispatch import Signal
 
 update_topology = Signal()
@@ -9,6 +12,11 @@ Providing arguments: ['topology']
 
 
 def broadcast_topology(topology, *args, **kwargs):
+    # the cached graph of the topology is updated on commit
+    transaction.on_commit(partial(_send_topology_update, topology))
+
+
+def _send_topology_update(topology):
     channel_layer = layers.get_channel_layer()
     async_to_sync(channel_layer.group_send)(
         f"topology-{topology.pk}",
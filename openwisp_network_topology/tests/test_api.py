@@ -310,12 +310,12 @@ class TestApi(
         self.client.force_login(user)
         with self.subTest("List url"):
             url = self.list_url
-            with self.assertNumQueries(7):
+            with self.assertNumQueries(5):
                 response = self.client.get(url)
             self.assertEqual(response.status_code, 200)
         with self.subTest("Detail url"):
             url = self.detail_url
-            with self.assertNumQueries(7):
+            with self.assertNumQueries(5):
                 response = self.client.get(url)
             self.assertEqual(response.status_code, 200)
 
@@ -328,12 +328,12 @@ class TestApi(
         self.client.force_login(user)
         with self.subTest("List url"):
             url = self.list_url
-            with self.assertNumQueries(7):
+            with self.assertNumQueries(5):
                 response = self.client.get(url)
             self.assertEqual(response.status_code, 200)
         with self.subTest("Detail url"):
             url = self.detail_url
-            with self.assertNumQueries(7):
+            with self.assertNumQueries(5):
                 response = self.client.get(url)
             self.assertEqual(response.status_code, 200)
 
@@ -434,7 +434,7 @@ class TestApi(
             "url": "http://127.0.0.1:9090",
             "published": True,
         }
-        with self.assertNumQueries(12):
+        with self.assertNumQueries(10):
             response = self.client.post(path, data, content_type="application/json")
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.data["label"], "test-fetch-topology")
@@ -451,7 +451,7 @@ class TestApi(
             "expiration_time": 360,
             "published": True,
         }
-        with self.assertNumQueries(12):
+        with self.assertNumQueries(10):
             response = self.client.post(path, data, content_type="application/json")
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.data["label"], "test-receive-topology")
@@ -464,7 +464,7 @@ class TestApi(
         path = reverse("network_graph", args=(topo.pk,))
         r_path = reverse("receive_topology", args=[topo.pk])
         receive_url = "http://testserver{0}?key={1}".format(r_path, topo.key)
-        with self.assertNumQueries(7):
+        with self.assertNumQueries(5):
             response = self.client.get(path)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["receive_url"], receive_url)
@@ -491,13 +491,13 @@ class TestApi(
         org1 = self._get_org()
         topo = self._create_topology(organization=org1)
         path = reverse("network_graph", args=(topo.pk,))
-        with self.assertNumQueries(7):
+        with self.assertNumQueries(5):
             response = self.client.get(path)
         self.assertEqual(response.status_code, 200)
 
     def test_get_topology_detail_with_link_api(self):
         path = reverse("network_graph", args=(self.topology.pk,))
-        with self.assertNumQueries(7):
+        with self.assertNumQueries(5):
             response = self.client.get(path)
         self.assertEqual(response.status_code, 200)
         self.assertNotEqual(response.data["links"], [])
@@ -509,7 +509,7 @@ class TestApi(
             "organization": self._get_org().pk,
             "parser": "netdiff.OlsrParser",
         }
-        with self.assertNumQueries(12):
+        with self.assertNumQueries(8):
             response = self.client.put(path, data, content_type="application/json")
         self.topology.refresh_from_db()
         self.assertEqual(self.topology.label, "ChangeTestNetwork")
@@ -565,7 +565,7 @@ class TestApi(
             "strategy": "fetch",
             "url": "http://127.0.0.1:9090",
         }
-        with self.assertNumQueries(12):
+        with self.assertNumQueries(8):
             response = self.client.put(path, data, content_type="application/json")
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["strategy"], "fetch")
@@ -584,7 +584,7 @@ class TestApi(
             "strategy": "receive",
             "key": 12345,
         }
-        with self.assertNumQueries(12):
+        with self.assertNumQueries(8):
             response = self.client.put(path, data, content_type="application/json")
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["strategy"], "receive")
@@ -596,7 +596,7 @@ class TestApi(
         data = {
             "label": "ChangeTestNetwork",
         }
-        with self.assertNumQueries(11):
+        with self.assertNumQueries(7):
             response = self.client.patch(path, data, content_type="application/json")
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["label"], "ChangeTestNetwork")
@@ -618,7 +618,7 @@ class TestApi(
         self.client.force_login(user1)
         with self.subTest("test network collection view"):
             path = reverse("network_collection")
-            with self.assertNumQueries(7):
+            with self.assertNumQueries(5):
                 response = self.client.get(path)
             self.assertEqual(response.status_code, 200)
             self.assertIn(str(topo1.id), str(response.content))
@@ -627,7 +627,7 @@ class TestApi(
         with self.subTest("test network graph view"):
             # Get the topology graph view of member org 200
             path = reverse("network_graph", args=(topo1.pk,))
-            with self.assertNumQueries(7):
+            with self.assertNumQueries(5):
                 response = self.client.get(path)
             self.assertEqual(response.status_code, 200)
             self.assertEqual(response.data["id"], str(topo1.id))
@@ -647,7 +647,7 @@ class TestApi(
         self.client.force_login(user1)
         with self.subTest("test network collection view"):
             path = reverse("network_collection")
-            with self.assertNumQueries(8):
+            with self.assertNumQueries(6):
                 response = self.client.get(path, {"format": "api"})
             self.assertEqual(response.status_code, 200)
             self.assertEqual(Organization.objects.count(), 2)
@@ -657,7 +657,7 @@ class TestApi(
         with self.subTest("test network graph view"):
             topo1 = self._create_topology(label="topo1", organization=org1)
             path = reverse("network_graph", args=(topo1.pk,))
-            with self.assertNumQueries(14):
+            with self.assertNumQueries(10):
                 response = self.client.get(path, {"format": "api"})
             self.assertEqual(response.status_code, 200)
             self.assertEqual(Organization.objects.count(), 2)
@@ -721,7 +721,7 @@ class TestApi(
             "properties": {},
             "user_properties": {},
         }
-        with self.assertNumQueries(13):
+        with self.assertNumQueries(12):
             response = self.client.post(path, data, content_type="application/json")
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.data["topology"], self.topology.pk)
@@ -742,7 +742,7 @@ class TestApi(
             "organization": org.pk,
         }
         path = reverse("node_list")
-        with self.assertNumQueries(11):
+        with self.assertNumQueries(10):
             response = self.client.post(path, data, content_type="application/json")
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.data["topology"], topology.pk)
@@ -772,7 +772,7 @@ class TestApi(
             "user_properties": {},
         }
         path = reverse("node_detail", args=(self.node1.pk,))
-        with self.assertNumQueries(13):
+        with self.assertNumQueries(11):
             response = self.client.put(path, data, content_type="application/json")
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["label"], "change-node")
@@ -781,7 +781,7 @@ class TestApi(
     def test_node_patch_api(self):
         path = reverse("node_detail", args=(self.node1.pk,))
         data = {"label": "change-node"}
-        with self.assertNumQueries(12):
+        with self.assertNumQueries(10):
             response = self.client.patch(path, data, content_type="application/json")
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["label"], "change-node")
@@ -848,7 +848,7 @@ class TestApi(
             "properties": {},
             "user_properties": {},
         }
-        with self.assertNumQueries(16):
+        with self.assertNumQueries(14):
             response = self.client.post(path, data, content_type="application/json")
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.data["topology"], self.topology.pk)
@@ -907,7 +907,7 @@ class TestApi(
             "properties": {},
             "user_properties": {"user": "tester"},
         }
-        with self.assertNumQueries(16):
+        with self.assertNumQueries(14):
             response = self.client.put(path, data, content_type="application/json")
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["cost"], 21.0)
@@ -917,7 +917,7 @@ class TestApi(
     def test_link_patch_api(self):
         path = reverse("link_detail", args=(self.link.pk,))
         data = {"cost": 50.0}
-        with self.assertNumQueries(13):
+        with self.assertNumQueries(11):
             response = self.client.patch(path, data, content_type="application/json")
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["cost"], 50.0)
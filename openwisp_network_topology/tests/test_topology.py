@@ -1,14 +1,20 @@
 from datetime import timedelta
+from unittest.mock import patch
 
 import responses
 import swapper
 from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection, transaction
+from django.db.models.signals import post_save
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from freezegun import freeze_time
 from netdiff import OlsrParser
 
-from openwisp_utils.tests import capture_any_output
+from openwisp_utils.tests import capture_any_output, catch_signal
 
+from ..signals import update_topology
+from ..utils import link_status_changed
 from .utils import CreateGraphObjectsMixin, CreateOrgMixin, LoadMixin
 
 Link = swapper.load_model("topology", "Link")
@@ -105,6 +111,70 @@ class TestTopology(CreateOrgMixin, CreateGraphObjectsMixin, LoadMixin, TestCase)
         )
         self.assertIsInstance(t.json(), str)
 
+    def test_json_cache(self):
+        node1, node2 = self._get_nodes()
+        t = self.topology_model.objects.first()
+        netjson = t.json()
+        with self.assertNumQueries(0):
+            self.assertEqual(t.json(), netjson)
+            self.assertEqual(len(t.json(dict=True)["nodes"]), 2)
+
+        with self.subTest("changes are applied to the cached graph"):
+            with self.captureOnCommitCallbacks(execute=True):
+                node1.label = "changed"
+                node1.save()
+                link = t._create_link(source=node1, target=node2, cost=1, status="down")
+                link.save()
+            with self.assertNumQueries(0):
+                graph = t.json(dict=True)
+                self.assertEqual(len(t.json(dict=True, omit_down=True)["links"]), 0)
+                self.assertIn('"label": "changed"', t.json())
+            self.assertEqual(graph["nodes"][0]["label"], "changed")
+            self.assertEqual(graph["links"], [link.json(dict=True)])
+
+        with self.subTest("deleted items are removed from the cached graph"):
+            with self.captureOnCommitCallbacks(execute=True):
+                link.delete()
+                node2.delete()
+            with self.assertNumQueries(0):
+                graph = t.json(dict=True)
+            self.assertEqual(graph["nodes"], [node1.json(dict=True)])
+            self.assertEqual(graph["links"], [])
+
+        with self.subTest("graph is generated again when missing"):
+            t._invalidate_graph_cache()
+            with self.assertNumQueries(2):
+                self.assertEqual(t.json(dict=True)["nodes"], graph["nodes"])
+
+        with self.subTest("changes rolled back are not applied to the cached graph"):
+            try:
+                with transaction.atomic():
+                    node1.label = "rolled back"
+                    node1.save()
+                    raise DatabaseError()
+            except DatabaseError:
+                pass
+            with self.assertNumQueries(0):
+                self.assertEqual(t.json(dict=True)["nodes"], graph["nodes"])
+
+        with self.subTest("graph generated while items change is discarded"):
+            t._invalidate_graph_cache()
+            get_nodes_queryset = t.get_nodes_queryset
+
+            def change_node():
+                queryset = list(get_nodes_queryset())
+                # committed by another process during the generation
+                with self.captureOnCommitCallbacks(execute=True):
+                    node1.label = "changed again"
+                    node1.save()
+                return queryset
+
+            with patch.object(t, "get_nodes_queryset", side_effect=change_node):
+                t.json(dict=True)
+            with self.assertNumQueries(2):
+                graph = t.json(dict=True)
+            self.assertEqual(graph["nodes"][0]["label"], "changed again")
+
     @responses.activate
     def test_empty_diff(self):
         t = self.topology_model.objects.first()
@@ -276,6 +346,42 @@ class TestTopology(CreateOrgMixin, CreateGraphObjectsMixin, LoadMixin, TestCase)
         link.refresh_from_db()
         self.assertEqual(link.status, "up")
 
+    def test_update_topology_bulk(self):
+        t = self.topology_model.objects.first()
+        t.parser = "netdiff.NetJsonParser"
+        t.save()
+        self.node_model.objects.all().delete()
+        t.update_topology(t.diff(self._load("static/netjson-2-links.json")))
+        self.assertEqual(self.node_model.objects.count(), 3)
+        self.assertEqual(self.link_model.objects.count(), 2)
+        links = t.json(dict=True, original=True)["links"]
+
+        def _changed(links):
+            for link in links:
+                link["cost"] += 1
+            return {"added": None, "changed": {"links": links}, "removed": None}
+
+        with self.subTest("queries do not depend on the size of the diff"):
+            with CaptureQueriesContext(connection) as one_link:
+                t.update_topology(_changed(links[:1]))
+            with CaptureQueriesContext(connection) as two_links:
+                with catch_signal(update_topology) as handler:
+                    t.update_topology(_changed(links))
+            self.assertEqual(len(one_link), len(two_links))
+            handler.assert_called_once()
+            self.assertEqual(
+                sorted(self.link_model.objects.values_list("cost", flat=True)),
+                sorted(link["cost"] for link in links),
+            )
+
+        with self.subTest("link_status_changed is sent for each link"):
+            with catch_signal(link_status_changed) as handler:
+                t.update_topology(
+                    {"added": None, "changed": None, "removed": {"links": links}}
+                )
+            self.assertEqual(handler.call_count, 2)
+            self.assertEqual(self.link_model.objects.filter(status="down").count(), 2)
+
     def test_topology_url_empty(self):
         t = self.topology_model(
             label="test", parser="netdiff.NetJsonParser", strategy="fetch"
@@ -431,6 +537,37 @@ class TestTopology(CreateOrgMixin, CreateGraphObjectsMixin, LoadMixin, TestCase)
             )
             self.assertEqual(link.cost, 2.0)
 
+    def test_receive_touch_links(self):
+        with freeze_time() as frozen_time:
+            self.node_model.objects.all().delete()
+            t = self._set_receive(expiration_time=50)
+            t.receive(self._load("static/netjson-2-links.json"))
+            link1, link2 = t.json(dict=True, original=True)["links"]
+            modified = dict(self.link_model.objects.values_list("id", "modified"))
+            frozen_time.tick(timedelta(seconds=10))
+            with catch_signal(post_save) as handler:
+                with self.assertNumQueries(2):
+                    self.assertEqual(t.touch_links([link1]), 1)
+            handler.assert_not_called()
+            touched = self.link_model.get_from_nodes(
+                link1["source"], link1["target"], t
+            )
+            untouched = self.link_model.get_from_nodes(
+                link2["source"], link2["target"], t
+            )
+            self.assertGreater(touched.modified, modified[touched.pk])
+            self.assertEqual(untouched.modified, modified[untouched.pk])
+
+        with self.subTest("order of source and target is irrelevant"):
+            reverse = dict(link2, source=link2["target"], target=link2["source"])
+            self.assertEqual(t.touch_links([reverse]), 1)
+
+        with self.subTest("unknown links are ignored"):
+            self.assertEqual(t.touch_links([]), 0)
+            unknown = dict(link1, source="10.10.10.10")
+            with self.assertNumQueries(1):
+                self.assertEqual(t.touch_links([unknown]), 0)
+
     def test_multiple_receive_split_network(self):
         def _assert_split_topology(self, topology):
             self.assertEqual(self.node_model.objects.count(), 4)
@@ -485,6 +622,46 @@ class TestTopology(CreateOrgMixin, CreateGraphObjectsMixin, LoadMixin, TestCase)
         s = t.snapshot_set.model.objects.first()
         self.assertFalse(s.created == s.modified)
 
+    def test_save_snapshot_delta(self):
+        t = self._set_receive()
+        for i in range(100):
+            self._create_node(topology=t, label=f"node{i}", addresses=[f"10.0.0.{i}"])
+        Snapshot = t.snapshot_set.model
+        with freeze_time("2026-01-01"):
+            t.save_snapshot()
+        base = Snapshot.objects.get()
+        self.assertIsNone(base.base)
+        self.assertEqual(base.data, t.json())
+        node = t.node_set.first()
+        node.label = "changed"
+        with self.captureOnCommitCallbacks(execute=True):
+            node.save()
+        with freeze_time("2026-01-02"):
+            t.save_snapshot()
+        delta = Snapshot.objects.exclude(pk=base.pk).get()
+        self.assertEqual(delta.base, base)
+        self.assertLess(len(delta.compressed_data), len(base.compressed_data))
+        data = Snapshot.objects.get(pk=delta.pk).data
+        self.assertEqual(data, t.json())
+
+        with self.subTest("deltas are encoded again when the base changes"):
+            with freeze_time("2026-01-01"):
+                t.save_snapshot()
+            base.refresh_from_db()
+            self.assertEqual(base.data, t.json())
+            delta = Snapshot.objects.get(pk=delta.pk)
+            self.assertEqual(delta.data, data)
+            self.assertEqual(str(delta.date), "2026-01-02")
+
+        with self.subTest("big changes are stored as new base snapshots"):
+            t.node_set.update(label="changed")
+            t._invalidate_graph_cache()
+            with freeze_time("2026-01-03"):
+                t.save_snapshot()
+            snapshot = Snapshot.objects.get(date="2026-01-03")
+            self.assertIsNone(snapshot.base)
+            self.assertEqual(snapshot.data, t.json())
+
     def test_label_addition(self):
         t = self._set_receive(parser="netdiff.OpenvpnParser")
         t.save()
@@ -3,6 +3,9 @@ import sys
 from contextlib import contextmanager
 from datetime import timedelta
 from io import StringIO
+from threading import Lock
+from time import sleep
+from unittest import mock
 
 import responses
 import swapper
@@ -130,6 +133,63 @@ class TestUtils(CreateGraphObjectsMixin, CreateOrgMixin, LoadMixin, TestCase):
         self.assertEqual(self.link_model.objects.count(), 0)
         self.assertIn("Failed to", output.getvalue())
 
+    def test_fetch_all_deadline(self):
+        t1 = self.topology_model.objects.first()
+        t2 = self._create_topology(
+            organization=t1.organization, url="http://127.0.0.2:9090"
+        )
+
+        def fetch(topology):
+            if topology == t2:
+                sleep(0.5)
+            return topology.pk
+
+        with mock.patch.object(
+            self.topology_model, "fetch", autospec=True, side_effect=fetch
+        ), mock.patch("openwisp_network_topology.base.topology.FETCH_DEADLINE", 0.2):
+            results = list(self.topology_model.fetch_all([t1, t2]))
+        self.assertEqual(results[0], (t1, t1.pk))
+        self.assertEqual(results[1][0], t2)
+        self.assertIsInstance(results[1][1], TimeoutError)
+
+    def test_fetch_all_slow_host(self):
+        t1 = self.topology_model.objects.first()
+        slow_topologies = [
+            self._create_topology(
+                organization=t1.organization, url=f"http://127.0.0.2:{port}"
+            )
+            for port in range(9090, 9093)
+        ]
+        running = []
+        max_running = []
+        lock = Lock()
+
+        def fetch(topology):
+            if topology == t1:
+                return topology.pk
+            with lock:
+                running.append(topology)
+                max_running.append(len(running))
+            sleep(0.2)
+            with lock:
+                running.remove(topology)
+            return topology.pk
+
+        with mock.patch.object(
+            self.topology_model, "fetch", autospec=True, side_effect=fetch
+        ), mock.patch(
+            "openwisp_network_topology.base.topology.FETCH_WORKERS", 2
+        ), mock.patch(
+            "openwisp_network_topology.base.topology.FETCH_HOST_WORKERS", 1
+        ):
+            results = list(self.topology_model.fetch_all(slow_topologies + [t1]))
+        # the topology of the other host doesn't wait for the slow host
+        self.assertEqual(results[0], (t1, t1.pk))
+        self.assertEqual(
+            results[1:], [(topology, topology.pk) for topology in slow_topologies]
+        )
+        self.assertEqual(max(max_running), 1)
+
     @responses.activate
     def test_update_all_method_unpublished(self):
         t = self.topology_model.objects.first()
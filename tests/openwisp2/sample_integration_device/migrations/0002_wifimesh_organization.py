@@ -0,0 +1,44 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from swapper import get_model_name
+
+from openwisp_network_topology.integrations.device.migrations import (
+    populate_wifi_mesh_organization,
+)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sample_integration_device", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wifimesh",
+            name="organization",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=get_model_name("openwisp_users", "Organization"),
+                verbose_name="organization",
+            ),
+        ),
+        migrations.RunPython(
+            populate_wifi_mesh_organization, reverse_code=migrations.RunPython.noop
+        ),
+        migrations.AlterField(
+            model_name="wifimesh",
+            name="organization",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=get_model_name("openwisp_users", "Organization"),
+                verbose_name="organization",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="wifimesh",
+            unique_together={("organization", "mesh_id")},
+        ),
+    ]
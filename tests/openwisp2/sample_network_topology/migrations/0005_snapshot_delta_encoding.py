@@ -0,0 +1,43 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+from openwisp_network_topology.migrations import (
+    compress_snapshots,
+    decompress_snapshots,
+)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("sample_network_topology", "0004_default_groups"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="snapshot",
+            name="base",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.RESTRICT,
+                related_name="deltas",
+                to="sample_network_topology.snapshot",
+            ),
+        ),
+        migrations.AddField(
+            model_name="snapshot",
+            name="compressed_data",
+            field=models.BinaryField(default=b""),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name="snapshot",
+            name="data",
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(compress_snapshots, reverse_code=decompress_snapshots),
+        migrations.RemoveField(
+            model_name="snapshot",
+            name="data",
+        ),
+    ]